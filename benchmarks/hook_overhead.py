@@ -0,0 +1,161 @@
+# benchmarks/hook_overhead.py
+"""
+Benchmark of hook emit overhead in the connection hot loop.
+
+Replays the events a `ConnectionHandler` emits on every turn (message received,
+LLM request, LLM response, message sent) with realistic payloads, and reports
+how long the emitting coroutine spends inside `emit` for each dispatch mode.
+The subscribers are the console logging subscriber, writing to a file, and a
+subscriber that blocks for a while, like a remote log shipper. The previous
+`HookManager.emit` is included as 'legacy' for comparison. Run from the
+repository root:
+
+    python -m benchmarks.hook_overhead
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from llm_emulator.core.connection import Session
+from llm_emulator.events import HookEvents
+from llm_emulator.llm.roles import LLMRole
+from llm_emulator.utils.hooks import HookManager
+from llm_emulator.utils.subscribers import create_logging_subscriber
+
+_PAGE = (
+    "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n<html><body>"
+    + "<p>Welcome to the bank.</p>" * 200
+    + "</body></html>"
+)
+
+
+class _LegacyHookManager(HookManager):
+    """The emit of the original HookManager: inline, with eager debug logging."""
+
+    def emit(self, event_name: str, *args, **kwargs):
+        logging.getLogger("llm_emulator").debug(
+            f"Emitting event for hook '{event_name}' with args: {args}, kwargs: {kwargs}"
+        )
+        for callback, _ in self._callbacks[event_name]:
+            callback(event_name, *args, **kwargs)
+
+
+def _make_hooks(mode: str, subscriber_latency: float) -> HookManager:
+    hooks = _LegacyHookManager() if mode == "legacy" else HookManager(dispatch=mode)
+    logging_subscriber = create_logging_subscriber(truncate_limit=200)
+
+    def remote_subscriber(event_name, *args, **kwargs):
+        time.sleep(subscriber_latency)
+
+    for event_name in (
+        HookEvents.MESSAGE_RECEIVED,
+        HookEvents.LLM_REQUEST,
+        HookEvents.LLM_RESPONSE,
+        HookEvents.MESSAGE_SENT,
+    ):
+        hooks.subscribe(event_name, logging_subscriber)
+    hooks.subscribe(HookEvents.LLM_RESPONSE, remote_subscriber)
+    return hooks
+
+
+async def _run(mode: str, turns: int, subscriber_latency: float) -> dict:
+    hooks = _make_hooks(mode, subscriber_latency)
+    session = Session(client_address=("10.0.0.1", 40000), service_name="http")
+    messages = []
+    emit_time = 0.0
+    started = time.perf_counter()
+
+    for i in range(turns):
+        request = f"GET /account/{i} HTTP/1.1\r\nHost: bank\r\n\r\n"
+        session.add_to_history(LLMRole.USER, request)
+        messages.append({"role": "user", "content": request})
+
+        t0 = time.perf_counter()
+        hooks.emit(HookEvents.MESSAGE_RECEIVED, session=session, data=request.encode())
+        hooks.emit(
+            HookEvents.LLM_REQUEST, session=session, messages=messages, queue_wait=0.0
+        )
+        emit_time += time.perf_counter() - t0
+
+        # The LLM call and socket writes yield to the event loop.
+        await asyncio.sleep(0)
+
+        t0 = time.perf_counter()
+        hooks.emit(HookEvents.LLM_RESPONSE, session=session, response=_PAGE)
+        hooks.emit(HookEvents.MESSAGE_SENT, session=session, data=_PAGE.encode())
+        emit_time += time.perf_counter() - t0
+
+        session.add_to_history(LLMRole.ASSISTANT, _PAGE)
+        messages.append({"role": "assistant", "content": _PAGE})
+        # Keep the prompt at a realistic size.
+        del messages[:-20]
+        await asyncio.sleep(0)
+
+    hot_loop = time.perf_counter() - started
+    await hooks.aclose()
+    return {
+        "mode": mode,
+        "turns": turns,
+        "emit_us_per_turn": round(emit_time / turns * 1e6, 1),
+        "hot_loop_ms": round(hot_loop * 1000, 1),
+        "until_delivered_ms": round((time.perf_counter() - started) * 1000, 1),
+        "dropped": hooks.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument(
+        "--subscriber-latency",
+        type=float,
+        default=0.0002,
+        help="Seconds the blocking subscriber takes per event.",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="Enable debug logging (to a file)."
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    # Event logs go to a file, as they would on a deployed sensor.
+    log_fd, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(log_fd)
+    handler = logging.FileHandler(log_path)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG if args.debug else logging.INFO)
+
+    try:
+        results = [
+            asyncio.run(_run(mode, args.turns, args.subscriber_latency))
+            for mode in ("legacy", "inline", "background", "thread")
+        ]
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+        os.remove(log_path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{'mode':>10} {'emit us/turn':>13} {'hot loop ms':>12} "
+        f"{'delivered ms':>13} {'dropped':>8}"
+    )
+    for row in results:
+        print(
+            f"{row['mode']:>10} {row['emit_us_per_turn']:>13} "
+            f"{row['hot_loop_ms']:>12} {row['until_delivered_ms']:>13} "
+            f"{row['dropped']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+# benchmarks/load_test.py
+"""
+Load benchmark of a running emulator.
+
+Starts an `Emulator` on an ephemeral port with an in-process mock gateway and
+drives it with a swarm of asyncio TCP clients running in a separate process,
+so that client work does not slow the server's event loop. Two scenarios are
+available: 'http' (request/response, HTTP framing) and 'shell' (interactive,
+line framing). For each, it reports turns per second, the latency of each
+turn, the server's event loop lag, and the memory held per idle session.
+Run from the repository root:
+
+    python -m benchmarks.load_test --scenario http --clients 200 --turns 10
+    python -m benchmarks.load_test --json > results.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import AsyncIterator, Dict, List
+
+from llm_emulator.core.config import EmulatorConfig
+from llm_emulator.core.emulator import Emulator
+from llm_emulator.llm.base import LLMInterface
+from llm_emulator.llm.mocks.latency_mock_gateway import LatencyMockGateway
+
+_HTTP_BODY = "<html><body>" + "<p>Account overview.</p>" * 40 + "</body></html>"
+_HTTP_RESPONSE = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: text/html\r\n"
+    f"Content-Length: {len(_HTTP_BODY)}\r\n"
+    "Connection: keep-alive\r\n\r\n"
+    f"{_HTTP_BODY}"
+)
+_SHELL_RESPONSE = (
+    "total 12\n"
+    "drwxr-xr-x 2 root root 4096 bin\n"
+    "-rw-r--r-- 1 root root  220 .profile\n"
+    "$ "
+)
+
+_DISCOVERY = {
+    "http": '{"port": 8080, "transport_protocol": "tcp", "framing": "http", '
+    '"communication_type": "request-response", "description": "An HTTP server."}',
+    "shell": '{"port": 2222, "transport_protocol": "tcp", "framing": "line", '
+    '"communication_type": "interactive-stream", "description": "A Unix shell."}',
+}
+
+
+class _BenchmarkGateway(LLMInterface):
+    """Answers with a fixed response after a fixed delay, streamed in chunks."""
+
+    def __init__(self, scenario: str, latency: float, chunks: int):
+        self.scenario = scenario
+        self.latency = latency
+        self.chunks = max(chunks, 1)
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        return "".join([chunk async for chunk in self.stream_response(messages)])
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        if "network protocol expert" in messages[0]["content"]:
+            yield _DISCOVERY[self.scenario]
+            return
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = _HTTP_RESPONSE if self.scenario == "http" else _SHELL_RESPONSE
+        size = -(-len(response) // self.chunks)
+        for start in range(0, len(response), size):
+            yield response[start : start + size]
+
+
+# --- Client side (runs in a separate process) ---
+
+
+async def _read_http_response(reader: asyncio.StreamReader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+
+
+async def _read_shell_response(reader: asyncio.StreamReader):
+    await reader.readuntil(b"$ ")
+
+
+# Connections opened at once; more would overflow the listen backlog and
+# stall in SYN retransmissions, measuring the kernel instead of the emulator.
+_CONNECT_CONCURRENCY = 64
+
+
+async def _client(
+    port: int,
+    scenario: str,
+    client_id: int,
+    turns: int,
+    results: dict,
+    connecting: asyncio.Semaphore,
+):
+    read_response = _read_http_response if scenario == "http" else _read_shell_response
+    try:
+        async with connecting:
+            started = time.perf_counter()
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            # The server speaks first.
+            await read_response(reader)
+            results["connect"].append(time.perf_counter() - started)
+
+        for turn in range(turns):
+            if scenario == "http":
+                request = (
+                    f"GET /account/{client_id}/{turn} HTTP/1.1\r\n"
+                    "Host: bank.example\r\n\r\n"
+                )
+            else:
+                request = f"ls -la /home/user{client_id}/{turn}\n"
+            sent = time.perf_counter()
+            writer.write(request.encode())
+            await writer.drain()
+            await read_response(reader)
+            results["turns"].append(time.perf_counter() - sent)
+
+        writer.close()
+        await writer.wait_closed()
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+        results["errors"] += 1
+        results["last_error"] = repr(e)
+
+
+async def _swarm(port: int, scenario: str, clients: int, turns: int) -> dict:
+    results = {"connect": [], "turns": [], "errors": 0, "last_error": None}
+    connecting = asyncio.Semaphore(_CONNECT_CONCURRENCY)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(port, scenario, i, turns, results, connecting)
+            for i in range(clients)
+        )
+    )
+    results["elapsed"] = time.perf_counter() - started
+    return results
+
+
+async def _hold(port: int, scenario: str, clients: int, release):
+    """
+    Opens `clients` sessions, runs one turn on each and keeps them idle until
+    the `release` event is set.
+    """
+    read_response = _read_http_response if scenario == "http" else _read_shell_response
+    request = (
+        b"GET / HTTP/1.1\r\nHost: bank.example\r\n\r\n"
+        if scenario == "http"
+        else b"ls\n"
+    )
+
+    connecting = asyncio.Semaphore(_CONNECT_CONCURRENCY)
+
+    async def one():
+        async with connecting:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await read_response(reader)
+            writer.write(request)
+            await read_response(reader)
+        return writer
+
+    writers = await asyncio.gather(*(one() for _ in range(clients)))
+    await asyncio.get_running_loop().run_in_executor(None, release.wait)
+    for writer in writers:
+        writer.close()
+
+
+def _run_swarm(port: int, scenario: str, clients: int, turns: int) -> dict:
+    return asyncio.run(_swarm(port, scenario, clients, turns))
+
+
+def _run_hold(port: int, scenario: str, clients: int, release):
+    asyncio.run(_hold(port, scenario, clients, release))
+
+
+# --- Server side ---
+
+
+def _percentiles(samples: List[float], scale: float = 1000.0) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * scale, 3)
+
+    return {
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": round(ordered[-1] * scale, 3),
+    }
+
+
+async def _watch_loop_lag(samples: List[float], interval: float = 0.01):
+    """Records how late the event loop wakes up a sleeping task."""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def _wait_for_active_sessions(
+    emulator: Emulator, count: int, timeout: float = 60.0
+) -> bool:
+    deadline = time.monotonic() + timeout
+    while emulator.stats()["connections_active"] != count:
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def _measure_session_memory(
+    emulator: Emulator, pool: ProcessPoolExecutor, scenario: str, sessions: int
+) -> dict:
+    loop = asyncio.get_running_loop()
+    manager = get_context("spawn").Manager()
+    release = manager.Event()
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    hold = loop.run_in_executor(
+        pool, _run_hold, emulator.port, scenario, sessions, release
+    )
+
+    await _wait_for_active_sessions(emulator, sessions)
+    # Let the last turns be recorded in the sessions' history.
+    await asyncio.sleep(0.2)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    active = emulator.stats()["connections_active"]
+
+    release.set()
+    await hold
+    manager.shutdown()
+    await _wait_for_active_sessions(emulator, 0)
+    return {
+        "sessions": active,
+        "bytes_per_session": round((after - before) / active) if active else None,
+    }
+
+
+async def run_scenario(args: argparse.Namespace, scenario: str) -> dict:
+    """Runs one scenario and returns its results as a dictionary."""
+    config = EmulatorConfig(
+        port=0,
+        max_llm_in_flight=args.max_in_flight,
+        max_llm_queue=max(args.clients * 2, 512),
+        llm_queue_policy="slow-accept",
+    )
+    gateway = _BenchmarkGateway(scenario, args.llm_latency, args.chunks)
+    if args.ttft is not None:
+        # Simulate a provider's timing instead of a fixed delay.
+        gateway = LatencyMockGateway(
+            inner=gateway,
+            time_to_first_token=args.ttft,
+            tokens_per_second=args.tokens_per_second,
+            seed=args.seed,
+        )
+    emulator = Emulator(scenario, gateway, config)
+    await emulator.start()
+
+    lag_samples: List[float] = []
+    lag_watcher = asyncio.create_task(_watch_loop_lag(lag_samples))
+    loop = asyncio.get_running_loop()
+    try:
+        clients = ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"))
+        with clients as pool:
+            # Warm up the client process and the server's code paths.
+            await loop.run_in_executor(pool, _run_swarm, emulator.port, scenario, 4, 2)
+            lag_samples.clear()
+            swarm = await loop.run_in_executor(
+                pool, _run_swarm, emulator.port, scenario, args.clients, args.turns
+            )
+            lag = _percentiles(lag_samples)
+            stats = emulator.stats()
+            await _wait_for_active_sessions(emulator, 0)
+
+            memory = (
+                await _measure_session_memory(
+                    emulator, pool, scenario, args.memory_sessions
+                )
+                if args.memory_sessions
+                else None
+            )
+    finally:
+        lag_watcher.cancel()
+        await emulator.stop()
+
+    return {
+        "scenario": scenario,
+        "clients": args.clients,
+        "turns_per_client": args.turns,
+        "llm_latency_s": args.llm_latency,
+        "ttft_s": args.ttft,
+        "max_llm_in_flight": args.max_in_flight,
+        "duration_s": round(swarm["elapsed"], 3),
+        "turns_completed": len(swarm["turns"]),
+        "turns_per_second": round(len(swarm["turns"]) / swarm["elapsed"], 1),
+        "errors": swarm["errors"],
+        "last_error": swarm["last_error"],
+        "connect_ms": _percentiles(swarm["connect"]),
+        "turn_latency_ms": _percentiles(swarm["turns"]),
+        "loop_lag_ms": lag,
+        "llm_requests": stats["llm_requests"],
+        "memory": memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenario", choices=["http", "shell", "both"], default="both"
+    )
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per client.")
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Seconds the mock gateway waits before answering.",
+    )
+    parser.add_argument(
+        "--chunks", type=int, default=8, help="Chunks each response is streamed in."
+    )
+    parser.add_argument(
+        "--ttft",
+        type=float,
+        help="Median time to first token of a simulated provider, in seconds. "
+        "Replaces --llm-latency and --chunks.",
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument(
+        "--memory-sessions",
+        type=int,
+        default=1000,
+        help="Idle sessions opened to measure memory per session (0 to skip).",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    scenarios = ["http", "shell"] if args.scenario == "both" else [args.scenario]
+    results = {
+        "python": platform.python_version(),
+        "results": [
+            asyncio.run(run_scenario(args, scenario)) for scenario in scenarios
+        ],
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for row in results["results"]:
+        latency = row["turn_latency_ms"]
+        lag = row["loop_lag_ms"]
+        print(
+            f"[{row['scenario']}] {row['clients']} clients x "
+            f"{row['turns_per_client']} turns in {row['duration_s']} s: "
+            f"{row['turns_per_second']} turns/s, {row['errors']} errors"
+        )
+        print(
+            f"  turn latency ms  p50 {latency['p50']}  p95 {latency['p95']}  "
+            f"p99 {latency['p99']}  max {latency['max']}"
+        )
+        print(
+            f"  loop lag ms      p50 {lag['p50']}  p99 {lag['p99']}  "
+            f"max {lag['max']}"
+        )
+        if row["memory"]:
+            print(
+                f"  memory           {row['memory']['bytes_per_session']} bytes "
+                f"per idle session ({row['memory']['sessions']} sessions)"
+            )
+
+
+if __name__ == "__main__":
+    main()
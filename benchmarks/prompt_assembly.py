@@ -0,0 +1,85 @@
+# benchmarks/prompt_assembly.py
+"""
+Micro-benchmark of per-turn prompt assembly as the session history grows.
+
+Measures `ChatProtocolHandler.create_messages_for_llm` for sessions holding an
+increasing number of messages, which is the work every turn does before the
+LLM call. Run from the repository root:
+
+    python -m benchmarks.prompt_assembly
+"""
+
+import argparse
+import json
+import timeit
+
+from llm_emulator.core.config import EmulatorConfig
+from llm_emulator.core.connection import Session
+from llm_emulator.core.protocols.handler import ChatProtocolHandler
+from llm_emulator.core.protocols.service import ServiceDefinition
+from llm_emulator.llm.roles import LLMRole
+from llm_emulator.llm.tokens import TokenCounter
+
+_PAGE = "<html><body>" + "<p>Lorem ipsum dolor sit amet.</p>" * 50 + "</body></html>"
+
+
+def measure(history_size: int, config: EmulatorConfig, repeat: int) -> float:
+    """Returns the mean time, in microseconds, to assemble one prompt."""
+    service_def = ServiceDefinition(
+        name="host a web page",
+        port=80,
+        communication_type="request-response",
+        description="HTTP is the protocol used by web servers.",
+    )
+    # The character estimate keeps the benchmark independent of tokenizer downloads.
+    handler = ChatProtocolHandler(service_def, config, token_counter=TokenCounter())
+    session = Session(
+        client_address=("127.0.0.1", 40000), service_name=service_def.name
+    )
+    for i in range(history_size // 2):
+        session.add_to_history(LLMRole.USER, f"GET /page/{i} HTTP/1.1\r\n\r\n")
+        session.add_to_history(LLMRole.ASSISTANT, _PAGE)
+
+    # Warm up: the first call tokenizes the whole pre-filled history.
+    handler.create_messages_for_llm(session)
+    seconds = timeit.timeit(
+        lambda: handler.create_messages_for_llm(session), number=repeat
+    )
+    return seconds / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[0, 10, 100, 1000, 10000]
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    results = []
+    for prompt_caching in (False, True):
+        config = EmulatorConfig(prompt_caching=prompt_caching)
+        for size in args.sizes:
+            results.append(
+                {
+                    "history_messages": size,
+                    "prompt_caching": prompt_caching,
+                    "us_per_turn": round(measure(size, config, args.repeat), 2),
+                }
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'history':>8} {'caching':>8} {'us/turn':>10}")
+    for row in results:
+        print(
+            f"{row['history_messages']:>8} {str(row['prompt_caching']):>8} "
+            f"{row['us_per_turn']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
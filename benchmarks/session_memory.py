@@ -0,0 +1,80 @@
+# benchmarks/session_memory.py
+"""
+Memory benchmark of idle sessions.
+
+Creates many sessions that each received the same HTML page, as happens when
+many clients fetch the front page of an emulated web server, and reports the
+memory held per session. Run from the repository root:
+
+    python -m benchmarks.session_memory
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from llm_emulator.core.connection import Session
+from llm_emulator.llm.roles import LLMRole
+
+_PAGE_PARTS = [
+    "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n",
+    "<html><body>" + "<p>Welcome to the bank.</p>" * 200 + "</body></html>",
+]
+
+
+def _fresh_page() -> str:
+    # Every LLM response is a distinct string object, even when the text is equal.
+    return "".join(_PAGE_PARTS)
+
+
+def measure(session_count: int) -> dict:
+    """Returns the memory held by `session_count` idle sessions."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    sessions = []
+    for i in range(session_count):
+        session = Session(
+            client_address=(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 40000),
+            service_name="host a web page",
+        )
+        session.add_to_history(LLMRole.USER, "GET / HTTP/1.1\r\nHost: bank\r\n\r\n")
+        session.add_to_history(LLMRole.ASSISTANT, _fresh_page())
+        session.add_to_history(LLMRole.USER, f"GET /account/{i} HTTP/1.1\r\n\r\n")
+        session.add_to_history(LLMRole.ASSISTANT, "HTTP/1.1 404 Not Found\r\n\r\n")
+        sessions.append(session)
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = after - before
+    return {
+        "sessions": session_count,
+        "total_mb": round(total / 1024 / 1024, 2),
+        "bytes_per_session": round(total / session_count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    results = [measure(count) for count in args.sessions]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'sessions':>9} {'total MB':>10} {'bytes/session':>14}")
+    for row in results:
+        print(
+            f"{row['sessions']:>9} {row['total_mb']:>10} "
+            f"{row['bytes_per_session']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
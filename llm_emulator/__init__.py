@@ -9,14 +9,29 @@ allowing for cleaner and more convenient imports.
 
 # Core components for running the emulator
 from .core.emulator import Emulator
+from .core.host import EmulatorHost, ServiceSpec
+from .core.workers import WorkerSupervisor
 from .core.config import EmulatorConfig
+from .core.response_cache import ResponseCache
+from .core.scheduler import LLMScheduler
+from .core.protocols.discovery_cache import DiscoveryCache
+
+# Metrics fed from the hook events, served in the Prometheus text format
+from .utils.metrics import MetricsCollector, MetricsRegistry, MetricsServer
 
 # Main LLM gateway for production use
 from .llm.litellm_gateway import LiteLLMGateway
 
+# Gateway wrappers that can be layered over any gateway
+from .llm.coalescing import CoalescingGateway
+from .llm.recording import RecordingGateway, RecordingStore, ReplayGateway
+from .llm.router import BackendSpec, RouterGateway
+from .llm.hedging import HedgingGateway
+
 # Mock gateways for testing and development
 from .llm.mocks.mock_gateway import MockLLMGateway
 from .llm.mocks.simple_mock_gateway import SimpleMockGateway
+from .llm.mocks.latency_mock_gateway import LatencyMockGateway
 
 # Event constants for subscribing to hooks
 from .events import HookEvents
@@ -25,22 +40,47 @@ from .events import HookEvents
 from .exceptions import (
     EmulatorError,
     LLMConnectionError,
+    LLMRateLimitError,
+    LLMTimeoutError,
     LLMResponseError,
+    LLMQueueFullError,
     ProtocolDiscoveryError,
     NetworkError,
+    MessageTooLargeError,
 )
 
 # Define what gets imported with 'from llm_emulator import *'
 __all__ = [
     "Emulator",
+    "EmulatorHost",
+    "ServiceSpec",
+    "WorkerSupervisor",
     "EmulatorConfig",
+    "ResponseCache",
+    "LLMScheduler",
+    "DiscoveryCache",
+    "MetricsRegistry",
+    "MetricsCollector",
+    "MetricsServer",
     "LiteLLMGateway",
+    "CoalescingGateway",
+    "RecordingStore",
+    "RecordingGateway",
+    "ReplayGateway",
+    "RouterGateway",
+    "BackendSpec",
+    "HedgingGateway",
     "MockLLMGateway",
     "SimpleMockGateway",
+    "LatencyMockGateway",
     "HookEvents",
     "EmulatorError",
     "LLMConnectionError",
+    "LLMRateLimitError",
+    "LLMTimeoutError",
     "LLMResponseError",
+    "LLMQueueFullError",
     "ProtocolDiscoveryError",
     "NetworkError",
+    "MessageTooLargeError",
 ]
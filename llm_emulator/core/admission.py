@@ -0,0 +1,84 @@
+# llm_emulator/core/admission.py
+from typing import Any, Dict, Optional
+
+
+class AdmissionController:
+    """
+    Caps the sessions open at once, in total and per source IP, so that a
+    port scan or a flood of idle clients cannot exhaust sockets, memory or the
+    LLM budget. A refused client is turned away before a session is created,
+    and so before any LLM call.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_connections_per_ip: Optional[int] = None,
+    ):
+        """
+        Initializes the controller.
+
+        Args:
+            max_connections: The most sessions open at once. If None, there is
+                             no limit.
+            max_connections_per_ip: The most sessions open at once from a
+                                    single IP address. If None, there is no
+                                    limit.
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.active = 0
+        self._per_ip: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    @staticmethod
+    def _ip_of(client_address: Optional[tuple]) -> Optional[str]:
+        return client_address[0] if client_address else None
+
+    def admit(self, client_address: Optional[tuple]) -> Optional[str]:
+        """
+        Admits a new session from `client_address` if the limits allow it.
+        Every admitted session must be paired with `release`.
+
+        Returns:
+            None if the session is admitted, otherwise the reason it is not:
+            'max_connections' or 'max_connections_per_ip'.
+        """
+        ip = self._ip_of(client_address)
+        reason = None
+        if self.max_connections is not None and self.active >= self.max_connections:
+            reason = "max_connections"
+        elif (
+            self.max_connections_per_ip is not None
+            and ip is not None
+            and self._per_ip.get(ip, 0) >= self.max_connections_per_ip
+        ):
+            reason = "max_connections_per_ip"
+        if reason is not None:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            return reason
+
+        self.active += 1
+        if ip is not None:
+            self._per_ip[ip] = self._per_ip.get(ip, 0) + 1
+        return None
+
+    def release(self, client_address: Optional[tuple]):
+        """Accounts for the end of a session admitted with `admit`."""
+        self.active -= 1
+        ip = self._ip_of(client_address)
+        if ip is None:
+            return
+        remaining = self._per_ip.get(ip, 0) - 1
+        if remaining > 0:
+            self._per_ip[ip] = remaining
+        else:
+            self._per_ip.pop(ip, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the open sessions, the distinct IPs and the rejections."""
+        return {
+            "active": self.active,
+            "distinct_ips": len(self._per_ip),
+            "rejected": dict(self.rejected),
+        }
@@ -11,5 +11,88 @@ class EmulatorConfig:
     """
 
     port: Optional[int] = None
-    max_history_tokens: int = 20
+    # Tokens of conversation history sent to the LLM (the newest messages win).
+    max_history_tokens: Optional[int] = 8000
+    # Cap on the whole prompt, including the system prompt and custom instructions.
+    max_prompt_tokens: Optional[int] = None
+    # Messages retained per session; older ones are dropped from memory.
+    max_history_messages: Optional[int] = 256
+    # Mark the static prompt prefix for provider-side prompt caching.
+    prompt_caching: bool = False
     custom_instructions: Optional[str] = None
+    # Write LLM output to the client as it is generated, chunk by chunk.
+    stream_responses: bool = True
+    # JSON file caching discovered service definitions across restarts.
+    discovery_cache_path: Optional[str] = None
+    # Ignore any cached service definition and query the LLM again.
+    force_rediscovery: bool = False
+    # Seconds of inactivity after which a UDP peer's pseudo-session is closed.
+    udp_session_idle_timeout: float = 60.0
+    # Datagrams a UDP peer may have waiting for an answer; later ones are
+    # dropped until the backlog drains, so one peer cannot queue unbounded work.
+    udp_max_pending_per_peer: int = 8
+    # How client messages are split: 'auto' (from the service definition),
+    # 'http', 'line', 'length-prefixed', 'idle-gap' or 'raw'.
+    framing: str = "auto"
+    # The largest client message kept; any excess is read and discarded.
+    max_message_size: int = 1024 * 1024
+    # Concurrent LLM requests allowed; the rest wait in a per-client fair queue.
+    max_llm_in_flight: int = 32
+    # Requests allowed to wait for an LLM slot.
+    max_llm_queue: int = 512
+    # What to do when the queue is full: 'reject' or 'slow-accept'.
+    llm_queue_policy: str = "reject"
+    # How hook subscribers are run: 'inline' (inside emit), 'background' (by a
+    # task on the event loop) or 'thread' (sync subscribers in a worker thread).
+    hook_dispatch: str = "inline"
+    # Events allowed to wait for background dispatch.
+    hook_queue_size: int = 10000
+    # When that queue is full: 'drop-newest', 'drop-oldest' or 'inline'.
+    hook_overflow_policy: str = "drop-newest"
+    # Serve Prometheus metrics over HTTP on this port (0 binds an ephemeral
+    # port). If None, no metrics are collected.
+    metrics_port: Optional[int] = None
+    # The interface the metrics endpoint listens on.
+    metrics_host: str = "127.0.0.1"
+    # Sessions open at once per service, in total and per client IP. Clients
+    # beyond them are turned away before any LLM call. None means no limit.
+    max_connections: Optional[int] = None
+    max_connections_per_ip: Optional[int] = None
+    # Seconds a TCP client may take to send its next complete message; this
+    # also cuts off clients that trickle a message byte by byte. UDP peers use
+    # udp_session_idle_timeout instead.
+    idle_timeout: Optional[float] = None
+    # Seconds after which a session is closed, however active it is.
+    session_timeout: Optional[float] = None
+    # Client messages answered per session before it is closed.
+    max_turns_per_session: Optional[int] = None
+    # Read a TCP client's next message while its response is generated, so
+    # that a connection reset cancels the LLM request at once. A clean EOF
+    # does not: a client may half-close the connection after its request. A
+    # client that closed with a FIN is only noticed at the first failed write,
+    # so with a non-streaming backend its whole completion is still paid for.
+    cancel_on_disconnect: bool = True
+    # HTTP requests of one connection answered concurrently when the client
+    # pipelines them; responses are still sent in request order. 1 answers
+    # them one at a time.
+    max_pipelined_requests: int = 1
+    # Bind the listening port with SO_REUSEPORT, so that several processes can
+    # serve it (see WorkerSupervisor).
+    reuse_port: bool = False
+    # Answer messages that need no model (e.g. /favicon.ico, QUIT or an empty
+    # shell line) with the built-in fast-path rules instead of the LLM.
+    fast_path: bool = False
+    # Greetings kept pre-generated per service, so a new connection gets its
+    # banner without waiting for the LLM. 0 disables the pool.
+    greeting_pool_size: int = 0
+    # Greeting requests the pool runs at once while filling up.
+    greeting_pool_concurrency: int = 2
+    # Pre-generate the likely next requests after an HTTP page (its favicon,
+    # linked assets and pages) on spare LLM capacity.
+    speculation: bool = False
+    # Follow-up requests pre-generated per page.
+    speculation_max_per_response: int = 8
+    # Speculative LLM requests running at once, per service.
+    speculation_max_in_flight: int = 4
+    # Speculative responses kept per session.
+    speculation_cache_size: int = 32
@@ -1,33 +1,108 @@
 # llm_emulator/core/connection.py
 import asyncio
 import logging
+import time
 import uuid
+from collections import deque
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import List, Dict, Any, TYPE_CHECKING
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 from ..events import HookEvents
+from ..exceptions import LLMQueueFullError, MessageTooLargeError
 from ..llm.roles import LLMRole
+from ..utils.interning import content_pool
 
 if TYPE_CHECKING:
-    from ..llm.base import LLMInterface
     from ..protocols.service import ServiceDefinition
     from ..core.config import EmulatorConfig
     from ..protocols.handler import ChatProtocolHandler
     from ..utils.hooks import HookManager
+    from .framing import MessageFramer
+    from .greetings import GreetingPool
+    from .pipeline import ResponsePipeline
+    from .speculation import Speculator
+    from .stats import ServiceStats
 
 log = logging.getLogger(__name__)
 
 
+class HistoryEntry:
+    """A single message in a session's history."""
+
+    __slots__ = ("role", "content", "timestamp", "tokens")
+
+    def __init__(
+        self, role: str, content: str, timestamp: float, tokens: Optional[int]
+    ):
+        self.role = role
+        self.content = content
+        # Seconds since the epoch, as returned by time.time().
+        self.timestamp = timestamp
+        self.tokens = tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the entry as a dictionary, with an ISO 8601 timestamp."""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(
+                self.timestamp, timezone.utc
+            ).isoformat(),
+            "tokens": self.tokens,
+        }
+
+
 class Session:
-    """A data container for a single client connection's state."""
+    """
+    A data container for a single client connection's state.
+
+    Sessions are kept compact so that tens of thousands can be idle at once:
+    the history is a ring buffer holding at most `max_history` messages,
+    timestamps are plain floats, and large message contents are shared with
+    other sessions through the process-wide content pool.
+    """
+
+    __slots__ = (
+        "session_id",
+        "client_address",
+        "service_name",
+        "history",
+        "is_active",
+        "start_time",
+        "_window_start",
+        "_window_tokens",
+        "_counted",
+    )
 
-    def __init__(self, client_address: tuple, service_name: str):
+    def __init__(
+        self,
+        client_address: tuple,
+        service_name: str,
+        max_history: Optional[int] = None,
+    ):
         self.session_id = str(uuid.uuid4())
         self.client_address = client_address
         self.service_name = service_name
-        self.history: List[Dict[str, Any]] = []
+        self.history: Deque[HistoryEntry] = deque(maxlen=max_history)
         self.is_active = True
-        self.start_time = datetime.now(timezone.utc)
+        # Seconds since the epoch, as returned by time.time().
+        self.start_time = time.time()
+        # Sliding token window over the history, advanced incrementally.
+        self._window_start = 0
+        self._window_tokens = 0
+        self._counted = 0
 
     def __repr__(self):
         return (
@@ -36,19 +111,62 @@ class Session:
         )
 
     def get_history(self) -> List[Dict[str, Any]]:
-        """Returns the full conversation history."""
-        return self.history
-
-    def add_to_history(self, role: LLMRole, content: str):
-        """Adds a new message to the session's history."""
-        self.history.append(
-            {
-                "role": role.value,
-                "content": content,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+        """Returns the retained conversation history as dictionaries."""
+        return [entry.to_dict() for entry in self.history]
+
+    def add_to_history(
+        self, role: LLMRole, content: str, tokens: Optional[int] = None
+    ):
+        """
+        Adds a new message to the session's history. Its token count may be
+        given up front; otherwise it is computed when the window is next built.
+        Once the history is full, the oldest message is dropped.
+        """
+        history = self.history
+        if history.maxlen is not None and len(history) == history.maxlen:
+            # The oldest entry is about to fall off; keep the window consistent.
+            if self._window_start > 0:
+                self._window_start -= 1
+            elif self._counted > 0:
+                self._window_tokens -= history[0].tokens
+            if self._counted > 0:
+                self._counted -= 1
+
+        history.append(
+            HistoryEntry(role.value, content_pool.intern(content), time.time(), tokens)
         )
 
+    def get_window(
+        self, token_budget: Optional[int], count_tokens: Callable[[str], int]
+    ) -> List[HistoryEntry]:
+        """
+        Returns the most recent messages that fit in `token_budget` tokens.
+        The latest message is always included, even if it alone exceeds it.
+
+        Each message is tokenized once, and the window only ever slides forward,
+        so the cost per turn does not grow with the length of the history.
+        """
+        history = self.history
+        while self._counted < len(history):
+            entry = history[self._counted]
+            if entry.tokens is None:
+                entry.tokens = count_tokens(entry.content)
+            self._window_tokens += entry.tokens
+            self._counted += 1
+
+        if token_budget is not None:
+            while (
+                self._window_tokens > token_budget
+                and self._window_start < len(history) - 1
+            ):
+                self._window_tokens -= history[self._window_start].tokens
+                self._window_start += 1
+
+        # Taken from the right end, so the cost depends on the window only.
+        window = list(islice(reversed(history), len(history) - self._window_start))
+        window.reverse()
+        return window
+
 
 class ConnectionHandler:
     """
@@ -60,108 +178,452 @@ class ConnectionHandler:
         self,
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
-        llm_interface: "LLMInterface",
         service_def: "ServiceDefinition",
         config: "EmulatorConfig",
         hooks: "HookManager",
         protocol_handler: "ChatProtocolHandler",
+        pipeline: "ResponsePipeline",
+        framer: "MessageFramer",
+        stats: "ServiceStats | None" = None,
+        speculator: "Speculator | None" = None,
+        greetings: "GreetingPool | None" = None,
+        max_pipelined_requests: int = 1,
     ):
         self.reader = reader
         self.writer = writer
-        self.llm_interface = llm_interface
         self.service_def = service_def
         self.config = config
         self.hooks = hooks
         self.protocol_handler = protocol_handler
+        self.pipeline = pipeline
+        self.framer = framer
+        self.stats = stats
+        self.speculator = speculator
+        self.greetings = greetings
+        # Requests of a pipelining client answered concurrently; see
+        # `_serve_pipelined`. 1 answers them one at a time.
+        self.max_pipelined_requests = max(max_pipelined_requests, 1)
+        self.lookahead = speculator.create_cache() if speculator else None
         self.session: Session | None = None
 
-    async def manage_connection(self):
-        """Manages the read/write loop for the client connection."""
-        addr = self.writer.get_extra_info("peername")
-        self.session = Session(client_address=addr, service_name=self.service_def.name)
-        self.hooks.emit(HookEvents.CONNECTION_OPENED, session=self.session)
+    async def _send_llm_response(
+        self, messages: List[Dict[str, str]], client_message: Optional[str] = None
+    ) -> str:
+        """
+        Requests a response from the pipeline and writes it to the client.
+        `client_message` is the client message answered, if any.
 
-        try:
-            # --- Initial Server-First Interaction ---
+        Each formatted chunk is written as soon as it is produced instead of
+        waiting for the whole completion.
+
+        Returns:
+            The complete formatted response, as it was sent to the client.
+        """
+        started_at = time.monotonic()
+        first_byte_at = None
+        sent_parts = []
+        async with aclosing(
+            self.pipeline.stream_response(
+                self.session, messages, client_message=client_message
+            )
+        ) as chunks:
+            async for chunk in chunks:
+                if first_byte_at is None:
+                    first_byte_at = time.monotonic()
+                sent_parts.append(chunk)
+                self.writer.write(chunk.encode())
+                await self.writer.drain()
+
+        finished_at = time.monotonic()
+        llm_response = "".join(sent_parts)
+        self.hooks.emit(
+            HookEvents.MESSAGE_SENT,
+            session=self.session,
+            data=llm_response.encode(),
+            time_to_first_byte=(first_byte_at or finished_at) - started_at,
+            duration=finished_at - started_at,
+        )
+        return llm_response
+
+    async def _send_greeting(self) -> str:
+        """
+        Writes the server's greeting to a new client, from the greeting pool
+        when it has one ready, and returns it.
+        """
+        greeting = self.greetings.take() if self.greetings is not None else None
+        if greeting is None:
             initial_messages = self.protocol_handler.create_messages_for_llm(
                 session=self.session
             )
+            return await self._send_llm_response(initial_messages)
+
+        started_at = time.monotonic()
+        self.writer.write(greeting.encode())
+        await self.writer.drain()
+        if self.stats:
+            self.stats.greeting_pool_hits += 1
+        self.hooks.emit(
+            HookEvents.MESSAGE_SENT,
+            session=self.session,
+            data=greeting.encode(),
+            time_to_first_byte=0.0,
+            duration=time.monotonic() - started_at,
+        )
+        return greeting
+
+    async def _send_speculative_response(self, client_message: str) -> Optional[str]:
+        """
+        Writes the speculative response to a client message, if one was
+        prepared, and returns it. Returns None if there is none.
+        """
+        started_at = time.monotonic()
+        response = await self._take_speculative_response(client_message)
+        if response is not None:
+            await self._write_response(response, started_at)
+        return response
+
+    async def _take_speculative_response(self, client_message: str) -> Optional[str]:
+        """Returns the speculative response to a client message, if any."""
+        started_at = time.monotonic()
+        response = await self.speculator.take(self.lookahead, client_message)
+        if response is not None:
             self.hooks.emit(
-                HookEvents.LLM_REQUEST, session=self.session, messages=initial_messages
+                HookEvents.SPECULATION_HIT,
+                session=self.session,
+                response=response,
+                waited=time.monotonic() - started_at,
+            )
+        return response
+
+    async def _write_response(self, response: str, started_at: float):
+        """
+        Writes a complete response to the client and emits MESSAGE_SENT, timed
+        from `started_at`, when the client message was received.
+        """
+        first_byte_at = time.monotonic()
+        data = response.encode()
+        self.writer.write(data)
+        await self.writer.drain()
+        self.hooks.emit(
+            HookEvents.MESSAGE_SENT,
+            session=self.session,
+            data=data,
+            time_to_first_byte=first_byte_at - started_at,
+            duration=time.monotonic() - started_at,
+        )
+
+    async def _answer(self, client_message: str, pending: bool = False) -> str:
+        """
+        Writes the response to a client message, the speculative one if it
+        was prepared, and returns it.
+
+        Args:
+            client_message: The client message to answer.
+            pending: Whether the message is not in the session's history yet.
+        """
+        llm_response = None
+        if self.speculator is not None:
+            llm_response = await self._send_speculative_response(client_message)
+        if llm_response is None:
+            messages = self.protocol_handler.create_messages_for_llm(
+                session=self.session,
+                pending_message=client_message if pending else None,
             )
+            llm_response = await self._send_llm_response(messages, client_message)
+        return llm_response
 
-            raw_llm_response = await self.llm_interface.generate_response(
-                initial_messages
+    async def _generate(self, client_message: str) -> str:
+        """
+        Returns the response to a client message that is not in the session's
+        history yet, without writing it.
+        """
+        llm_response = None
+        if self.speculator is not None:
+            llm_response = await self._take_speculative_response(client_message)
+        if llm_response is None:
+            messages = self.protocol_handler.create_messages_for_llm(
+                session=self.session, pending_message=client_message
             )
-            llm_response = self.protocol_handler.format_response_from_llm(
-                raw_llm_response
+            llm_response = await self.pipeline.generate_response(
+                self.session, messages, client_message=client_message
             )
+        return llm_response
 
-            self.hooks.emit(
-                HookEvents.LLM_RESPONSE, session=self.session, response=llm_response
+    def _commit_turn(self, client_message: str, llm_response: str):
+        """Adds a client message, once answered, and its response to history."""
+        self.session.add_to_history(role=LLMRole.USER, content=client_message)
+        self.session.add_to_history(role=LLMRole.ASSISTANT, content=llm_response)
+        if self.speculator is not None:
+            self.speculator.speculate(
+                self.session, self.lookahead, client_message, llm_response
             )
 
-            self.writer.write(llm_response.encode())
-            await self.writer.drain()
-            self.hooks.emit(
-                HookEvents.MESSAGE_SENT,
-                session=self.session,
-                data=llm_response.encode(),
+    async def _respond(
+        self,
+        response: Coroutine[Any, Any, str],
+        next_read: Optional[asyncio.Task],
+    ) -> str:
+        """
+        Runs `response`, the sending of a response, while `next_read` reads
+        the client's next message. If that read fails, e.g. because the
+        connection was reset, the response and the LLM work behind it are
+        cancelled. A clean EOF does not cancel it: the client may only have
+        closed its sending side after its request, and still expects the
+        response.
+
+        Returns:
+            The response that was sent.
+        """
+        if next_read is None:
+            return await response
+        responding = asyncio.ensure_future(response)
+        try:
+            await asyncio.wait(
+                (responding, next_read), return_when=asyncio.FIRST_COMPLETED
             )
+            if not responding.done() and next_read.exception() is not None:
+                responding.cancel()
+                await asyncio.wait((responding,))
+                # Re-raises the error of the read, e.g. a connection reset.
+                next_read.result()
+            return await responding
+        finally:
+            responding.cancel()
+
+    async def _serve_pipelined(self, next_read: Optional[asyncio.Task]) -> str:
+        """
+        Serves a client that may pipeline its requests, answering up to
+        `max_pipelined_requests` of them at once.
+
+        Requests are read as they arrive. One received while no other is
+        pending is answered as usual, streaming its response; the ones queued
+        behind it are generated concurrently and written in full, in request
+        order. Each is answered in the context of the responses already sent,
+        and the history is updated in request order as responses go out.
+        The requests queued ahead of one and their answers in flight are not
+        part of its prompt, so they cannot push it past the token budget; its
+        own message is counted against the budget as it is built.
+        A client that closes its sending side still gets the responses to all
+        the requests it sent.
+
+        Args:
+            next_read: The read of the next client message, if already started.
+
+        Returns:
+            Why the conversation ended, as for `_converse`.
+        """
+        config = self.config
+        # The requests being answered, oldest first: the message, when it was
+        # received, the task answering it and whether it writes the response.
+        in_flight: Deque[Tuple[str, float, asyncio.Task, bool]] = deque()
+        turns = 0
+        reason = "client_closed"
+
+        def read_next() -> Optional[asyncio.Task]:
+            nonlocal reason
+            max_turns = config.max_turns_per_session
+            if max_turns is not None and turns >= max_turns:
+                reason = "turn_limit"
+                return None
+            return asyncio.create_task(self.framer.read_message(self.reader))
+
+        try:
+            if next_read is None:
+                next_read = read_next()
+            while in_flight or next_read is not None:
+                if not in_flight:
+                    try:
+                        async with asyncio.timeout(config.idle_timeout):
+                            await asyncio.wait((next_read,))
+                    except TimeoutError:
+                        return "idle_timeout"
+                else:
+                    waiting = [in_flight[0][2]]
+                    if next_read is not None and not next_read.done():
+                        waiting.append(next_read)
+                    await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                # Send the responses that are ready, in request order.
+                while in_flight and in_flight[0][2].done():
+                    client_message, received_at, task, writes = in_flight.popleft()
+                    llm_response = task.result()
+                    if not writes:
+                        await self._write_response(llm_response, received_at)
+                    self._commit_turn(client_message, llm_response)
+                    if not self.session.is_active:
+                        # The requests pipelined behind it go unanswered.
+                        return "client_quit"
+
+                if next_read is None or not next_read.done():
+                    continue
+                data = next_read.result()
+                if data is None:
+                    # The client has sent its last request; answer the rest.
+                    next_read = None
+                    continue
+                if len(in_flight) >= self.max_pipelined_requests:
+                    # Hold the request until a response has gone out.
+                    continue
+                received_at = time.monotonic()
+
+                turns += 1
+                if self.stats:
+                    self.stats.messages_received += 1
+                client_message = data.decode(errors="ignore")
+                self.hooks.emit(
+                    HookEvents.MESSAGE_RECEIVED, session=self.session, data=data
+                )
+                # Only a request with none ahead of it may write as it goes.
+                writes = not in_flight
+                answer = (
+                    self._answer(client_message, pending=True)
+                    if writes
+                    else self._generate(client_message)
+                )
+                task = asyncio.create_task(answer)
+                in_flight.append((client_message, received_at, task, writes))
+                next_read = read_next()
+            return reason
+        finally:
+            tasks = [entry[2] for entry in in_flight]
+            if next_read is not None:
+                tasks.append(next_read)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _converse(self) -> str:
+        """
+        Runs the conversation: the server's greeting, then one response per
+        client message, until the client leaves or a session limit is hit.
+
+        With `config.cancel_on_disconnect`, the client's next message is read
+        while a response is generated, so that a connection reset cancels the
+        response at once instead of after it has been paid for.
+
+        Returns:
+            Why the conversation ended: 'client_closed', 'client_quit' (a
+            response ended the session, e.g. the reply to QUIT),
+            'idle_timeout' or 'turn_limit'.
+        """
+        config = self.config
+        next_read: asyncio.Task | None = None
+
+        def read_ahead() -> Optional[asyncio.Task]:
+            if not config.cancel_on_disconnect:
+                return None
+            return asyncio.create_task(self.framer.read_message(self.reader))
+
+        try:
+            # --- Initial Server-First Interaction ---
+            next_read = read_ahead()
+            llm_response = await self._respond(self._send_greeting(), next_read)
 
             # Add the assistant's first message to the history.
             self.session.add_to_history(role=LLMRole.ASSISTANT, content=llm_response)
 
+            if self.max_pipelined_requests > 1:
+                return await self._serve_pipelined(next_read)
+
             # --- Main Loop for Subsequent Client Messages ---
-            while self.session.is_active:
-                data = await self.reader.read(4096)
-                if not data:
+            turns = 0
+            while True:
+                if (
+                    config.max_turns_per_session is not None
+                    and turns >= config.max_turns_per_session
+                ):
+                    return "turn_limit"
+                if next_read is None:
+                    next_read = asyncio.create_task(
+                        self.framer.read_message(self.reader)
+                    )
+                try:
+                    # The timeout covers the whole message, so a client
+                    # trickling it byte by byte is cut off as well.
+                    async with asyncio.timeout(config.idle_timeout):
+                        data = await next_read
+                except TimeoutError:
+                    return "idle_timeout"
+                if data is None:
                     break
+                turns += 1
 
+                if self.stats:
+                    self.stats.messages_received += 1
                 client_message = data.decode(errors="ignore")
                 self.hooks.emit(
                     HookEvents.MESSAGE_RECEIVED, session=self.session, data=data
                 )
                 self.session.add_to_history(role=LLMRole.USER, content=client_message)
 
-                messages = self.protocol_handler.create_messages_for_llm(
-                    session=self.session
-                )
-                self.hooks.emit(
-                    HookEvents.LLM_REQUEST, session=self.session, messages=messages
-                )
-
-                raw_llm_response = await self.llm_interface.generate_response(messages)
-                llm_response = self.protocol_handler.format_response_from_llm(
-                    raw_llm_response
-                )
-
-                self.hooks.emit(
-                    HookEvents.LLM_RESPONSE, session=self.session, response=llm_response
+                next_read = read_ahead()
+                llm_response = await self._respond(
+                    self._answer(client_message), next_read
                 )
 
                 self.session.add_to_history(
                     role=LLMRole.ASSISTANT, content=llm_response
                 )
-                self.writer.write(llm_response.encode())
-                await self.writer.drain()
-                self.hooks.emit(
-                    HookEvents.MESSAGE_SENT,
-                    session=self.session,
-                    data=llm_response.encode(),
-                )
+                if not self.session.is_active:
+                    return "client_quit"
+                if self.speculator is not None:
+                    self.speculator.speculate(
+                        self.session, self.lookahead, client_message, llm_response
+                    )
+            return "client_closed"
+        finally:
+            if next_read is not None:
+                next_read.cancel()
+
+    async def manage_connection(self):
+        """Manages the read/write loop for the client connection."""
+        addr = self.writer.get_extra_info("peername")
+        self.session = Session(
+            client_address=addr,
+            service_name=self.service_def.name,
+            max_history=self.config.max_history_messages,
+        )
+        self.hooks.emit(HookEvents.CONNECTION_OPENED, session=self.session)
 
+        # Why the session ended, as reported with CONNECTION_CLOSED.
+        close_reason = "cancelled"
+        try:
+            async with asyncio.timeout(self.config.session_timeout):
+                close_reason = await self._converse()
+        except TimeoutError:
+            close_reason = "session_timeout"
         except (ConnectionResetError, BrokenPipeError) as e:
+            close_reason = "connection_lost"
             log.warning(f"Connection lost for {self.session.client_address}: {e}")
+        except LLMQueueFullError as e:
+            close_reason = "llm_queue_full"
+            log.warning(f"Dropping connection for {self.session.client_address}: {e}")
+        except MessageTooLargeError as e:
+            close_reason = "message_too_large"
+            log.warning(f"Dropping connection for {self.session.client_address}: {e}")
         except Exception as e:
+            close_reason = "error"
+            if self.stats:
+                self.stats.errors += 1
             log.error(
                 f"An error occurred in connection handler for {self.session.client_address}: {e}",
                 exc_info=True,
             )
         finally:
-            log.info(f"Closing connection for {self.session.client_address}")
+            log.info(
+                f"Closing connection for {self.session.client_address} "
+                f"({close_reason})"
+            )
+            if self.lookahead is not None:
+                self.lookahead.close()
             self.writer.close()
-            await self.writer.wait_closed()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                # The client is gone already; the session still has to end.
+                pass
             if self.session:
                 self.session.is_active = False
-            self.hooks.emit(HookEvents.CONNECTION_CLOSED, session=self.session)
+            self.hooks.emit(
+                HookEvents.CONNECTION_CLOSED, session=self.session, reason=close_reason
+            )
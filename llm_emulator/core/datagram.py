@@ -0,0 +1,232 @@
+# llm_emulator/core/datagram.py
+import asyncio
+import logging
+import time
+from typing import Dict, Set, Tuple, TYPE_CHECKING
+
+from ..events import HookEvents
+from ..llm.roles import LLMRole
+from .connection import Session
+
+if TYPE_CHECKING:
+    from .admission import AdmissionController
+    from .config import EmulatorConfig
+    from .pipeline import ResponsePipeline
+    from .protocols.handler import ChatProtocolHandler
+    from .protocols.service import ServiceDefinition
+    from .stats import ServiceStats
+    from ..utils.hooks import HookManager
+
+log = logging.getLogger(__name__)
+
+# The largest payload a single UDP datagram can carry over IPv4.
+_MAX_DATAGRAM_SIZE = 65507
+
+
+class _Peer:
+    """The pseudo-session state of a single UDP peer."""
+
+    __slots__ = ("session", "lock", "opened_at", "last_activity", "pending", "turns")
+
+    def __init__(self, session: Session):
+        self.session = session
+        # Serializes the turns of one peer so its history stays ordered.
+        self.lock = asyncio.Lock()
+        self.opened_at = self.last_activity = time.monotonic()
+        self.pending = 0
+        self.turns = 0
+
+
+class DatagramServer(asyncio.DatagramProtocol):
+    """
+    Serves a connectionless (UDP) service.
+
+    Each peer address gets a pseudo-session that lives until the peer has been
+    idle for `config.udp_session_idle_timeout` seconds, or for
+    `config.session_timeout` seconds in total. Every datagram is one client
+    message and is answered with one datagram, up to
+    `config.max_turns_per_session`; later ones are dropped. Peers are served
+    concurrently; only the datagrams of the same peer are answered in order,
+    and those arriving while `config.udp_max_pending_per_peer` of them are
+    already waiting are dropped.
+    """
+
+    def __init__(
+        self,
+        service_def: "ServiceDefinition",
+        config: "EmulatorConfig",
+        hooks: "HookManager",
+        protocol_handler: "ChatProtocolHandler",
+        pipeline: "ResponsePipeline",
+        stats: "ServiceStats | None" = None,
+        admission: "AdmissionController | None" = None,
+    ):
+        self.service_def = service_def
+        self.config = config
+        self.hooks = hooks
+        self.protocol_handler = protocol_handler
+        self.pipeline = pipeline
+        self.stats = stats
+        self.admission = admission
+        self.transport: asyncio.DatagramTransport | None = None
+        self._peers: Dict[Tuple, _Peer] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._expiry_task: asyncio.Task | None = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+        self._expiry_task = asyncio.get_running_loop().create_task(
+            self._expire_idle_peers()
+        )
+
+    def datagram_received(self, data: bytes, addr: Tuple):
+        peer = self._peers.get(addr)
+        if peer is None:
+            reason = None
+            scheduler = self.pipeline.scheduler
+            if scheduler and scheduler.is_saturated and scheduler.policy == "reject":
+                reason = "llm_queue_full"
+            elif self.admission is not None:
+                reason = self.admission.admit(addr)
+            if reason is not None:
+                # Drop datagrams from new peers before they cost an LLM call.
+                if self.stats:
+                    self.stats.connections_rejected += 1
+                self.hooks.emit(
+                    HookEvents.CONNECTION_REJECTED,
+                    client_address=addr,
+                    service=self.service_def.name,
+                    reason=reason,
+                )
+                return
+
+            session = Session(
+                client_address=addr,
+                service_name=self.service_def.name,
+                max_history=self.config.max_history_messages,
+            )
+            peer = _Peer(session)
+            self._peers[addr] = peer
+            if self.stats:
+                self.stats.connections_total += 1
+                self.stats.connections_active += 1
+            self.hooks.emit(HookEvents.CONNECTION_OPENED, session=peer.session)
+
+        max_turns = self.config.max_turns_per_session
+        if max_turns is not None and peer.turns >= max_turns:
+            # The session is spent; it closes once it goes idle.
+            self._drop(peer, "turn_limit")
+            return
+        if peer.pending >= self.config.udp_max_pending_per_peer:
+            self._drop(peer, "peer_queue_full")
+            return
+        peer.turns += 1
+        peer.last_activity = time.monotonic()
+        peer.pending += 1
+        task = asyncio.get_running_loop().create_task(self._answer(peer, data, addr))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _drop(self, peer: _Peer, reason: str):
+        """Accounts a datagram left unanswered."""
+        if self.stats:
+            self.stats.messages_dropped += 1
+        self.hooks.emit(HookEvents.MESSAGE_DROPPED, session=peer.session, reason=reason)
+
+    def error_received(self, exc: Exception):
+        log.warning(f"UDP error on '{self.service_def.name}': {exc}")
+
+    async def _answer(self, peer: _Peer, data: bytes, addr: Tuple):
+        """Generates and sends the response to a single datagram."""
+        session = peer.session
+        received_at = time.monotonic()
+        try:
+            async with peer.lock:
+                if self.stats:
+                    self.stats.messages_received += 1
+                self.hooks.emit(HookEvents.MESSAGE_RECEIVED, session=session, data=data)
+                client_message = data.decode(errors="ignore")
+                session.add_to_history(role=LLMRole.USER, content=client_message)
+
+                messages = self.protocol_handler.create_messages_for_llm(
+                    session=session
+                )
+                llm_response = await self.pipeline.generate_response(
+                    session, messages, client_message=client_message
+                )
+                session.add_to_history(role=LLMRole.ASSISTANT, content=llm_response)
+
+                payload = llm_response.encode()
+                if len(payload) > _MAX_DATAGRAM_SIZE:
+                    log.warning(
+                        f"Truncating a {len(payload)}-byte response to {addr} "
+                        "to fit in one datagram."
+                    )
+                    payload = payload[:_MAX_DATAGRAM_SIZE]
+
+                if self.transport is not None and not self.transport.is_closing():
+                    self.transport.sendto(payload, addr)
+                    # The answer leaves in one datagram: its first byte is its last.
+                    elapsed = time.monotonic() - received_at
+                    self.hooks.emit(
+                        HookEvents.MESSAGE_SENT,
+                        session=session,
+                        data=payload,
+                        time_to_first_byte=elapsed,
+                        duration=elapsed,
+                    )
+        except Exception as e:
+            if self.stats:
+                self.stats.errors += 1
+            log.error(
+                f"An error occurred answering UDP peer {addr}: {e}", exc_info=True
+            )
+        finally:
+            peer.pending -= 1
+            peer.last_activity = time.monotonic()
+
+    async def _expire_idle_peers(self):
+        """
+        Periodically closes the pseudo-sessions of idle peers, and of the
+        peers that have outlived `config.session_timeout`.
+        """
+        idle_timeout = self.config.udp_session_idle_timeout
+        session_timeout = self.config.session_timeout
+        interval = idle_timeout
+        if session_timeout is not None:
+            interval = min(interval, session_timeout)
+        while True:
+            await asyncio.sleep(max(interval / 2, 0.1))
+            now = time.monotonic()
+            for addr, peer in list(self._peers.items()):
+                if peer.pending:
+                    continue
+                if now - peer.last_activity >= idle_timeout:
+                    self._close_peer(addr, "idle_timeout")
+                elif (
+                    session_timeout is not None
+                    and now - peer.opened_at >= session_timeout
+                ):
+                    self._close_peer(addr, "session_timeout")
+
+    def _close_peer(self, addr: Tuple, reason: str):
+        peer = self._peers.pop(addr)
+        peer.session.is_active = False
+        if self.admission is not None:
+            self.admission.release(addr)
+        if self.stats:
+            self.stats.connections_active -= 1
+        self.hooks.emit(
+            HookEvents.CONNECTION_CLOSED, session=peer.session, reason=reason
+        )
+
+    async def close(self):
+        """Stops serving, cancelling pending answers and closing all sessions."""
+        tasks = [*self._tasks, *filter(None, [self._expiry_task])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for addr in list(self._peers):
+            self._close_peer(addr, "stopped")
+        if self.transport is not None:
+            self.transport.close()
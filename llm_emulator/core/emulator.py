@@ -1,15 +1,28 @@
 # llm_emulator/core/emulator.py
 import asyncio
 import logging
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Dict, Optional, TYPE_CHECKING
 
 from ..events import HookEvents
 from ..llm.base import LLMInterface
+from ..llm.tokens import TokenCounter
 from .protocols.discovery import ProtocolDiscoverer
+from .protocols.discovery_cache import DiscoveryCache
 from .protocols.handler import ChatProtocolHandler
 from ..core.config import EmulatorConfig
 from ..utils.hooks import HookManager
+from ..utils.metrics import MetricsCollector, MetricsRegistry, MetricsServer
+from .admission import AdmissionController
 from .connection import ConnectionHandler
+from .datagram import DatagramServer
+from .fastpath import FastPathResponder
+from .framing import HttpFramer, create_framer
+from .greetings import GreetingPool
+from .pipeline import ResponsePipeline
+from .response_cache import ResponseCache
+from .scheduler import LLMScheduler
+from .speculation import Speculator
+from .stats import ServiceStats
 
 if TYPE_CHECKING:
     from .protocols.service import ServiceDefinition
@@ -26,6 +39,12 @@ class Emulator:
         service_name: str,
         llm_interface: LLMInterface,
         config: Optional[EmulatorConfig] = None,
+        response_cache: Optional[ResponseCache] = None,
+        hooks: Optional[HookManager] = None,
+        discovery_cache: Optional[DiscoveryCache] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        fast_path: Optional[FastPathResponder] = None,
+        service_def: Optional["ServiceDefinition"] = None,
     ):
         """
         Initializes the Emulator.
@@ -34,6 +53,20 @@ class Emulator:
             service_name: The name of the service to emulate (e.g., 'http').
             llm_interface: An instance of a class that implements LLMInterface.
             config: An optional configuration object. If None, default settings are used.
+            response_cache: An optional cache of LLM responses shared by all
+                            sessions. If None, every turn calls the LLM.
+            hooks: An optional hook manager, to share one event bus between
+                   emulators. If None, a new one is created.
+            discovery_cache: An optional discovery cache, to share one between
+                             emulators. If None, one is created from
+                             `config.discovery_cache_path` when it is set.
+            scheduler: An optional LLM scheduler, to share one concurrency limit
+                       between emulators. If None, one is created from the config.
+            fast_path: Optional rules answering messages without the LLM. If
+                       None, the built-in rules are used when `config.fast_path`
+                       is set.
+            service_def: An optional, already discovered service definition.
+                         If None, the service is discovered on start.
         """
         if not service_name:
             raise ValueError("service_name cannot be empty.")
@@ -41,50 +74,242 @@ class Emulator:
         self.llm_interface = llm_interface
         # If no config is provided, create a default one.
         self.config = config or EmulatorConfig()
+        self.response_cache = response_cache
+        self.discovery_cache = discovery_cache
+        if self.discovery_cache is None and self.config.discovery_cache_path:
+            self.discovery_cache = DiscoveryCache(self.config.discovery_cache_path)
+        self.scheduler = scheduler or LLMScheduler(
+            max_in_flight=self.config.max_llm_in_flight,
+            max_queue=self.config.max_llm_queue,
+            policy=self.config.llm_queue_policy,
+        )
+        self.fast_path = fast_path
+        if self.fast_path is None and self.config.fast_path:
+            self.fast_path = FastPathResponder.with_default_rules()
+        self.greetings: GreetingPool | None = None
+        self.admission = AdmissionController(
+            max_connections=self.config.max_connections,
+            max_connections_per_ip=self.config.max_connections_per_ip,
+        )
         self.server: asyncio.Server | None = None
-        self.hooks = HookManager()
-        self.service_def: "ServiceDefinition" | None = None
+        self.datagram_server: DatagramServer | None = None
+        # A hook manager created here is also closed here; a shared one is
+        # left to its owner.
+        self._owns_hooks = hooks is None
+        self.hooks = hooks or HookManager(
+            dispatch=self.config.hook_dispatch,
+            max_queue=self.config.hook_queue_size,
+            overflow=self.config.hook_overflow_policy,
+        )
+        self.service_def: "ServiceDefinition" | None = service_def
+        self.port: int | None = None
+        self._stats = ServiceStats()
+
+        # Metrics are collected from the hooks as soon as the emulator exists,
+        # and served once it starts.
+        self.metrics: MetricsRegistry | None = None
+        self.metrics_server: MetricsServer | None = None
+        if self.config.metrics_port is not None:
+            self.metrics = MetricsRegistry()
+            collector = MetricsCollector(
+                self.metrics,
+                # Estimated from lengths: the hooks may run on the event loop.
+                token_counter=TokenCounter(),
+                service=self.service_name,
+            )
+            collector.subscribe(self.hooks)
+            collector.watch_scheduler(self.scheduler)
+            collector.watch_hooks(self.hooks)
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                host=self.config.metrics_host,
+                port=self.config.metrics_port,
+            )
 
     async def start(self):
         """Starts the emulator server."""
-        log.info(f"Discovering protocol details for '{self.service_name}'...")
-        discoverer = ProtocolDiscoverer(self.llm_interface)
-        self.service_def = await discoverer.discover(self.service_name)
-        log.info(f"Discovered service details: {self.service_def}")
+        if self.service_def is None:
+            log.info(f"Discovering protocol details for '{self.service_name}'...")
+            discoverer = ProtocolDiscoverer(
+                self.llm_interface, cache=self.discovery_cache
+            )
+            self.service_def = await discoverer.discover(
+                self.service_name, force_refresh=self.config.force_rediscovery
+            )
+            log.info(f"Discovered service details: {self.service_def}")
+
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
 
-        port = self.config.port or self.service_def.port
+        # An explicit port of 0 binds an ephemeral port.
+        port = (
+            self.config.port if self.config.port is not None else self.service_def.port
+        )
         host = "0.0.0.0"
 
         protocol_handler = ChatProtocolHandler(
-            service_def=self.service_def, config=self.config
+            service_def=self.service_def,
+            config=self.config,
+            token_counter=TokenCounter(self.llm_interface.model_name),
+        )
+        pipeline = ResponsePipeline(
+            llm_interface=self.llm_interface,
+            protocol_handler=protocol_handler,
+            config=self.config,
+            hooks=self.hooks,
+            response_cache=self.response_cache,
+            stats=self._stats,
+            scheduler=self.scheduler,
+            fast_path=self.fast_path,
+        )
+
+        if self.service_def.transport_protocol.lower() == "udp":
+            loop = asyncio.get_running_loop()
+            transport, self.datagram_server = await loop.create_datagram_endpoint(
+                lambda: DatagramServer(
+                    service_def=self.service_def,
+                    config=self.config,
+                    hooks=self.hooks,
+                    protocol_handler=protocol_handler,
+                    pipeline=pipeline,
+                    stats=self._stats,
+                    admission=self.admission,
+                ),
+                local_addr=(host, port),
+                reuse_port=self.config.reuse_port or None,
+            )
+            self.port = transport.get_extra_info("sockname")[1]
+            self.hooks.emit(
+                HookEvents.EMULATOR_STARTED,
+                host=host,
+                port=self.port,
+                service=self.service_def.name,
+            )
+            return
+
+        if self.config.greeting_pool_size > 0:
+            self.greetings = GreetingPool(
+                pipeline=pipeline,
+                protocol_handler=protocol_handler,
+                service_name=self.service_name,
+                size=self.config.greeting_pool_size,
+                refill_concurrency=self.config.greeting_pool_concurrency,
+            )
+
+        framer = create_framer(self.service_def, self.config)
+        speculator = None
+        if self.config.speculation and isinstance(framer, HttpFramer):
+            speculator = Speculator(
+                pipeline=pipeline,
+                protocol_handler=protocol_handler,
+                max_per_response=self.config.speculation_max_per_response,
+                max_in_flight=self.config.speculation_max_in_flight,
+                cache_size=self.config.speculation_cache_size,
+                stats=self._stats,
+            )
+
+        # Only HTTP requests are answered concurrently when pipelined.
+        max_pipelined_requests = (
+            self.config.max_pipelined_requests if isinstance(framer, HttpFramer) else 1
         )
 
         async def handle_connection(
             reader: asyncio.StreamReader, writer: asyncio.StreamWriter
         ):
             """Callback to handle a new client connection."""
-            handler = ConnectionHandler(
-                reader=reader,
-                writer=writer,
-                llm_interface=self.llm_interface,
-                service_def=self.service_def,
-                config=self.config,
-                hooks=self.hooks,
-                protocol_handler=protocol_handler,
-            )
-            await handler.manage_connection()
+            client_address = writer.get_extra_info("peername")
+            reason = self.admission.admit(client_address)
+            if reason is not None:
+                # Refuse the connection before a session or an LLM call exists.
+                self._stats.connections_rejected += 1
+                self.hooks.emit(
+                    HookEvents.CONNECTION_REJECTED,
+                    client_address=client_address,
+                    service=self.service_name,
+                    reason=reason,
+                )
+                writer.close()
+                return
+            try:
+                if self.scheduler.is_saturated:
+                    if self.scheduler.policy == "reject":
+                        # Refuse the connection before it costs an LLM call.
+                        self._stats.connections_rejected += 1
+                        self.hooks.emit(
+                            HookEvents.CONNECTION_REJECTED,
+                            client_address=client_address,
+                            service=self.service_name,
+                            reason="llm_queue_full",
+                        )
+                        writer.close()
+                        return
+                    await self.scheduler.wait_for_capacity()
 
-        self.server = await asyncio.start_server(handle_connection, host, port)
+                self._stats.connections_total += 1
+                self._stats.connections_active += 1
+                handler = ConnectionHandler(
+                    reader=reader,
+                    writer=writer,
+                    service_def=self.service_def,
+                    config=self.config,
+                    hooks=self.hooks,
+                    protocol_handler=protocol_handler,
+                    pipeline=pipeline,
+                    framer=framer,
+                    stats=self._stats,
+                    speculator=speculator,
+                    greetings=self.greetings,
+                    max_pipelined_requests=max_pipelined_requests,
+                )
+                try:
+                    await handler.manage_connection()
+                finally:
+                    self._stats.connections_active -= 1
+            finally:
+                self.admission.release(client_address)
+
+        self.server = await asyncio.start_server(
+            handle_connection, host, port, reuse_port=self.config.reuse_port or None
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.greetings is not None:
+            # Clients connecting before a greeting is ready get a generated one.
+            log.info(f"Pre-generating {self.greetings.size} greetings...")
+            self.greetings.start()
         self.hooks.emit(
             HookEvents.EMULATOR_STARTED,
             host=host,
-            port=port,
+            port=self.port,
             service=self.service_def.name,
         )
 
     async def stop(self):
         """Stops the emulator server."""
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.greetings is not None:
+            await self.greetings.close()
+        if self.datagram_server:
+            await self.datagram_server.close()
+            self.datagram_server = None
+            self.hooks.emit(HookEvents.EMULATOR_STOPPED, service=self.service_name)
         if self.server:
             self.server.close()
             await self.server.wait_closed()
-            self.hooks.emit(HookEvents.EMULATOR_STOPPED)
+            self.hooks.emit(HookEvents.EMULATOR_STOPPED, service=self.service_name)
+        # Deliver the events still queued for background dispatch.
+        if self._owns_hooks:
+            await self.hooks.aclose()
+        else:
+            await self.hooks.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the running counters for this service."""
+        stats = self._stats.to_dict()
+        stats["port"] = self.port
+        if self.fast_path is not None:
+            stats["fast_path"] = self.fast_path.stats()
+        if self.greetings is not None:
+            stats["greeting_pool"] = self.greetings.stats()
+        stats["admission"] = self.admission.stats()
+        return stats
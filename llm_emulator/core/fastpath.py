@@ -0,0 +1,283 @@
+# llm_emulator/core/fastpath.py
+import logging
+from collections import Counter
+from email.utils import formatdate
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from ..llm.roles import LLMRole
+from .speculation import http_header, request_key, split_http_message
+
+if TYPE_CHECKING:
+    from .connection import Session
+
+log = logging.getLogger(__name__)
+
+# A rule gets the session and a client message, which may already be the last
+# entry of the session's history. It returns the response to send, or None to
+# let the next rule, and finally the LLM, handle the message. A rule ends the
+# session by returning its response as a `ClosingResponse`.
+FastPathRule = Callable[["Session", str], Optional[str]]
+
+# Rules registered under this family apply to every protocol.
+ANY_PROTOCOL = "*"
+
+
+class ClosingResponse(str):
+    """
+    A fast-path response after which the server ends the session, e.g. the
+    reply to `QUIT`. It is sent like any other response, then the connection
+    is closed.
+    """
+
+
+class FastPathResponder:
+    """
+    Answers the client messages that do not need a model, such as a
+    `/favicon.ico` request or `QUIT`, with deterministic responses, saving
+    their LLM round-trip.
+
+    Rules are registered per protocol family (see
+    `ServiceDefinition.protocol_family`) and tried in registration order
+    before the LLM is called; the first one returning a response wins. Every
+    hit is counted per rule, so the calls saved can be measured.
+    """
+
+    def __init__(
+        self, rules: Optional[Dict[str, List[Tuple[str, FastPathRule]]]] = None
+    ):
+        """
+        Initializes the responder.
+
+        Args:
+            rules: Named rules per protocol family. If None, no rule is set;
+                   use `with_default_rules` for the built-in ones.
+        """
+        self._rules: Dict[str, List[Tuple[str, FastPathRule]]] = {}
+        for family, family_rules in (rules or {}).items():
+            for name, rule in family_rules:
+                self.add_rule(family, name, rule)
+        self.hits: Counter = Counter()
+        self.misses = 0
+
+    @classmethod
+    def with_default_rules(cls) -> "FastPathResponder":
+        """Creates a responder with the built-in rules of `DEFAULT_RULES`."""
+        return cls(DEFAULT_RULES)
+
+    def add_rule(self, family: str, name: str, rule: FastPathRule):
+        """
+        Registers a rule after the existing ones.
+
+        Args:
+            family: The protocol family it applies to, e.g. 'http', or
+                    `ANY_PROTOCOL`.
+            name: A name for the rule in stats and events.
+            rule: The rule; see `FastPathRule`.
+        """
+        self._rules.setdefault(family, []).append((name, rule))
+
+    def respond(
+        self, family: str, session: "Session", message: str
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Applies the rules of `family` to a client message.
+
+        Returns:
+            The name of the rule that answered and its response, or None if
+            the message needs the LLM.
+        """
+        answer = self._match(family, session, message)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits[answer[0]] += 1
+        return answer
+
+    def answers(self, family: str, session: "Session", message: str) -> bool:
+        """
+        Returns whether a rule of `family` answers a message, e.g. one that is
+        only predicted, without counting it in the stats.
+        """
+        return self._match(family, session, message) is not None
+
+    def _match(
+        self, family: str, session: "Session", message: str
+    ) -> Optional[Tuple[str, str]]:
+        rules = self._rules.get(family, []) + self._rules.get(ANY_PROTOCOL, [])
+        for name, rule in rules:
+            try:
+                response = rule(session, message)
+            except Exception as e:
+                log.warning(f"Fast-path rule '{name}' failed: {e}")
+                continue
+            if response is not None:
+                return name, response
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the hits per rule and the messages left to the LLM."""
+        return {"hits": dict(self.hits), "misses": self.misses}
+
+
+# --- Built-in rules ---
+
+_USER = LLMRole.USER.value
+_ASSISTANT = LLMRole.ASSISTANT.value
+
+
+def _previous_responses(session: "Session") -> Iterator[Tuple[str, str]]:
+    """Yields the (client message, response) pairs of a session, newest first."""
+    history = list(session.history)
+    for i in range(len(history) - 1, 0, -1):
+        request, response = history[i - 1], history[i]
+        if request.role == _USER and response.role == _ASSISTANT:
+            yield request.content, response.content
+
+
+def _http_response(
+    session: "Session",
+    request: str,
+    status: str,
+    body: str = "",
+    headers: Tuple[str, ...] = (),
+) -> str:
+    """
+    Builds an HTTP response in the request's HTTP version, reusing the
+    `Server` header of the pages already served so that it stays consistent.
+    """
+    version = request.lstrip().split("\n", 1)[0].split(" ", 2)[2].strip()
+    lines = [f"{version} {status}", f"Date: {formatdate(usegmt=True)}"]
+    for _, response in _previous_responses(session):
+        server = http_header(split_http_message(response)[0], "server")
+        if server:
+            lines.append(f"Server: {server}")
+            break
+    lines.extend(headers)
+    if body or not status.startswith("204"):
+        lines.append(f"Content-Length: {len(body.encode())}")
+    return "\r\n".join(lines) + "\r\n\r\n" + body
+
+
+def _http_target(message: str, method: str) -> Optional[str]:
+    key = request_key(message)
+    if key is None:
+        return None
+    request_method, _, target = key.partition(" ")
+    return target.split("?", 1)[0] if request_method == method else None
+
+
+def http_options(session: "Session", message: str) -> Optional[str]:
+    """Answers OPTIONS requests with the methods the emulator accepts."""
+    if _http_target(message, "OPTIONS") is None:
+        return None
+    return _http_response(
+        session,
+        message,
+        "204 No Content",
+        headers=("Allow: GET, HEAD, POST, OPTIONS",),
+    )
+
+
+def http_head(session: "Session", message: str) -> Optional[str]:
+    """Answers HEAD requests for paths already served with the same headers."""
+    key = request_key(message)
+    if key is None or not key.startswith("HEAD "):
+        return None
+    wanted = "GET " + key[len("HEAD ") :]
+    for request, response in _previous_responses(session):
+        if request_key(request) == wanted:
+            return split_http_message(response)[0] + "\r\n\r\n"
+    return None
+
+
+def http_favicon(session: "Session", message: str) -> Optional[str]:
+    """Answers requests for `/favicon.ico` as a site without one would."""
+    if _http_target(message, "GET") != "/favicon.ico":
+        return None
+    return _http_response(
+        session, message, "404 Not Found", "Not Found", ("Content-Type: text/plain",)
+    )
+
+
+def http_robots(session: "Session", message: str) -> Optional[str]:
+    """Answers requests for `/robots.txt` with a file allowing everything."""
+    if _http_target(message, "GET") != "/robots.txt":
+        return None
+    return _http_response(
+        session,
+        message,
+        "200 OK",
+        "User-agent: *\nDisallow:\n",
+        ("Content-Type: text/plain",),
+    )
+
+
+def http_source_map(session: "Session", message: str) -> Optional[str]:
+    """Answers requests for JavaScript and CSS source maps, which are absent."""
+    target = _http_target(message, "GET")
+    if target is None or not target.endswith(".map"):
+        return None
+    return _http_response(
+        session, message, "404 Not Found", "Not Found", ("Content-Type: text/plain",)
+    )
+
+
+def shell_empty_line(session: "Session", message: str) -> Optional[str]:
+    """Answers an empty command line with the last prompt, as a shell does."""
+    if message.strip():
+        return None
+    for entry in reversed(session.history):
+        if entry.role == _ASSISTANT:
+            return entry.content.rsplit("\n", 1)[-1] or "$ "
+    return "$ "
+
+
+def _command(message: str) -> str:
+    return message.strip().split(" ", 1)[0].upper()
+
+
+def smtp_quit(session: "Session", message: str) -> Optional[str]:
+    """Answers the SMTP QUIT command and ends the session."""
+    if _command(message) != "QUIT":
+        return None
+    return ClosingResponse("221 2.0.0 Bye\r\n")
+
+
+def smtp_noop(session: "Session", message: str) -> Optional[str]:
+    """Answers the SMTP NOOP command."""
+    return "250 2.0.0 OK\r\n" if _command(message) == "NOOP" else None
+
+
+def ftp_quit(session: "Session", message: str) -> Optional[str]:
+    """Answers the FTP QUIT command and ends the session."""
+    if _command(message) != "QUIT":
+        return None
+    return ClosingResponse("221 Goodbye.\r\n")
+
+
+def ftp_noop(session: "Session", message: str) -> Optional[str]:
+    """Answers the FTP NOOP command."""
+    return "200 NOOP ok.\r\n" if _command(message) == "NOOP" else None
+
+
+DEFAULT_RULES: Dict[str, List[Tuple[str, FastPathRule]]] = {
+    "http": [
+        ("http_options", http_options),
+        ("http_head", http_head),
+        ("http_favicon", http_favicon),
+        ("http_robots", http_robots),
+        ("http_source_map", http_source_map),
+    ],
+    "shell": [("shell_empty_line", shell_empty_line)],
+    "smtp": [("smtp_quit", smtp_quit), ("smtp_noop", smtp_noop)],
+    "ftp": [("ftp_quit", ftp_quit), ("ftp_noop", ftp_noop)],
+}
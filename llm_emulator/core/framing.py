@@ -0,0 +1,252 @@
+# llm_emulator/core/framing.py
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional, TYPE_CHECKING
+
+from ..exceptions import MessageTooLargeError
+
+if TYPE_CHECKING:
+    from .config import EmulatorConfig
+    from .protocols.service import ServiceDefinition
+
+log = logging.getLogger(__name__)
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    """
+    Reads up to and including the next newline. Returns the partial line at
+    EOF (b"" if nothing was left), or the buffered data if the line is longer
+    than the reader's limit.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        return await reader.read(e.consumed)
+
+
+async def _read_body(reader: asyncio.StreamReader, length: int, limit: int) -> bytes:
+    """
+    Reads exactly `length` bytes, keeping at most `limit` of them. The excess is
+    consumed and discarded so the stream stays aligned on message boundaries.
+    """
+    parts = []
+    kept = 0
+    remaining = length
+    while remaining > 0:
+        data = await reader.read(min(remaining, 65536))
+        if not data:
+            break
+        remaining -= len(data)
+        if kept < limit:
+            data = data[: limit - kept]
+            parts.append(data)
+            kept += len(data)
+    return b"".join(parts)
+
+
+class MessageFramer(ABC):
+    """
+    Splits the byte stream of a connection into complete client messages,
+    so that every message triggers exactly one LLM call.
+    """
+
+    def __init__(self, max_message_size: int = 1024 * 1024):
+        self.max_message_size = max_message_size
+
+    @abstractmethod
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        """
+        Reads the next complete message from the stream.
+
+        Returns:
+            The raw bytes of the message, or None once the client has closed
+            the connection and no data is left.
+        """
+        pass
+
+
+class RawFramer(MessageFramer):
+    """Treats every read from the socket as one message."""
+
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        data = await reader.read(4096)
+        return data or None
+
+
+class LineFramer(MessageFramer):
+    """Frames newline-terminated messages, as sent by shells and text protocols."""
+
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        line = await _read_line(reader)
+        return line or None
+
+
+class LengthPrefixedFramer(MessageFramer):
+    """
+    Frames messages preceded by a big-endian length header. The header is
+    kept in the returned message.
+    """
+
+    def __init__(self, prefix_size: int = 4, max_message_size: int = 1024 * 1024):
+        super().__init__(max_message_size)
+        self.prefix_size = prefix_size
+
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        try:
+            prefix = await reader.readexactly(self.prefix_size)
+        except asyncio.IncompleteReadError as e:
+            return e.partial or None
+
+        length = int.from_bytes(prefix, "big")
+        if length > self.max_message_size:
+            log.warning(
+                f"Length-prefixed message of {length} bytes exceeds the "
+                f"{self.max_message_size}-byte limit; truncating it."
+            )
+        return prefix + await _read_body(reader, length, self.max_message_size)
+
+
+class HttpFramer(MessageFramer):
+    """
+    Frames HTTP/1.x requests: the header block, followed by a body delimited
+    by Content-Length or chunked transfer encoding. Pipelined requests are
+    split apart and a request spread over several segments is reassembled.
+
+    A header block larger than `max_message_size` raises MessageTooLargeError:
+    unlike an oversized body, it has no known end to skip to.
+    """
+
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        # Read the request line and headers up to the first empty line,
+        # skipping any empty lines sent before the request line.
+        head_lines = []
+        head_size = 0
+        while True:
+            line = await _read_line(reader)
+            if not line:
+                break
+            if line.strip(b"\r\n"):
+                head_lines.append(line)
+                head_size += len(line)
+                if head_size > self.max_message_size:
+                    raise MessageTooLargeError(
+                        f"HTTP request header exceeds the "
+                        f"{self.max_message_size}-byte limit."
+                    )
+            elif head_lines:
+                head_lines.append(line)
+                break
+        if not head_lines:
+            return None
+
+        head = b"".join(head_lines)
+        content_length = 0
+        chunked = False
+        for header in head_lines[1:]:
+            name, _, value = header.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                try:
+                    content_length = int(value.strip())
+                except ValueError:
+                    content_length = 0
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+
+        if chunked:
+            return head + await self._read_chunked_body(reader)
+        return head + await _read_body(reader, content_length, self.max_message_size)
+
+    async def _read_chunked_body(self, reader: asyncio.StreamReader) -> bytes:
+        """Reads a chunked body, including the chunk framing and trailers."""
+        parts = []
+        size = 0
+        while True:
+            size_line = await _read_line(reader)
+            if not size_line:
+                break
+            parts.append(size_line)
+            try:
+                chunk_size = int(size_line.split(b";")[0].strip(), 16)
+            except ValueError:
+                break
+
+            if chunk_size == 0:
+                # The last chunk is followed by optional trailers and an empty line.
+                while True:
+                    trailer = await _read_line(reader)
+                    parts.append(trailer)
+                    if not trailer.strip(b"\r\n"):
+                        break
+                break
+
+            budget = max(self.max_message_size - size, 0)
+            chunk = await _read_body(reader, chunk_size, budget)
+            parts.append(chunk)
+            parts.append(await _read_line(reader))
+            size += len(chunk)
+        return b"".join(parts)
+
+
+class IdleGapFramer(MessageFramer):
+    """
+    A fallback for protocols without explicit delimiters: a message is
+    everything the client sends until it pauses for `gap` seconds.
+    """
+
+    def __init__(self, gap: float = 0.05, max_message_size: int = 1024 * 1024):
+        super().__init__(max_message_size)
+        self.gap = gap
+
+    async def read_message(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        data = await reader.read(4096)
+        if not data:
+            return None
+
+        parts = [data]
+        size = len(data)
+        while size < self.max_message_size:
+            try:
+                data = await asyncio.wait_for(reader.read(4096), self.gap)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            parts.append(data)
+            size += len(data)
+        return b"".join(parts)
+
+
+FRAMERS = {
+    "raw": RawFramer,
+    "line": LineFramer,
+    "length-prefixed": LengthPrefixedFramer,
+    "http": HttpFramer,
+    "idle-gap": IdleGapFramer,
+}
+
+
+def create_framer(
+    service_def: "ServiceDefinition", config: "EmulatorConfig"
+) -> MessageFramer:
+    """
+    Selects the framer for a service. An explicit `config.framing` wins,
+    then the framing reported by discovery, and finally a guess based on the
+    protocol family and communication type.
+    """
+    framing = config.framing
+    if framing == "auto":
+        framing = service_def.framing
+    if framing not in FRAMERS:
+        if service_def.protocol_family == "http":
+            framing = "http"
+        elif service_def.communication_type == "interactive-stream":
+            framing = "line"
+        else:
+            framing = "idle-gap"
+
+    log.debug(f"Using '{framing}' framing for '{service_def.name}'.")
+    return FRAMERS[framing](max_message_size=config.max_message_size)
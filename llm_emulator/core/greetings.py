@@ -0,0 +1,140 @@
+# llm_emulator/core/greetings.py
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, TYPE_CHECKING
+
+from .connection import Session
+
+if TYPE_CHECKING:
+    from .pipeline import ResponsePipeline
+    from .protocols.handler import ChatProtocolHandler
+
+log = logging.getLogger(__name__)
+
+# Sent after the initial message, so that each pooled greeting is a distinct
+# request (neither cached nor coalesced) and varies where a real one would.
+_VARIATION_HINT = (
+    "[Connection #{number}. Where a real server's greeting differs between "
+    "connections, e.g. in timestamps or session identifiers, vary those "
+    "details; keep everything else the same.]"
+)
+
+
+class GreetingPool:
+    """
+    A pool of pre-generated greetings for one service, so that the banner of a
+    server-first protocol (SSH, FTP, SMTP...) is sent the moment a client
+    connects instead of after an LLM round-trip.
+
+    The pool is filled in the background once `start` is called, and refilled
+    as greetings are taken, with at most `refill_concurrency` requests at once.
+    Refills are speculative: they only run on spare LLM slots, and when there
+    is none, or a request fails, refilling resumes on the next `take`. When the
+    pool is empty, `take` returns None and the greeting is generated as usual.
+    """
+
+    def __init__(
+        self,
+        pipeline: "ResponsePipeline",
+        protocol_handler: "ChatProtocolHandler",
+        service_name: str,
+        size: int = 8,
+        refill_concurrency: int = 2,
+    ):
+        """
+        Initializes the pool. It stays empty until `start`, `fill` or `take`
+        is called.
+
+        Args:
+            pipeline: The pipeline generating the greetings.
+            protocol_handler: Builds the prompts of the greetings.
+            service_name: The service the greetings are for.
+            size: The number of greetings kept ready.
+            refill_concurrency: Greeting requests running at once.
+        """
+        self.pipeline = pipeline
+        self.protocol_handler = protocol_handler
+        self.size = size
+        self.refill_concurrency = max(refill_concurrency, 1)
+        # Greetings are generated outside any client session.
+        self._session = Session(client_address=None, service_name=service_name)
+        self._greetings: Deque[str] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._generated = 0
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._greetings)
+
+    def start(self):
+        """Starts filling the pool in the background, without waiting for it."""
+        self._refill()
+
+    async def fill(self):
+        """Fills the pool and waits until it is full or a request fails."""
+        self._refill()
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    def take(self) -> Optional[str]:
+        """
+        Returns a greeting for a new connection, or None if the pool is empty.
+        Either way, the pool is topped up in the background.
+        """
+        if self._greetings:
+            greeting = self._greetings.popleft()
+            self.hits += 1
+        else:
+            greeting = None
+            self.misses += 1
+        self._refill()
+        return greeting
+
+    def _refill(self):
+        while (
+            not self._closed
+            and len(self._tasks) < self.refill_concurrency
+            and len(self._greetings) + len(self._tasks) < self.size
+        ):
+            task = asyncio.create_task(self._generate())
+            self._tasks.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            log.debug(f"Could not pre-generate a greeting: {task.exception()}")
+            return
+        self._refill()
+
+    async def _generate(self):
+        self._generated += 1
+        messages = self.protocol_handler.create_messages_for_llm(
+            self._session,
+            pending_message=_VARIATION_HINT.format(number=self._generated),
+        )
+        # Each prompt is unique, so caching it would only evict useful entries.
+        greeting = await self.pipeline.generate_response(
+            self._session, messages, speculative=True, use_cache=False
+        )
+        if not self._closed:
+            self._greetings.append(greeting)
+
+    async def close(self):
+        """Stops refilling and cancels the greeting requests in flight."""
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks))
+        self._greetings.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the pool's size and how often it had a greeting ready."""
+        return {"ready": len(self._greetings), "hits": self.hits, "misses": self.misses}
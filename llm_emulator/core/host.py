@@ -0,0 +1,150 @@
+# llm_emulator/core/host.py
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Union
+
+from ..exceptions import EmulatorError
+from ..llm.base import LLMInterface
+from ..llm.tokens import TokenCounter
+from ..utils.hooks import HookManager
+from ..utils.metrics import MetricsCollector, MetricsRegistry, MetricsServer
+from .config import EmulatorConfig
+from .emulator import Emulator
+from .protocols.discovery_cache import DiscoveryCache
+from .response_cache import ResponseCache
+from .scheduler import LLMScheduler
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ServiceSpec:
+    """
+    Describes one service hosted by an EmulatorHost.
+    """
+
+    service_name: str
+    # Per-service settings. If None, the host's default config is used.
+    config: Optional[EmulatorConfig] = None
+
+
+class EmulatorHost:
+    """
+    Hosts many emulated services from one process and one event loop.
+
+    Every service gets its own listener, but they all share the LLM gateway,
+    the LLM scheduler, the response cache, the discovery cache and the hook
+    bus, so the cost of an additional service is one listening socket and one
+    prompt formatter.
+    """
+
+    def __init__(
+        self,
+        services: List[Union[ServiceSpec, str]],
+        llm_interface: LLMInterface,
+        config: Optional[EmulatorConfig] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
+        """
+        Initializes the host.
+
+        Args:
+            services: The services to emulate, as ServiceSpec objects or plain
+                      service names.
+            llm_interface: The LLM gateway shared by every service.
+            config: The default configuration for services without their own.
+            response_cache: An optional response cache shared by every service.
+        """
+        if not services:
+            raise ValueError("services cannot be empty.")
+
+        self.config = config or EmulatorConfig()
+        self.llm_interface = llm_interface
+        self.response_cache = response_cache
+        self.hooks = HookManager(
+            dispatch=self.config.hook_dispatch,
+            max_queue=self.config.hook_queue_size,
+            overflow=self.config.hook_overflow_policy,
+        )
+        self.discovery_cache = (
+            DiscoveryCache(self.config.discovery_cache_path)
+            if self.config.discovery_cache_path
+            else None
+        )
+        # All services share the gateway, so they also share its concurrency limit.
+        self.scheduler = LLMScheduler(
+            max_in_flight=self.config.max_llm_in_flight,
+            max_queue=self.config.max_llm_queue,
+            policy=self.config.llm_queue_policy,
+        )
+
+        # One metrics endpoint covers every service, labelled by service name.
+        self.metrics: MetricsRegistry | None = None
+        self.metrics_server: MetricsServer | None = None
+        service_config = self.config
+        if self.config.metrics_port is not None:
+            self.metrics = MetricsRegistry()
+            # Token counts are estimated from lengths: the hooks may run on
+            # the event loop.
+            collector = MetricsCollector(self.metrics, token_counter=TokenCounter())
+            collector.subscribe(self.hooks)
+            collector.watch_scheduler(self.scheduler)
+            collector.watch_hooks(self.hooks)
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                host=self.config.metrics_host,
+                port=self.config.metrics_port,
+            )
+            service_config = replace(self.config, metrics_port=None)
+
+        self.emulators: Dict[str, Emulator] = {}
+        for spec in services:
+            if isinstance(spec, str):
+                spec = ServiceSpec(service_name=spec)
+            if spec.service_name in self.emulators:
+                raise ValueError(f"Duplicate service '{spec.service_name}'.")
+            self.emulators[spec.service_name] = Emulator(
+                service_name=spec.service_name,
+                llm_interface=llm_interface,
+                config=spec.config or service_config,
+                response_cache=response_cache,
+                hooks=self.hooks,
+                discovery_cache=self.discovery_cache,
+                scheduler=self.scheduler,
+            )
+
+    async def start(self):
+        """
+        Discovers and starts every service concurrently. A service that fails
+        to start is logged and skipped; an error is raised only if none start.
+        """
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+
+        names = list(self.emulators)
+        results = await asyncio.gather(
+            *(self.emulators[name].start() for name in names), return_exceptions=True
+        )
+
+        failures = 0
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                failures += 1
+                log.error(f"Failed to start service '{name}': {result}")
+
+        if failures == len(names):
+            raise EmulatorError("None of the hosted services could be started.")
+
+    async def stop(self):
+        """Stops every running service."""
+        await asyncio.gather(
+            *(emulator.stop() for emulator in self.emulators.values())
+        )
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.hooks.aclose()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the running counters of every service, keyed by service name."""
+        return {name: emulator.stats() for name, emulator in self.emulators.items()}
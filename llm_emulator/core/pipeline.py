@@ -0,0 +1,227 @@
+# llm_emulator/core/pipeline.py
+import asyncio
+import time
+from contextlib import aclosing, nullcontext
+from typing import AsyncIterator, Dict, List, Optional, TYPE_CHECKING
+
+from ..events import HookEvents
+from .fastpath import ClosingResponse
+
+if TYPE_CHECKING:
+    from ..llm.base import LLMInterface
+    from .config import EmulatorConfig
+    from .connection import Session
+    from .fastpath import FastPathResponder
+    from .protocols.handler import ChatProtocolHandler
+    from .response_cache import ResponseCache
+    from .scheduler import LLMScheduler
+    from .stats import ServiceStats
+    from ..utils.hooks import HookManager
+
+
+class ResponsePipeline:
+    """
+    Turns the messages of a session turn into the formatted response sent to
+    the client: it tries the fast-path rules and the response cache, calls the
+    LLM (streaming when enabled), formats the output and emits the related
+    hooks.
+
+    The pipeline is transport-agnostic and shared by every session of a
+    service, whether it is served over TCP or UDP.
+    """
+
+    def __init__(
+        self,
+        llm_interface: "LLMInterface",
+        protocol_handler: "ChatProtocolHandler",
+        config: "EmulatorConfig",
+        hooks: "HookManager",
+        response_cache: "ResponseCache | None" = None,
+        stats: "ServiceStats | None" = None,
+        scheduler: "LLMScheduler | None" = None,
+        fast_path: "FastPathResponder | None" = None,
+    ):
+        self.llm_interface = llm_interface
+        self.protocol_handler = protocol_handler
+        self.config = config
+        self.hooks = hooks
+        self.response_cache = response_cache
+        self.stats = stats
+        self.scheduler = scheduler
+        self.fast_path = fast_path
+        self._protocol_family = protocol_handler.service_def.protocol_family
+
+    async def stream_response(
+        self,
+        session: "Session",
+        messages: List[Dict[str, str]],
+        speculative: bool = False,
+        client_message: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Yields the formatted response for `messages` chunk by chunk.
+
+        The fast-path rules only apply when `client_message`, the message a
+        client actually sent, is given; greetings and speculative requests go
+        without. A fast-path or cached response is yielded as a single chunk.
+        A fast-path `ClosingResponse` also marks the session inactive, so that
+        the connection is closed once it has been sent.
+        Otherwise, when streaming is enabled, each formatted chunk is yielded
+        as soon as the LLM produces it.
+
+        With `use_cache` off, the response cache is neither read nor filled,
+        e.g. for one-off prompts that could never be asked again.
+
+        A speculative request, made before the client asked for it, only runs
+        on a spare LLM slot and raises LLMQueueFullError if there is none.
+
+        If the consumer is cancelled, or closes the generator, while the LLM is
+        still generating, the LLM request is cancelled with it and LLM_CANCELLED
+        is emitted with the part of the response produced so far.
+        """
+        if self.fast_path is not None and client_message is not None:
+            answer = self.fast_path.respond(
+                self._protocol_family, session, client_message
+            )
+            if answer is not None:
+                rule, response = answer
+                if isinstance(response, ClosingResponse):
+                    session.is_active = False
+                if self.stats:
+                    self.stats.fast_path_hits += 1
+                self.hooks.emit(
+                    HookEvents.FAST_PATH_HIT,
+                    session=session,
+                    rule=rule,
+                    response=response,
+                )
+                yield response
+                return
+
+        response_cache = self.response_cache if use_cache else None
+        if response_cache is not None:
+            cached_response = self.response_cache.get(messages)
+            if cached_response is not None:
+                if self.stats:
+                    self.stats.cache_hits += 1
+                self.hooks.emit(
+                    HookEvents.RESPONSE_CACHE_HIT,
+                    session=session,
+                    response=cached_response,
+                    hits=self.response_cache.hits,
+                    misses=self.response_cache.misses,
+                )
+                yield cached_response
+                return
+
+            self.hooks.emit(
+                HookEvents.RESPONSE_CACHE_MISS,
+                session=session,
+                hits=self.response_cache.hits,
+                misses=self.response_cache.misses,
+            )
+
+        # LLM calls are queued per client IP, so one client cannot starve others.
+        client_key = session.client_address[0] if session.client_address else None
+        queued_at = time.monotonic()
+        if self.scheduler is None:
+            llm_slot = nullcontext()
+        elif speculative:
+            llm_slot = self.scheduler.spare_slot()
+        else:
+            llm_slot = self.scheduler.slot(client_key)
+        async with llm_slot:
+            if self.stats:
+                self.stats.llm_requests += 1
+            started_at = time.monotonic()
+            queue_wait = started_at - queued_at
+            self.hooks.emit(
+                HookEvents.LLM_REQUEST,
+                session=session,
+                messages=messages,
+                queue_wait=queue_wait,
+                speculative=speculative,
+            )
+            first_chunk_at = None
+            sent_parts = []
+
+            try:
+                if self.config.stream_responses:
+                    formatter = self.protocol_handler.create_response_formatter()
+                    # Closing the LLM stream promptly stops a cancelled completion.
+                    async with aclosing(
+                        self.llm_interface.stream_response(messages)
+                    ) as chunks:
+                        async for chunk in chunks:
+                            if first_chunk_at is None:
+                                first_chunk_at = time.monotonic()
+                            formatted_chunk = formatter.feed(chunk)
+                            if formatted_chunk:
+                                sent_parts.append(formatted_chunk)
+                                yield formatted_chunk
+                    final_chunk = formatter.finish()
+                    if final_chunk:
+                        sent_parts.append(final_chunk)
+                        yield final_chunk
+                    llm_response = "".join(sent_parts)
+                else:
+                    raw_llm_response = await self.llm_interface.generate_response(
+                        messages
+                    )
+                    first_chunk_at = time.monotonic()
+                    llm_response = self.protocol_handler.format_response_from_llm(
+                        raw_llm_response
+                    )
+                    sent_parts.append(llm_response)
+                    yield llm_response
+            except (asyncio.CancelledError, GeneratorExit):
+                if self.stats:
+                    self.stats.llm_cancelled += 1
+                self.hooks.emit(
+                    HookEvents.LLM_CANCELLED,
+                    session=session,
+                    partial_response="".join(sent_parts),
+                    latency=time.monotonic() - started_at,
+                    speculative=speculative,
+                )
+                raise
+            finished_at = time.monotonic()
+
+        if response_cache is not None:
+            self.response_cache.put(messages, llm_response)
+
+        self.hooks.emit(
+            HookEvents.LLM_RESPONSE,
+            session=session,
+            response=llm_response,
+            queue_wait=queue_wait,
+            latency=finished_at - started_at,
+            time_to_first_chunk=(first_chunk_at or finished_at) - started_at,
+        )
+
+    async def generate_response(
+        self,
+        session: "Session",
+        messages: List[Dict[str, str]],
+        speculative: bool = False,
+        client_message: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Returns the complete formatted response for `messages`."""
+        chunks = [
+            chunk
+            async for chunk in self.stream_response(
+                session, messages, speculative, client_message, use_cache
+            )
+        ]
+        return "".join(chunks)
+
+    def has_fast_path_answer(self, session: "Session", client_message: str) -> bool:
+        """
+        Returns whether a fast-path rule would answer `client_message`, without
+        accounting it as a hit or a miss.
+        """
+        if self.fast_path is None:
+            return False
+        return self.fast_path.answers(self._protocol_family, session, client_message)
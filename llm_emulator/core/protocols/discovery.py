@@ -2,9 +2,10 @@
 
 import logging
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from .service import ServiceDefinition
+from .discovery_cache import DiscoveryCache
 from ...llm.base import LLMInterface
 from ...llm.roles import LLMRole
 from ...exceptions import ProtocolDiscoveryError
@@ -17,8 +18,14 @@ class ProtocolDiscoverer:
     Responsible for discovering the details of a service by querying an LLM.
     """
 
-    def __init__(self, llm_interface: LLMInterface):
+    # Bump whenever the discovery prompt changes, so cached results are not reused.
+    PROMPT_VERSION = 2
+
+    def __init__(
+        self, llm_interface: LLMInterface, cache: Optional[DiscoveryCache] = None
+    ):
         self.llm_interface = llm_interface
+        self.cache = cache
 
     def _build_discovery_prompt(self, service_name: str) -> List[Dict[str, str]]:
         """Builds the prompt to ask the LLM for service details."""
@@ -28,6 +35,8 @@ class ProtocolDiscoverer:
             "JSON object containing the following keys: 'port' (integer), "
             "'transport_protocol' (string, e.g., 'tcp' or 'udp'), "
             "'communication_type' (string, e.g., 'request-response' or 'interactive-stream'), "
+            "'framing' (string, how client messages are delimited: 'http', 'line', "
+            "'length-prefixed' or 'none'), "
             "and 'description' (a brief one-sentence description of the protocol). "
             "Do not include any other text, explanations, or markdown."
         )
@@ -38,7 +47,31 @@ class ProtocolDiscoverer:
             {"role": LLMRole.USER, "content": user_prompt},
         ]
 
-    async def discover(self, service_name: str) -> ServiceDefinition:
+    async def discover(
+        self, service_name: str, force_refresh: bool = False
+    ) -> ServiceDefinition:
+        """
+        Returns the ServiceDefinition for a service. A cached definition is
+        used when available, unless `force_refresh` is set; otherwise the LLM
+        is queried and the result is cached.
+        Raises ProtocolDiscoveryError if discovery fails.
+        """
+        model = self.llm_interface.model_name
+        if self.cache is not None and not force_refresh:
+            service_def = self.cache.get(service_name, model, self.PROMPT_VERSION)
+            if service_def is not None:
+                log.info(f"Using cached protocol details for '{service_name}'.")
+                return service_def
+
+        service_def = await self._discover_with_llm(service_name)
+        if self.cache is not None:
+            try:
+                self.cache.put(service_name, model, self.PROMPT_VERSION, service_def)
+            except OSError as e:
+                log.warning(f"Could not persist discovery cache: {e}")
+        return service_def
+
+    async def _discover_with_llm(self, service_name: str) -> ServiceDefinition:
         """
         Queries the LLM to discover protocol details and returns a
         ServiceDefinition object. Raises ProtocolDiscoveryError if discovery fails.
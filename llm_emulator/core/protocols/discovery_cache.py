@@ -0,0 +1,124 @@
+# llm_emulator/protocols/discovery_cache.py
+
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from .service import ServiceDefinition
+
+log = logging.getLogger("llm_emulator")
+
+
+class DiscoveryCache:
+    """
+    A persistent, on-disk cache of discovered service definitions.
+
+    Entries are keyed by service name, model and discovery prompt version, so
+    changing the model or the discovery prompt never serves a stale answer.
+    The cache is a single JSON file that is rewritten atomically on update.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        """
+        Initializes the cache.
+
+        Args:
+            path: The JSON file that backs the cache. It is created on first write.
+            max_age: Seconds after which an entry is considered stale and ignored.
+                     None keeps entries until they are invalidated.
+        """
+        self.path = path
+        self.max_age = max_age
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _make_key(service_name: str, model: str, prompt_version: int) -> str:
+        return json.dumps([service_name, model, prompt_version])
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, json.JSONDecodeError) as e:
+                log.warning(
+                    f"Ignoring unreadable discovery cache at '{self.path}': {e}"
+                )
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a torn cache.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(
+        self, service_name: str, model: str, prompt_version: int
+    ) -> Optional[ServiceDefinition]:
+        """Returns the cached definition for a service, if there is a fresh one."""
+        entry = self._load().get(self._make_key(service_name, model, prompt_version))
+        if entry is None:
+            return None
+
+        age = time.time() - entry.get("created_at", 0)
+        if self.max_age is not None and age > self.max_age:
+            return None
+
+        try:
+            return ServiceDefinition.from_dict(entry["definition"])
+        except (KeyError, TypeError) as e:
+            log.warning(
+                f"Ignoring malformed discovery cache entry for '{service_name}': {e}"
+            )
+            return None
+
+    def put(
+        self,
+        service_name: str,
+        model: str,
+        prompt_version: int,
+        service_def: ServiceDefinition,
+    ):
+        """Stores a discovered definition and persists the cache."""
+        entries = self._load()
+        entries[self._make_key(service_name, model, prompt_version)] = {
+            "service_name": service_name,
+            "model": model,
+            "prompt_version": prompt_version,
+            "created_at": time.time(),
+            "definition": service_def.to_dict(),
+        }
+        self._save()
+
+    def invalidate(self, service_name: Optional[str] = None):
+        """
+        Removes cached definitions.
+
+        Args:
+            service_name: Only remove the entries for this service. If None,
+                          the whole cache is cleared.
+        """
+        entries = self._load()
+        if service_name is None:
+            entries.clear()
+        else:
+            for key in [
+                key
+                for key, entry in entries.items()
+                if entry.get("service_name") == service_name
+            ]:
+                del entries[key]
+        self._save()
@@ -1,14 +1,18 @@
 # llm_emulator/protocols/handler.py
 
+import re
 import string
-from typing import List, Dict, TYPE_CHECKING
+from typing import Any, List, Dict, Optional, TYPE_CHECKING
 from ...core.config import EmulatorConfig
 from ...llm.roles import LLMRole
+from ...llm.tokens import TokenCounter
 
 if TYPE_CHECKING:
     from ..protocols.service import ServiceDefinition
     from ...core.connection import Session
 
+_PRINTABLE_CHARS = frozenset(string.printable)
+
 
 class ChatProtocolHandler:
     """
@@ -20,9 +24,59 @@ class ChatProtocolHandler:
     # Centralized constant for the initial connection message.
     _INITIAL_DEFAULT_USER_MESSAGE = "[A client has just connected]"
 
-    def __init__(self, service_def: "ServiceDefinition", config: EmulatorConfig):
+    def __init__(
+        self,
+        service_def: "ServiceDefinition",
+        config: EmulatorConfig,
+        token_counter: Optional[TokenCounter] = None,
+    ):
         self.service_def = service_def
         self.config = config
+        self.token_counter = token_counter or TokenCounter()
+        # The system prompt and initial message never change for a service,
+        # so they are built once and shared by every turn of every session.
+        self._system_prompt = self._build_system_prompt()
+        self._prefix_messages = self._build_prefix_messages()
+        self._history_token_budget = self._compute_history_token_budget()
+
+    def _build_prefix_messages(self) -> List[Dict[str, Any]]:
+        """
+        Builds the static start of every prompt. With prompt caching enabled,
+        the end of this prefix carries a `cache_control` marker, so that
+        providers supporting it (through litellm) can serve it from their cache.
+        """
+        initial_message: Dict[str, Any] = {
+            "role": LLMRole.USER.value,
+            "content": self._INITIAL_DEFAULT_USER_MESSAGE,
+        }
+        if self.config.prompt_caching:
+            initial_message["content"] = [
+                {
+                    "type": "text",
+                    "text": self._INITIAL_DEFAULT_USER_MESSAGE,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        return [
+            {"role": LLMRole.SYSTEM.value, "content": self._system_prompt},
+            # Always include the initial user message, as you instructed.
+            initial_message,
+        ]
+
+    def _compute_history_token_budget(self) -> Optional[int]:
+        """
+        Returns how many tokens of conversation history fit in a prompt: the
+        history budget, further capped by what the total prompt budget leaves
+        after the system prompt and initial message.
+        """
+        budget = self.config.max_history_tokens
+        if self.config.max_prompt_tokens is not None:
+            prefix_tokens = self.token_counter.count_message(
+                self._system_prompt
+            ) + self.token_counter.count_message(self._INITIAL_DEFAULT_USER_MESSAGE)
+            remaining = max(self.config.max_prompt_tokens - prefix_tokens, 0)
+            budget = remaining if budget is None else min(budget, remaining)
+        return budget
 
     def _build_system_prompt(self) -> str:
         """Constructs the system prompt from the service definition and user config."""
@@ -58,56 +112,93 @@ class ChatProtocolHandler:
 
         return "\n".join(prompt_parts)
 
-    def create_messages_for_llm(self, session: "Session") -> List[Dict[str, str]]:
+    def create_messages_for_llm(
+        self, session: "Session", pending_message: Optional[str] = None
+    ) -> List[Dict[str, str]]:
         """
         Creates the list of messages to be sent to the LLM. It always includes
         the system prompt and an initial user message, followed by the
         rest of the conversation history.
-        """
-        system_prompt = self._build_system_prompt()
-        messages = [
-            {"role": LLMRole.SYSTEM.value, "content": system_prompt},
-            # Always include the initial user message, as you instructed.
-            {"role": LLMRole.USER.value, "content": self._INITIAL_DEFAULT_USER_MESSAGE},
-        ]
 
-        history = session.get_history()
+        A `pending_message` is appended as the next user message without being
+        added to the session's history, e.g. to prepare the answer to a
+        request the client has not sent yet. It counts against the history
+        token budget, as it will once it is added to the history.
+        """
+        messages = list(self._prefix_messages)
 
-        # Truncate and add the rest of the actual conversation history.
-        if (
-            self.config.max_history_tokens
-            and len(history) > self.config.max_history_tokens
-        ):
-            history = history[-self.config.max_history_tokens :]
+        budget = self._history_token_budget
+        if pending_message is not None and budget is not None:
+            budget = max(budget - self.token_counter.count_message(pending_message), 0)
 
-        messages.extend(history)
+        # Add the most recent conversation history that fits the token budget.
+        history = session.get_window(budget, self.token_counter.count_message)
+        messages.extend(
+            {"role": entry.role, "content": entry.content} for entry in history
+        )
+        if pending_message is not None:
+            messages.append({"role": LLMRole.USER.value, "content": pending_message})
 
         return messages
 
+    def create_response_formatter(self) -> "StreamingResponseFormatter":
+        """
+        Creates an incremental formatter for a single streamed LLM response.
+        """
+        return StreamingResponseFormatter(
+            interactive=self.service_def.communication_type == "interactive-stream"
+        )
+
     def format_response_from_llm(self, response: str) -> str:
         """
         Formats the raw response from the LLM before it is sent to the
         client or added to the history.
         """
+        formatter = self.create_response_formatter()
+        return formatter.feed(response) + formatter.finish()
+
+
+class StreamingResponseFormatter:
+    """
+    Applies the response formatting rules to an LLM response that arrives in
+    chunks. Each call to `feed` returns the text that is safe to send right
+    away; `finish` returns whatever remains once the stream has ended.
+
+    For interactive protocols the trailing whitespace and a trailing `$` are
+    held back, since they can only be normalized into the `$ ` prompt once
+    the end of the response is known.
+    """
+
+    # Trailing text that the prompt fixup may still strip or rewrite.
+    _PENDING_TAIL = re.compile(r"\s*\$?\s*\Z")
+
+    def __init__(self, interactive: bool):
+        self.interactive = interactive
+        self._pending = ""
+        self._has_content = False
+
+    def feed(self, chunk: str) -> str:
+        """Sanitizes a chunk and returns the part that can be sent now."""
         # First, remove any non-printable characters.
-        printable_chars = set(string.printable)
-        sanitized_response = "".join(filter(lambda x: x in printable_chars, response))
-
-        # For interactive protocols, enforce the prompt format intelligently.
-        if self.service_def.communication_type == "interactive-stream":
-            # 1. Normalize the response by stripping trailing whitespace.
-            content = sanitized_response.rstrip()
-
-            # 2. If the LLM included a prompt character, remove it for clean processing.
-            if content.endswith("$"):
-                content = content[:-1].rstrip()
-
-            # 3. Build the final response.
-            if content:
-                # If there's content, ensure it ends with a newline before the prompt.
-                return content + "\n$ "
-            else:
-                # If there's no content, just send the prompt.
-                return "$ "
-
-        return sanitized_response
+        sanitized_chunk = "".join(filter(_PRINTABLE_CHARS.__contains__, chunk))
+        if not self.interactive:
+            return sanitized_chunk
+
+        buffer = self._pending + sanitized_chunk
+        split_at = self._PENDING_TAIL.search(buffer).start()
+        self._pending = buffer[split_at:]
+        ready = buffer[:split_at]
+        if ready:
+            self._has_content = True
+        return ready
+
+    def finish(self) -> str:
+        """Returns the final part of the response once the stream has ended."""
+        if not self.interactive:
+            return ""
+
+        # The held-back tail is only whitespace and at most one prompt
+        # character, so the prompt is rebuilt from scratch. If there was
+        # content, it must end with a newline before the prompt.
+        self._pending = ""
+        return "\n$ " if self._has_content else "$ "
@@ -1,7 +1,18 @@
 # llm_emulator/protocols/service.py
 
-from dataclasses import dataclass, field
-from typing import Dict, Any
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Any, Iterable, Optional
+
+# (family, transport, whole-word keywords, well-known ports), in order. Keywords
+# are exact protocol names so that e.g. 'sftp', 'tftp' or an IMAP server that
+# mentions "mail" are not mistaken for one of these families.
+_PROTOCOL_FAMILIES = (
+    ("http", "tcp", ("http", "https"), (80, 443, 8000, 8080, 8443)),
+    ("smtp", "tcp", ("smtp", "smtps", "esmtp"), (25, 465, 587)),
+    ("ftp", "tcp", ("ftp", "ftps"), (21,)),
+    ("shell", "tcp", ("ssh", "telnet", "rsh", "shell"), (22, 23, 514)),
+)
 
 
 @dataclass
@@ -15,8 +26,32 @@ class ServiceDefinition:
     transport_protocol: str = "tcp"
     communication_type: str = "unknown"
     description: str = ""
+    # How client messages are delimited: 'http', 'line', 'length-prefixed' or 'auto'.
+    framing: str = "auto"
     raw_details: Dict[str, Any] = field(default_factory=dict)
 
+    @property
+    def protocol_family(self) -> str:
+        """
+        A coarse classification of the protocol ('http', 'smtp', 'ftp',
+        'shell' or 'generic'), used to pick protocol-specific behavior.
+
+        The service name is checked first, then the description, and only
+        then the well-known port. A family only applies to services on its
+        transport, so e.g. syslog on UDP 514 stays 'generic'.
+        """
+        transport = (self.transport_protocol or "tcp").lower()
+        families = [f for f in _PROTOCOL_FAMILIES if f[1] == transport]
+        for text in (self.name, self.description):
+            words = re.findall(r"[a-z0-9]+", (text or "").lower())
+            family = _family_by_keyword(families, words)
+            if family:
+                return family
+        for family, _, _, ports in families:
+            if self.port in ports:
+                return family
+        return "generic"
+
     @classmethod
     def from_llm_response(
         cls, service_name: str, llm_json: Dict[str, Any]
@@ -33,5 +68,23 @@ class ServiceDefinition:
             description=llm_json.get(
                 "description", f"A standard {service_name} server."
             ),
+            framing=llm_json.get("framing", "auto"),
             raw_details=llm_json,
         )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializes the definition into a JSON-compatible dictionary."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ServiceDefinition":
+        """Recreates a definition serialized with `to_dict`."""
+        return cls(**data)
+
+
+def _family_by_keyword(families: Iterable[tuple], words: list) -> Optional[str]:
+    """Returns the first family with a keyword among `words`, if any."""
+    for family, _, keywords, _ in families:
+        if any(keyword in words for keyword in keywords):
+            return family
+    return None
@@ -0,0 +1,140 @@
+# llm_emulator/core/response_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ..llm.messages import MessageKey, normalize_message
+
+
+class _TrieNode:
+    """A single conversation turn in the response cache trie."""
+
+    __slots__ = ("parent", "key", "children", "response", "expires_at")
+
+    def __init__(self, parent: Optional["_TrieNode"], key: Optional[MessageKey]):
+        self.parent = parent
+        self.key = key
+        self.children: Dict[MessageKey, "_TrieNode"] = {}
+        self.response: Optional[str] = None
+        self.expires_at: Optional[float] = None
+
+
+class ResponseCache:
+    """
+    A cache of formatted LLM responses keyed on the conversation that produced
+    them, shared by every session of the emulator.
+
+    Conversations are stored as a trie with one node per message, so sessions
+    that share a prefix (the same system prompt, the same initial user message,
+    the same first requests) share the storage and lookup path for it. Entries
+    are evicted least-recently-used once `max_entries` or `max_bytes` is
+    exceeded, and expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 3600.0,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries: The maximum number of cached responses.
+            max_bytes: An approximate cap on the memory used by cached
+                       responses and the message text indexing them.
+            ttl: Seconds after which a cached response expires. None disables expiry.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._root = _TrieNode(parent=None, key=None)
+        # Nodes holding a response, from least to most recently used.
+        self._lru: "OrderedDict[_TrieNode, None]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _find(self, messages: List[Dict[str, Any]]) -> Optional[_TrieNode]:
+        node = self._root
+        for message in messages:
+            node = node.children.get(normalize_message(message))
+            if node is None:
+                return None
+        return node
+
+    def get(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Returns the cached response for a message list, if there is one."""
+        node = self._find(messages)
+        if node is None or node.response is None:
+            self.misses += 1
+            return None
+
+        if node.expires_at is not None and node.expires_at <= time.monotonic():
+            self._remove(node)
+            self.misses += 1
+            return None
+
+        self._lru.move_to_end(node)
+        self.hits += 1
+        return node.response
+
+    def put(self, messages: List[Dict[str, Any]], response: str):
+        """Stores the response produced for a message list."""
+        node = self._root
+        for message in messages:
+            key = normalize_message(message)
+            child = node.children.get(key)
+            if child is None:
+                child = _TrieNode(parent=node, key=key)
+                node.children[key] = child
+                self._bytes += len(key[1])
+            node = child
+
+        if node.response is not None:
+            self._bytes -= len(node.response)
+        node.response = response
+        node.expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._bytes += len(response)
+        self._lru[node] = None
+        self._lru.move_to_end(node)
+
+        while self._lru and (
+            len(self._lru) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._lru))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, node: _TrieNode):
+        """Drops a node's response and prunes the branches left empty."""
+        del self._lru[node]
+        self._bytes -= len(node.response)
+        node.response = None
+        node.expires_at = None
+
+        while node.parent is not None and not node.children and node.response is None:
+            del node.parent.children[node.key]
+            self._bytes -= len(node.key[1])
+            node = node.parent
+
+    def clear(self):
+        """Removes every cached response."""
+        self._root = _TrieNode(parent=None, key=None)
+        self._lru.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache counters."""
+        return {
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
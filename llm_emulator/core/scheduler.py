@@ -0,0 +1,180 @@
+# llm_emulator/core/scheduler.py
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Hashable
+
+from ..exceptions import LLMQueueFullError
+
+
+class LLMScheduler:
+    """
+    Limits the number of LLM requests in flight and queues the rest fairly.
+
+    Waiting requests are grouped per client and served round-robin across
+    clients, so a single client flooding the emulator only delays itself.
+    The queue is bounded; what happens when it is full depends on `policy`:
+
+    - 'reject': new requests raise LLMQueueFullError and new connections are
+      refused before they cost an LLM call.
+    - 'slow-accept': requests of existing sessions are always queued, and new
+      connections wait in `wait_for_capacity` until the queue drains.
+    """
+
+    POLICIES = ("reject", "slow-accept")
+
+    def __init__(
+        self, max_in_flight: int = 32, max_queue: int = 512, policy: str = "reject"
+    ):
+        """
+        Initializes the scheduler.
+
+        Args:
+            max_in_flight: The maximum number of concurrent LLM requests.
+            max_queue: The maximum number of requests waiting for a slot.
+            policy: Either 'reject' or 'slow-accept'; see the class docstring.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}.")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.policy = policy
+        self.in_flight = 0
+        self.queue_depth = 0
+        # Per-client FIFO queues, in round-robin order.
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._capacity_available = asyncio.Event()
+        self._capacity_available.set()
+
+        self.requests_total = 0
+        self.rejected_total = 0
+        self.queued_total = 0
+        self.max_queue_depth = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def is_saturated(self) -> bool:
+        """True when the waiting queue is full."""
+        return self.queue_depth >= self.max_queue
+
+    async def wait_for_capacity(self):
+        """Waits until the waiting queue has room for another request."""
+        while self.is_saturated:
+            self._capacity_available.clear()
+            await self._capacity_available.wait()
+
+    async def acquire(self, client_key: Hashable):
+        """
+        Waits for an LLM slot on behalf of a client. Every successful call must
+        be paired with `release`; prefer the `slot` context manager.
+        """
+        self.requests_total += 1
+        if self.in_flight < self.max_in_flight and not self._queues:
+            self.in_flight += 1
+            return
+
+        if self.policy == "reject" and self.is_saturated:
+            self.rejected_total += 1
+            raise LLMQueueFullError(
+                f"The LLM request queue is full ({self.queue_depth} waiting)."
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client_key, deque()).append(waiter)
+        self.queue_depth += 1
+        self.queued_total += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        start = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the wait was cancelled.
+                self.release()
+            else:
+                self._discard_waiter(client_key, waiter)
+            raise
+        finally:
+            waited = time.monotonic() - start
+            self.total_wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a slot only if one is free and no request is waiting for one, for
+        optional work that must never delay a client. A successful call must be
+        paired with `release`; prefer the `spare_slot` context manager.
+        """
+        if self.in_flight < self.max_in_flight and not self._queues:
+            self.in_flight += 1
+            return True
+        return False
+
+    def release(self):
+        """Frees a slot, handing it to the next client in round-robin order."""
+        while self._queues:
+            client_key, waiters = self._queues.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                # The client goes to the back of the line for its next request.
+                self._queues[client_key] = waiters
+            self._dequeued()
+            if not waiter.done():
+                # The slot passes straight to the waiter; in_flight is unchanged.
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _discard_waiter(self, client_key: Hashable, waiter: asyncio.Future):
+        waiters = self._queues.get(client_key)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self._queues[client_key]
+        self._dequeued()
+
+    def _dequeued(self):
+        self.queue_depth -= 1
+        if not self.is_saturated:
+            self._capacity_available.set()
+
+    @asynccontextmanager
+    async def slot(self, client_key: Hashable) -> AsyncIterator[None]:
+        """Holds an LLM slot for the duration of the `async with` block."""
+        await self.acquire(client_key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def spare_slot(self) -> AsyncIterator[None]:
+        """
+        Holds a slot taken with `try_acquire` for the `async with` block. Raises
+        LLMQueueFullError at once if no slot is spare.
+        """
+        if not self.try_acquire():
+            raise LLMQueueFullError("No LLM slot is spare.")
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the scheduler's gauges and counters."""
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests_total": self.requests_total,
+            "rejected_total": self.rejected_total,
+            "queued_total": self.queued_total,
+            "total_wait_time": self.total_wait_time,
+            "max_wait_time": self.max_wait_time,
+        }
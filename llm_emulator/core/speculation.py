@@ -0,0 +1,296 @@
+# llm_emulator/core/speculation.py
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urljoin, urlsplit
+
+from ..exceptions import LLMQueueFullError
+
+if TYPE_CHECKING:
+    from .connection import Session
+    from .pipeline import ResponsePipeline
+    from .protocols.handler import ChatProtocolHandler
+    from .stats import ServiceStats
+
+log = logging.getLogger(__name__)
+
+# Request headers that describe a body, which a follow-up GET does not have.
+_BODY_HEADERS = frozenset(("content-length", "content-type", "transfer-encoding"))
+_HTML_CONTENT_TYPE = re.compile(r"^content-type:\s*text/html", re.I | re.M)
+
+# Follow-ups are pre-generated in the order a browser requests them.
+_ICON, _STYLESHEET, _SCRIPT, _IMAGE, _LINK = range(5)
+
+
+def split_http_message(message: str) -> Tuple[str, str]:
+    """Splits an HTTP message into its header block and its body."""
+    for separator in ("\r\n\r\n", "\n\n"):
+        head, found, body = message.partition(separator)
+        if found:
+            return head, body
+    return message, ""
+
+
+def http_header(head: str, name: str) -> Optional[str]:
+    """Returns the value of a header in an HTTP header block, if present."""
+    for line in head.splitlines()[1:]:
+        key, _, value = line.partition(":")
+        if key.strip().lower() == name.lower():
+            return value.strip()
+    return None
+
+
+def request_key(request: str) -> Optional[str]:
+    """
+    Returns the method and path of an HTTP request (e.g. 'GET /index.html'),
+    which identify it in a lookahead cache, or None if it is not HTTP.
+    """
+    parts = request.lstrip().split(" ", 2)
+    if len(parts) < 3 or not parts[2].startswith("HTTP/"):
+        return None
+    method, target = parts[0], parts[1]
+    if "://" in target:
+        # An absolute-form target, as sent to proxies.
+        url = urlsplit(target)
+        target = (url.path or "/") + (f"?{url.query}" if url.query else "")
+    return f"{method.upper()} {target}"
+
+
+class _LinkParser(HTMLParser):
+    """Collects the URLs a browser would fetch after loading a page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[Tuple[int, str]] = []
+        self.has_icon = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        attributes: Dict[str, str] = {k: v for k, v in attrs if v}
+        if tag == "link" and "href" in attributes:
+            rel = attributes.get("rel", "").lower().split()
+            if "icon" in rel:
+                self.has_icon = True
+                self.links.append((_ICON, attributes["href"]))
+            elif "stylesheet" in rel:
+                self.links.append((_STYLESHEET, attributes["href"]))
+        elif tag == "script" and "src" in attributes:
+            self.links.append((_SCRIPT, attributes["src"]))
+        elif tag == "img" and "src" in attributes:
+            self.links.append((_IMAGE, attributes["src"]))
+        elif tag == "a" and "href" in attributes:
+            self.links.append((_LINK, attributes["href"]))
+
+
+def predict_follow_ups(request: str, response: str, limit: int = 8) -> List[str]:
+    """
+    Predicts the requests a client is likely to send after receiving an HTML
+    page: the favicon, then the linked stylesheets, scripts, images and pages
+    of the same site.
+
+    Args:
+        request: The HTTP request that `response` answered.
+        response: The HTTP response sent to the client.
+        limit: The most follow-ups to return.
+
+    Returns:
+        The paths (with any query string) of the likely follow-up GET
+        requests, most likely first. Empty if the response is not HTML.
+    """
+    key = request_key(request)
+    head, body = split_http_message(response)
+    if key is None or not (
+        _HTML_CONTENT_TYPE.search(head) or "<html" in body[:1024].lower()
+    ):
+        return []
+
+    parser = _LinkParser()
+    try:
+        parser.feed(body)
+        parser.close()
+    except Exception as e:
+        # Whatever was parsed before the error is still useful.
+        log.debug(f"Stopped parsing a page for follow-ups: {e}")
+
+    links = parser.links
+    if not parser.has_icon:
+        links.insert(0, (_ICON, "/favicon.ico"))
+    host = http_header(split_http_message(request)[0], "host")
+    base = key.split(" ", 1)[1]
+
+    targets = []
+    seen = {base}
+    for _, link in sorted(links, key=lambda link: link[0]):
+        url = urlsplit(urljoin(base, link.strip()))
+        if url.scheme not in ("", "http", "https"):
+            continue
+        if url.netloc and url.netloc != host:
+            continue
+        target = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        if target not in seen:
+            seen.add(target)
+            targets.append(target)
+            if len(targets) >= limit:
+                break
+    return targets
+
+
+def follow_up_request(request: str, target: str) -> str:
+    """
+    Builds the GET request for `target` that the client of `request` would
+    send, with the same headers but no body.
+    """
+    lines = split_http_message(request)[0].splitlines()
+    parts = lines[0].split(" ", 2) if lines else []
+    version = parts[2].strip() if len(parts) == 3 else "HTTP/1.1"
+    headers = [
+        line
+        for line in lines[1:]
+        if line.partition(":")[0].strip().lower() not in _BODY_HEADERS
+    ]
+    return "\r\n".join([f"GET {target} {version}", *headers]) + "\r\n\r\n"
+
+
+class LookaheadCache:
+    """
+    The speculative responses of one session, keyed by `request_key`. Each
+    entry is the task generating the response, so a request that arrives
+    while its response is still being generated waits for it instead of
+    starting over. The oldest entries are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._tasks: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tasks
+
+    def add(self, key: str, task: asyncio.Task):
+        self._tasks[key] = task
+        while len(self._tasks) > self.max_entries:
+            _, oldest = self._tasks.popitem(last=False)
+            oldest.cancel()
+
+    def pop(self, key: Optional[str]) -> Optional[asyncio.Task]:
+        return self._tasks.pop(key, None) if key is not None else None
+
+    def close(self):
+        """Cancels the speculative requests that are still running."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+
+class Speculator:
+    """
+    Pre-generates the responses an HTTP client is likely to ask for next, so
+    that they are ready, or at least under way, when it does.
+
+    After each HTML page, the follow-ups predicted by `predict_follow_ups`
+    are generated in the background as if the client had sent them, into the
+    session's lookahead cache. Speculative LLM requests only take scheduler
+    slots that are free while no client request is waiting, never queue, and
+    at most `max_in_flight` run at once, so they only use capacity the clients
+    leave idle. Predictions without spare capacity are simply skipped.
+    """
+
+    def __init__(
+        self,
+        pipeline: "ResponsePipeline",
+        protocol_handler: "ChatProtocolHandler",
+        max_per_response: int = 8,
+        max_in_flight: int = 4,
+        cache_size: int = 32,
+        stats: "ServiceStats | None" = None,
+    ):
+        """
+        Initializes the speculator.
+
+        Args:
+            pipeline: The pipeline generating the speculative responses.
+            protocol_handler: Builds the prompts of the predicted requests.
+            max_per_response: Follow-ups pre-generated per page.
+            max_in_flight: Speculative requests running at once.
+            cache_size: Speculative responses kept per session.
+            stats: Optional service counters to account speculation in.
+        """
+        self.pipeline = pipeline
+        self.protocol_handler = protocol_handler
+        self.max_per_response = max_per_response
+        self.max_in_flight = max_in_flight
+        self.cache_size = cache_size
+        self.stats = stats
+        self.in_flight = 0
+
+    def create_cache(self) -> LookaheadCache:
+        """Creates the lookahead cache of a new session."""
+        return LookaheadCache(self.cache_size)
+
+    def speculate(
+        self,
+        session: "Session",
+        lookahead: LookaheadCache,
+        request: str,
+        response: str,
+    ):
+        """
+        Starts generating the likely follow-ups of `response`, the answer to
+        `request`, which must already be in the session's history.
+        """
+        for target in predict_follow_ups(request, response, self.max_per_response):
+            key = f"GET {target}"
+            if key in lookahead:
+                continue
+            if self.in_flight >= self.max_in_flight:
+                break
+            follow_up = follow_up_request(request, target)
+            if self.pipeline.has_fast_path_answer(session, follow_up):
+                # Answered without the LLM once the client asks for it.
+                continue
+            messages = self.protocol_handler.create_messages_for_llm(
+                session, pending_message=follow_up
+            )
+            task = asyncio.create_task(self._generate(session, messages))
+            # Counted until done, even if cancelled before it started.
+            self.in_flight += 1
+            task.add_done_callback(self._finished)
+            lookahead.add(key, task)
+
+    def _finished(self, task: asyncio.Task):
+        self.in_flight -= 1
+
+    async def _generate(
+        self, session: "Session", messages: List[Dict[str, str]]
+    ) -> Optional[str]:
+        try:
+            response = await self.pipeline.generate_response(
+                session, messages, speculative=True
+            )
+        except LLMQueueFullError:
+            # No spare capacity; the client's request will be served as usual.
+            return None
+        except Exception as e:
+            log.debug(f"A speculative request failed: {e}")
+            return None
+        if self.stats:
+            self.stats.speculative_requests += 1
+        return response
+
+    async def take(self, lookahead: LookaheadCache, request: str) -> Optional[str]:
+        """
+        Returns the speculative response to `request`, waiting for it if it is
+        still being generated, or None if there is none.
+        """
+        task = lookahead.pop(request_key(request))
+        if task is None:
+            return None
+        response = await task
+        if response is not None and self.stats:
+            self.stats.speculative_hits += 1
+        return response
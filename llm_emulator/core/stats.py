@@ -0,0 +1,34 @@
+# llm_emulator/core/stats.py
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class ServiceStats:
+    """
+    Running counters for a single emulated service.
+    """
+
+    connections_total: int = 0
+    connections_active: int = 0
+    connections_rejected: int = 0
+    messages_received: int = 0
+    # Client messages dropped unanswered, e.g. a UDP peer's excess datagrams.
+    messages_dropped: int = 0
+    llm_requests: int = 0
+    # LLM requests cancelled before they finished, e.g. as the client left.
+    llm_cancelled: int = 0
+    cache_hits: int = 0
+    # Connections greeted from the pre-generated greeting pool.
+    greeting_pool_hits: int = 0
+    # Messages answered by fast-path rules, without the LLM.
+    fast_path_hits: int = 0
+    # Speculative responses generated, and those a client then asked for.
+    speculative_requests: int = 0
+    speculative_hits: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the counters as a plain dictionary."""
+        return asdict(self)
@@ -0,0 +1,349 @@
+# llm_emulator/core/workers.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from dataclasses import replace
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+
+from ..events import HookEvents
+from ..llm.base import LLMInterface
+from ..utils.hooks import HookManager
+from .config import EmulatorConfig
+from .emulator import Emulator
+from .protocols.discovery import ProtocolDiscoverer
+from .protocols.discovery_cache import DiscoveryCache
+
+if TYPE_CHECKING:
+    from .protocols.service import ServiceDefinition
+
+log = logging.getLogger(__name__)
+
+# Counters that describe the present rather than accumulate, so the last
+# value of a worker that exited is not carried over.
+_GAUGES = frozenset(("connections_active", "port"))
+
+
+def _run_worker(
+    index: int,
+    service_name: str,
+    llm_factory: Callable[[], LLMInterface],
+    config: EmulatorConfig,
+    service_def: "ServiceDefinition",
+    stats_connection: Connection,
+    stats_interval: float,
+    worker_setup: Optional[Callable[[Emulator], None]],
+):
+    """The entry point of a worker process."""
+    # Ctrl+C reaches the whole process group; the supervisor decides.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(
+        _serve_worker(
+            index,
+            service_name,
+            llm_factory,
+            config,
+            service_def,
+            stats_connection,
+            stats_interval,
+            worker_setup,
+        )
+    )
+
+
+async def _serve_worker(
+    index: int,
+    service_name: str,
+    llm_factory: Callable[[], LLMInterface],
+    config: EmulatorConfig,
+    service_def: "ServiceDefinition",
+    stats_connection: Connection,
+    stats_interval: float,
+    worker_setup: Optional[Callable[[Emulator], None]],
+):
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    supervisor_pid = os.getppid()
+
+    emulator = Emulator(
+        service_name=service_name,
+        llm_interface=llm_factory(),
+        config=config,
+        service_def=service_def,
+    )
+    if worker_setup is not None:
+        worker_setup(emulator)
+    await emulator.start()
+    log.info(f"Worker {index} (pid {os.getpid()}) is serving '{service_name}'.")
+
+    try:
+        # Report the stats regularly, and stop with the supervisor.
+        while not stopping.is_set() and os.getppid() == supervisor_pid:
+            stats_connection.send(emulator.stats())
+            try:
+                await asyncio.wait_for(stopping.wait(), stats_interval)
+            except asyncio.TimeoutError:
+                pass
+    except (BrokenPipeError, OSError):
+        log.warning(f"Worker {index} lost its supervisor; stopping.")
+    finally:
+        await emulator.stop()
+        try:
+            stats_connection.send(emulator.stats())
+        except (BrokenPipeError, OSError):
+            pass
+        stats_connection.close()
+
+
+class _Worker:
+    """The supervisor's view of one worker process."""
+
+    __slots__ = ("index", "process", "stats_connection", "started_at", "stats")
+
+    def __init__(self, index: int, process, stats_connection: Connection):
+        self.index = index
+        self.process = process
+        self.stats_connection = stats_connection
+        self.started_at = time.monotonic()
+        self.stats: Dict[str, Any] = {}
+
+
+class WorkerSupervisor:
+    """
+    Serves one service from several worker processes, so that prompt
+    assembly, response formatting and the LLM client's parsing are spread
+    over several cores instead of competing for one event loop.
+
+    The service is discovered once, here, and every worker gets the result.
+    The workers each run an Emulator listening on the same port with
+    SO_REUSEPORT, and the kernel spreads connections (or datagrams) across
+    them. A worker that dies is restarted, after a delay that grows while it
+    keeps failing soon after starting. Each worker reports its stats, which
+    `stats` adds up.
+
+    Workers are started with the 'spawn' method, so `llm_factory` and
+    `worker_setup` must be picklable, e.g. module-level functions or
+    `functools.partial` objects. Every worker creates its own gateway, hook
+    bus, scheduler and caches; the concurrency limits of the config therefore
+    apply per worker. The supervisor's `hooks` only carries its own start
+    and stop events; use `worker_setup` to subscribe to the workers' events.
+    Workers do not serve metrics.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        llm_factory: Callable[[], LLMInterface],
+        workers: Optional[int] = None,
+        config: Optional[EmulatorConfig] = None,
+        worker_setup: Optional[Callable[[Emulator], None]] = None,
+        restart_delay: float = 1.0,
+        max_restart_delay: float = 30.0,
+        stats_interval: float = 1.0,
+    ):
+        """
+        Initializes the supervisor.
+
+        Args:
+            service_name: The name of the service to emulate (e.g., 'http').
+            llm_factory: Creates the LLM gateway; called once here for
+                         discovery and once in every worker.
+            workers: The number of worker processes. Defaults to the number
+                     of CPUs.
+            config: The configuration of every worker. If None, default
+                    settings are used.
+            worker_setup: Called in each worker with its Emulator before it
+                          starts, e.g. to subscribe to its hooks.
+            restart_delay: Seconds before a dead worker is restarted.
+            max_restart_delay: The longest delay for a worker that keeps dying.
+            stats_interval: Seconds between two stats reports of a worker.
+        """
+        if not service_name:
+            raise ValueError("service_name cannot be empty.")
+        self.service_name = service_name
+        self.llm_factory = llm_factory
+        self.workers = workers or os.cpu_count() or 1
+        self.config = config or EmulatorConfig()
+        self.worker_setup = worker_setup
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stats_interval = stats_interval
+        self.hooks = HookManager(
+            dispatch=self.config.hook_dispatch,
+            max_queue=self.config.hook_queue_size,
+            overflow=self.config.hook_overflow_policy,
+        )
+        self.service_def: "ServiceDefinition" | None = None
+        self.port: int | None = None
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._delays: Dict[int, float] = {}
+        self._retired: Dict[str, int] = {}
+        self._reserved_socket: socket.socket | None = None
+        self._worker_config: EmulatorConfig | None = None
+        self._stopping = False
+
+    async def start(self):
+        """Discovers the service, then starts the workers."""
+        config = self.config
+        discovery_cache = (
+            DiscoveryCache(config.discovery_cache_path)
+            if config.discovery_cache_path
+            else None
+        )
+        log.info(f"Discovering protocol details for '{self.service_name}'...")
+        discoverer = ProtocolDiscoverer(self.llm_factory(), cache=discovery_cache)
+        self.service_def = await discoverer.discover(
+            self.service_name, force_refresh=config.force_rediscovery
+        )
+        log.info(f"Discovered service details: {self.service_def}")
+
+        port = config.port if config.port is not None else self.service_def.port
+        self.port = self._reserve_port(port)
+        self._worker_config = replace(
+            config, port=self.port, reuse_port=True, metrics_port=None
+        )
+        for index in range(self.workers):
+            self._spawn(index)
+        self.hooks.emit(
+            HookEvents.EMULATOR_STARTED,
+            host="0.0.0.0",
+            port=self.port,
+            service=self.service_def.name,
+        )
+
+    def _reserve_port(self, port: int) -> int:
+        """
+        Binds the port with SO_REUSEPORT, which resolves an ephemeral port and
+        keeps it while workers come and go. A TCP socket that is bound but not
+        listening is never handed connections; a UDP one would receive
+        datagrams, so it is released once the port number is known.
+        """
+        udp = self.service_def.transport_protocol.lower() == "udp"
+        sock = socket.socket(
+            socket.AF_INET, socket.SOCK_DGRAM if udp else socket.SOCK_STREAM
+        )
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("0.0.0.0", port))
+        port = sock.getsockname()[1]
+        if udp:
+            sock.close()
+        else:
+            self._reserved_socket = sock
+        return port
+
+    def _spawn(self, index: int):
+        if self._stopping:
+            return
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_worker,
+            args=(
+                index,
+                self.service_name,
+                self.llm_factory,
+                self._worker_config,
+                self.service_def,
+                sender,
+                self.stats_interval,
+                self.worker_setup,
+            ),
+            name=f"llm-emulator-{self.service_name}-{index}",
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+
+        worker = _Worker(index, process, receiver)
+        self._workers[index] = worker
+        loop = asyncio.get_running_loop()
+        loop.add_reader(receiver.fileno(), self._receive_stats, worker)
+        loop.add_reader(process.sentinel, self._worker_exited, worker)
+        log.debug(f"Started worker {index} (pid {process.pid}).")
+
+    def _receive_stats(self, worker: _Worker):
+        try:
+            while worker.stats_connection.poll():
+                worker.stats = worker.stats_connection.recv()
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(worker.stats_connection.fileno())
+
+    def _worker_exited(self, worker: _Worker):
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.process.sentinel)
+        worker.process.join()
+        # Collect the final report before the stats of the worker are retired.
+        self._receive_stats(worker)
+        loop.remove_reader(worker.stats_connection.fileno())
+        worker.stats_connection.close()
+        for key, value in worker.stats.items():
+            if _is_counter(key, value):
+                self._retired[key] = self._retired.get(key, 0) + value
+        if self._workers.get(worker.index) is worker:
+            del self._workers[worker.index]
+        if self._stopping:
+            return
+
+        # A worker that dies soon after starting is retried less and less often.
+        delay = self._delays.get(worker.index, self.restart_delay)
+        if time.monotonic() - worker.started_at > self.max_restart_delay:
+            delay = self.restart_delay
+        self._delays[worker.index] = min(delay * 2, self.max_restart_delay)
+        self.restarts += 1
+        log.warning(
+            f"Worker {worker.index} exited with code {worker.process.exitcode}; "
+            f"restarting it in {delay:.1f}s."
+        )
+        loop.call_later(delay, self._spawn, worker.index)
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stops every worker, letting them close their sessions, and kills the
+        ones still running after `timeout` seconds.
+        """
+        self._stopping = True
+        for worker in list(self._workers.values()):
+            worker.process.terminate()
+        deadline = time.monotonic() + timeout
+        while self._workers and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for worker in list(self._workers.values()):
+            log.warning(f"Worker {worker.index} did not stop in time; killing it.")
+            worker.process.kill()
+            worker.process.join()
+            self._worker_exited(worker)
+
+        if self._reserved_socket is not None:
+            self._reserved_socket.close()
+            self._reserved_socket = None
+        if self.service_def is not None:
+            self.hooks.emit(HookEvents.EMULATOR_STOPPED, service=self.service_name)
+        await self.hooks.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of every worker added up, including the workers
+        that have exited, with the gauges of the running ones.
+        """
+        totals = dict(self._retired)
+        for worker in self._workers.values():
+            for key, value in worker.stats.items():
+                if _is_counter(key, value) or key == "connections_active":
+                    totals[key] = totals.get(key, 0) + value
+        totals["port"] = self.port
+        totals["workers"] = len(self._workers)
+        totals["restarts"] = self.restarts
+        return totals
+
+
+def _is_counter(key: str, value: Any) -> bool:
+    return (
+        isinstance(value, int) and not isinstance(value, bool) and key not in _GAUGES
+    )
@@ -11,9 +11,18 @@ class HookEvents:
     EMULATOR_STOPPED = "emulator_stopped"
     CONNECTION_OPENED = "connection_opened"
     CONNECTION_CLOSED = "connection_closed"
+    CONNECTION_REJECTED = "connection_rejected"
 
     MESSAGE_RECEIVED = "message_received"
+    MESSAGE_DROPPED = "message_dropped"
 
     MESSAGE_SENT = "message_sent"
     LLM_REQUEST = "llm_request"
     LLM_RESPONSE = "llm_response"
+    LLM_CANCELLED = "llm_cancelled"
+
+    RESPONSE_CACHE_HIT = "response_cache_hit"
+    RESPONSE_CACHE_MISS = "response_cache_miss"
+
+    SPECULATION_HIT = "speculation_hit"
+    FAST_PATH_HIT = "fast_path_hit"
@@ -13,12 +13,30 @@ class LLMConnectionError(EmulatorError):
     pass
 
 
+class LLMRateLimitError(LLMConnectionError):
+    """Raised when the LLM service refuses a request for being over its limits."""
+
+    pass
+
+
+class LLMTimeoutError(LLMConnectionError):
+    """Raised when the LLM service does not answer in time."""
+
+    pass
+
+
 class LLMResponseError(EmulatorError):
     """Raised when the LLM returns an unexpected or invalid response."""
 
     pass
 
 
+class LLMQueueFullError(EmulatorError):
+    """Raised when the LLM request queue is full and the request is rejected."""
+
+    pass
+
+
 class ProtocolDiscoveryError(EmulatorError):
     """Raised when the LLM fails to provide necessary protocol details."""
 
@@ -29,3 +47,9 @@ class NetworkError(EmulatorError):
     """Raised for general network-related issues within the emulator."""
 
     pass
+
+
+class MessageTooLargeError(NetworkError):
+    """Raised when a client message cannot be framed within the size limit."""
+
+    pass
@@ -1,7 +1,7 @@
 # llm_emulator/llm/base.py
 
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
 
 
 class LLMInterface(ABC):
@@ -10,6 +10,14 @@ class LLMInterface(ABC):
     Defines the contract for how the emulator interacts with an LLM.
     """
 
+    @property
+    def model_name(self) -> str:
+        """
+        Identifies the model behind this gateway, e.g. for cache keys.
+        Gateways bound to a specific model should override this.
+        """
+        return type(self).__name__
+
     @abstractmethod
     async def generate_response(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -23,3 +31,22 @@ class LLMInterface(ABC):
             The LLM's response as a string.
         """
         pass
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """
+        Streams a response from the LLM as it is being generated.
+
+        Gateways that support incremental output should override this. The
+        default implementation yields the complete `generate_response` result
+        as a single chunk, so every gateway can be consumed as a stream.
+
+        Args:
+            messages: A list of message dictionaries, where each dictionary
+                      has a "role" and "content" key.
+
+        Yields:
+            Successive text chunks of the LLM's response.
+        """
+        yield await self.generate_response(messages)
@@ -0,0 +1,146 @@
+# llm_emulator/llm/coalescing.py
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+from .base import LLMInterface
+from .messages import normalize_messages
+
+log = logging.getLogger("llm_emulator")
+
+
+class _SharedStream:
+    """The chunks of one in-flight streamed completion, replayable by joiners."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.consumers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        # Wake every consumer waiting for new chunks, then re-arm.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self):
+        await self._changed.wait()
+
+
+class CoalescingGateway(LLMInterface):
+    """
+    Wraps any LLMInterface so that concurrent, identical requests share a
+    single in-flight completion (single-flight).
+
+    Requests are identical when their normalized (role, content) message lists
+    match. With streaming, a request that joins late first receives the chunks
+    already produced and then follows the live stream. The shared completion is
+    cancelled only once every request waiting on it has gone away.
+    """
+
+    def __init__(self, llm_interface: LLMInterface):
+        """
+        Initializes the gateway.
+
+        Args:
+            llm_interface: The gateway that actually produces completions.
+        """
+        self.llm_interface = llm_interface
+        self._responses: Dict[tuple, asyncio.Task] = {}
+        # Requests waiting on each in-flight completion.
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._streams: Dict[tuple, _SharedStream] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.llm_interface.model_name
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        self.requests += 1
+        key = normalize_messages(messages)
+        task = self._responses.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.llm_interface.generate_response(messages))
+            self._responses[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+            log.debug("CoalescingGateway: joined an in-flight completion.")
+
+        self._waiters[task] += 1
+        try:
+            # Shielded, so one caller being cancelled does not fail the others.
+            return await asyncio.shield(task)
+        finally:
+            if not task.done():
+                self._waiters[task] -= 1
+                if self._waiters[task] == 0:
+                    # Nobody is waiting anymore; stop paying for the completion.
+                    task.cancel()
+                    self._forget(key, task)
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        """Drops a completion that has finished or that nobody waits for."""
+        if self._responses.get(key) is task:
+            del self._responses[key]
+        self._waiters.pop(task, None)
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        self.requests += 1
+        key = normalize_messages(messages)
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.ensure_future(self._produce(key, shared, messages))
+        else:
+            self.coalesced += 1
+            log.debug("CoalescingGateway: joined an in-flight stream.")
+
+        shared.consumers += 1
+        try:
+            index = 0
+            while True:
+                if index < len(shared.chunks):
+                    chunk = shared.chunks[index]
+                    index += 1
+                    yield chunk
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await shared.wait_for_change()
+        finally:
+            shared.consumers -= 1
+            if shared.consumers == 0 and not shared.done:
+                # Nobody is listening anymore; stop paying for the completion.
+                shared.task.cancel()
+                self._streams.pop(key, None)
+
+    async def _produce(
+        self, key: tuple, shared: _SharedStream, messages: List[Dict[str, str]]
+    ):
+        """Pulls the underlying stream and publishes every chunk."""
+        try:
+            async for chunk in self.llm_interface.stream_response(messages):
+                shared.chunks.append(chunk)
+                shared.notify()
+        except asyncio.CancelledError:
+            shared.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+            shared.notify()
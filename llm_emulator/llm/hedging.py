@@ -0,0 +1,202 @@
+# llm_emulator/llm/hedging.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from .base import LLMInterface
+
+log = logging.getLogger(__name__)
+
+
+class HedgingGateway(LLMInterface):
+    """
+    Cuts tail latency by hedging slow requests.
+
+    When a request has produced no output after the `percentile` of recently
+    observed latencies (time to the first chunk when streaming), a duplicate
+    is sent to the `hedge` gateway, which may be the same one. Whichever
+    produces output first wins; the other is cancelled.
+
+    Hedges are paid for from a budget that grows by `max_extra_load` per
+    request, so they add at most that fraction of extra requests on average,
+    however slow the backends get. Until `min_samples` latencies have been
+    observed, `initial_delay` is used, or nothing is hedged if it is None.
+    """
+
+    def __init__(
+        self,
+        llm_interface: LLMInterface,
+        hedge: Optional[LLMInterface] = None,
+        percentile: float = 0.95,
+        max_extra_load: float = 0.05,
+        min_delay: float = 0.05,
+        initial_delay: Optional[float] = None,
+        window: int = 512,
+        min_samples: int = 20,
+        max_burst: float = 10.0,
+    ):
+        """
+        Initializes the hedging gateway.
+
+        Args:
+            llm_interface: The gateway every request is first sent to.
+            hedge: The gateway duplicates are sent to. Defaults to the first.
+            percentile: The fraction of observed latencies, from 0 to 1, after
+                        which a request is hedged.
+            max_extra_load: The average fraction of extra requests hedging
+                            may add, e.g. 0.05 for 5%.
+            min_delay: Never hedge sooner than this many seconds.
+            initial_delay: The hedging delay before enough latencies have been
+                           observed. If None, nothing is hedged until then.
+            window: How many recent latencies the percentile is taken from.
+            min_samples: Latencies needed before the percentile is trusted.
+            max_burst: The most hedges the budget can save up for a burst.
+        """
+        self.llm_interface = llm_interface
+        self.hedge = hedge or llm_interface
+        self.percentile = percentile
+        self.max_extra_load = max_extra_load
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_burst = max_burst
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._budget = 0.0
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.llm_interface.model_name
+
+    def hedge_delay(self) -> Optional[float]:
+        """Returns the seconds after which a request is hedged, if at all."""
+        if len(self._latencies) < self.min_samples:
+            if self.initial_delay is None:
+                return None
+            return max(self.initial_delay, self.min_delay)
+        ordered = sorted(self._latencies)
+        index = min(int(self.percentile * len(ordered)), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def _start_request(self) -> Optional[float]:
+        """Accounts for a new request and returns its hedging delay."""
+        self.requests += 1
+        self._budget = min(self._budget + self.max_extra_load, self.max_burst)
+        return self.hedge_delay()
+
+    def _take_hedge(self) -> bool:
+        """Spends one hedge from the budget, if there is one to spend."""
+        if self._budget < 1.0:
+            return False
+        self._budget -= 1.0
+        self.hedged += 1
+        return True
+
+    async def _race(
+        self,
+        first: asyncio.Future,
+        make_hedge: Callable[[], asyncio.Future],
+        delay: Optional[float],
+    ) -> asyncio.Future:
+        """
+        Waits for `first`, starting a hedge from `make_hedge()` if it is still
+        pending after `delay`, and returns the first attempt to succeed. The
+        other attempt is cancelled. If every attempt fails, the last one to
+        fail is returned.
+        """
+        attempts = [first]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done and self._take_hedge():
+                    log.debug(f"Hedging an LLM request pending for {delay:.3f}s.")
+                    attempts.append(make_hedge())
+
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        return future
+                if not pending:
+                    return done.pop()
+        finally:
+            for future in attempts:
+                if not future.done():
+                    future.cancel()
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        delay = self._start_request()
+        started_at = {}
+
+        def start(gateway: LLMInterface) -> asyncio.Future:
+            task = asyncio.ensure_future(gateway.generate_response(messages))
+            started_at[task] = time.monotonic()
+            return task
+
+        first = start(self.llm_interface)
+        winner = await self._race(first, lambda: start(self.hedge), delay)
+        if winner is not first:
+            self.hedge_wins += 1
+        response = winner.result()
+        self._latencies.append(time.monotonic() - started_at[winner])
+        return response
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        delay = self._start_request()
+        streams: Dict[asyncio.Future, Any] = {}
+        started_at = {}
+
+        def start(gateway: LLMInterface) -> asyncio.Future:
+            # An attempt completes when its stream produces a first chunk.
+            stream = gateway.stream_response(messages)
+            task = asyncio.ensure_future(stream.__anext__())
+            streams[task] = stream
+            started_at[task] = time.monotonic()
+            return task
+
+        first = start(self.llm_interface)
+        winner = None
+        try:
+            winner = await self._race(first, lambda: start(self.hedge), delay)
+        finally:
+            losers = [task for task in streams if task is not winner]
+            # A stream cannot be closed while its cancelled attempt still runs.
+            await asyncio.gather(*losers, return_exceptions=True)
+            for task in losers:
+                await streams[task].aclose()
+
+        stream = streams[winner]
+        try:
+            try:
+                chunk = winner.result()
+            except StopAsyncIteration:
+                return
+            # Only an attempt that produced a chunk counts as a win and a sample.
+            if winner is not first:
+                self.hedge_wins += 1
+            self._latencies.append(time.monotonic() - started_at[winner])
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the hedging counters and the current hedging delay."""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay": self.hedge_delay(),
+        }
@@ -1,11 +1,17 @@
 # llm_emulator/llm/litellm_gateway.py
 
+import inspect
 import logging
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 import litellm
 
 from .base import LLMInterface
-from ..exceptions import LLMConnectionError, LLMResponseError
+from ..exceptions import (
+    LLMConnectionError,
+    LLMRateLimitError,
+    LLMResponseError,
+    LLMTimeoutError,
+)
 
 log = logging.getLogger("llm_emulator")
 
@@ -13,6 +19,35 @@ log = logging.getLogger("llm_emulator")
 # litellm.set_verbose = False
 
 
+def _connection_error(message: str, error: Exception) -> LLMConnectionError:
+    """Wraps a litellm error, keeping rate limits and timeouts distinguishable."""
+    if isinstance(error, litellm.RateLimitError):
+        return LLMRateLimitError(message)
+    if isinstance(error, litellm.Timeout):
+        return LLMTimeoutError(message)
+    return LLMConnectionError(message)
+
+
+async def _close_stream(response: Any):
+    """
+    Closes a litellm stream, and the provider's HTTP response behind it, so
+    that an abandoned completion stops generating instead of running until
+    the stream is garbage collected.
+    """
+    inner = getattr(response, "completion_stream", None)
+    for stream, method in ((response, "aclose"), (inner, "aclose"), (inner, "close")):
+        close = getattr(stream, method, None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            log.debug(f"Could not close the litellm stream: {e}")
+        return
+
+
 class LiteLLMGateway(LLMInterface):
     """
     The production-ready LLM gateway that uses the litellm library.
@@ -38,6 +73,10 @@ class LiteLLMGateway(LLMInterface):
             f"and completion params: {self.completion_params}"
         )
 
+    @property
+    def model_name(self) -> str:
+        return self.model
+
     async def generate_response(self, messages: List[Dict[str, str]]) -> str:
         log.debug(f"Sending request to litellm with model '{self.model}'.")
         try:
@@ -56,6 +95,45 @@ class LiteLLMGateway(LLMInterface):
 
         except Exception as e:
             log.error(f"An error occurred while communicating with litellm: {e}")
-            raise LLMConnectionError(
-                f"Failed to get a response from litellm: {e}"
+            raise _connection_error(
+                f"Failed to get a response from litellm: {e}", e
+            ) from e
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        log.debug(f"Streaming request to litellm with model '{self.model}'.")
+        try:
+            response = await litellm.acompletion(
+                model=self.model,
+                messages=messages,
+                api_key=self.api_key,
+                stream=True,
+                **self.completion_params,
+            )
+        except Exception as e:
+            log.error(f"An error occurred while communicating with litellm: {e}")
+            raise _connection_error(
+                f"Failed to get a response from litellm: {e}", e
             ) from e
+
+        received_content = False
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    received_content = True
+                    yield content
+        except Exception as e:
+            log.error(f"The litellm stream failed mid-response: {e}")
+            raise _connection_error(
+                f"The litellm stream was interrupted: {e}", e
+            ) from e
+        finally:
+            # Also runs when the consumer closes or cancels this generator.
+            await _close_stream(response)
+
+        if not received_content:
+            raise LLMResponseError("LLM response was empty or malformed.")
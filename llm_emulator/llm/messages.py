@@ -0,0 +1,38 @@
+# llm_emulator/llm/messages.py
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Tuple
+
+# A message reduced to the fields that determine the LLM's answer.
+MessageKey = Tuple[str, str]
+
+
+def normalize_message(message: Dict[str, Any]) -> MessageKey:
+    """
+    Reduces a chat message to its (role, content) pair.
+
+    Extra keys such as history timestamps are dropped, content given as a list
+    of parts is reduced to its text, and `LLMRole` members are reduced to their
+    string value so that enum and plain-string roles compare equal.
+    """
+    role = message.get("role")
+    content = message.get("content", "")
+    if isinstance(content, list):
+        # Content given as parts, e.g. with prompt caching markers.
+        content = "".join(part.get("text", "") for part in content)
+    return (getattr(role, "value", role), content)
+
+
+def normalize_messages(messages: Iterable[Dict[str, Any]]) -> Tuple[MessageKey, ...]:
+    """Normalizes a whole message list into a hashable tuple."""
+    return tuple(normalize_message(message) for message in messages)
+
+
+def messages_digest(messages: Iterable[Dict[str, Any]]) -> str:
+    """
+    Returns a hexadecimal digest of a normalized message list. Unlike `hash`,
+    it is stable across processes, so it can key data stored on disk.
+    """
+    normalized = json.dumps(normalize_messages(messages), ensure_ascii=False)
+    return hashlib.sha256(normalized.encode()).hexdigest()
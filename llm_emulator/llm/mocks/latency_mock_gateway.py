@@ -0,0 +1,197 @@
+# llm_emulator/llm/mocks/latency_mock_gateway.py
+
+import asyncio
+import logging
+import math
+import random
+from collections import OrderedDict
+from typing import AsyncIterator, List, Dict, Optional
+
+from ..base import LLMInterface
+from ..messages import messages_digest
+from .mock_gateway import MockLLMGateway
+from ...exceptions import LLMRateLimitError, LLMResponseError, LLMTimeoutError
+
+log = logging.getLogger("llm_emulator")
+
+
+class LatencyMockGateway(LLMInterface):
+    """
+    A mock gateway that behaves like a real provider under load, for capacity
+    planning and reproducible load tests.
+
+    The text of each response comes from an inner gateway (by default
+    `MockLLMGateway`); this gateway adds the timing and the failures:
+
+    - time to first token drawn from a log-normal distribution,
+    - streaming at a given token rate, with per-token jitter,
+    - rate-limit (429) and timeout errors at given rates,
+    - a concurrency ceiling, beyond which requests are rate-limited.
+
+    Every request draws from its own random generator, seeded from `seed`, the
+    content of its messages and how many times those messages were seen
+    before. The same workload therefore gets the same latencies and failures
+    on every run, however the requests interleave. Only the most recently seen
+    `max_tracked_requests` distinct requests are remembered; call `reset`
+    between runs that share a gateway.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[LLMInterface] = None,
+        time_to_first_token: float = 0.5,
+        time_to_first_token_sigma: float = 0.4,
+        tokens_per_second: float = 50.0,
+        jitter: float = 0.2,
+        rate_limit_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout: float = 10.0,
+        max_concurrency: Optional[int] = None,
+        chars_per_token: int = 4,
+        chunk_interval: float = 0.02,
+        seed: int = 0,
+        max_tracked_requests: int = 100_000,
+    ):
+        """
+        Initializes the gateway.
+
+        Args:
+            inner: The gateway producing the response text. It should be
+                   deterministic for runs to be reproducible.
+            time_to_first_token: Median seconds before the first token.
+            time_to_first_token_sigma: Shape of the log-normal distribution of
+                                       the time to first token (0 is constant).
+            tokens_per_second: Mean generation rate once streaming started.
+            jitter: Relative variation of each token's delay, from 0 to 1.
+            rate_limit_rate: Fraction of requests failing with a rate limit.
+            timeout_rate: Fraction of requests that hang, then time out.
+            timeout: Seconds a timed-out request hangs before failing.
+            max_concurrency: Requests served at once; more are rate-limited.
+                             If None, there is no ceiling.
+            chars_per_token: Characters per simulated token.
+            chunk_interval: Minimum seconds between two streamed chunks;
+                            tokens generated in between are sent together.
+            seed: Seeds every random draw.
+            max_tracked_requests: Distinct requests whose occurrences are
+                                  counted; beyond that, the least recently
+                                  seen one is forgotten and counts from zero
+                                  if it comes back.
+        """
+        self.inner = inner or MockLLMGateway()
+        self.time_to_first_token = time_to_first_token
+        self.time_to_first_token_sigma = time_to_first_token_sigma
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.chars_per_token = max(chars_per_token, 1)
+        self.chunk_interval = chunk_interval
+        self.seed = seed
+        self.max_tracked_requests = max(max_tracked_requests, 1)
+
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.timed_out = 0
+        # digest -> times seen, least recently seen first.
+        self._occurrences: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def model_name(self) -> str:
+        return self.inner.model_name
+
+    def _request_rng(self, messages: List[Dict[str, str]]) -> random.Random:
+        """Returns the random generator of a request, as described above."""
+        digest = messages_digest(messages)
+        occurrence = self._occurrences.pop(digest, 0)
+        self._occurrences[digest] = occurrence + 1
+        if len(self._occurrences) > self.max_tracked_requests:
+            self._occurrences.popitem(last=False)
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    def reset(self):
+        """
+        Forgets the requests seen so far, so that replaying a workload draws
+        the same latencies and failures as its first run.
+        """
+        self._occurrences.clear()
+
+    def _first_token_delay(self, rng: random.Random) -> float:
+        if self.time_to_first_token <= 0:
+            return 0.0
+        return rng.lognormvariate(
+            math.log(self.time_to_first_token), self.time_to_first_token_sigma
+        )
+
+    def _token_delay(self, rng: random.Random) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return (1 + self.jitter * rng.uniform(-1, 1)) / self.tokens_per_second
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        return "".join([chunk async for chunk in self.stream_response(messages)])
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        if not messages:
+            raise LLMResponseError("Received an empty message list.")
+
+        self.requests += 1
+        rng = self._request_rng(messages)
+        # Draw every decision up front, so they do not depend on timing.
+        failure_draw = rng.random()
+        first_token_delay = self._first_token_delay(rng)
+
+        # Discovery must succeed for the emulator to start at all.
+        system_prompt = str(messages[0].get("content", "")).lower()
+        if "network protocol expert" not in system_prompt:
+            if (
+                self.max_concurrency is not None
+                and self.in_flight >= self.max_concurrency
+            ):
+                self.rate_limited += 1
+                raise LLMRateLimitError(
+                    f"Concurrency limit of {self.max_concurrency} requests reached."
+                )
+            if failure_draw < self.rate_limit_rate:
+                self.rate_limited += 1
+                raise LLMRateLimitError("Rate limit exceeded (simulated 429).")
+            if failure_draw < self.rate_limit_rate + self.timeout_rate:
+                self.in_flight += 1
+                try:
+                    await asyncio.sleep(self.timeout)
+                finally:
+                    self.in_flight -= 1
+                self.timed_out += 1
+                raise LLMTimeoutError(
+                    f"No response within {self.timeout} seconds (simulated)."
+                )
+
+        self.in_flight += 1
+        try:
+            response = await self.inner.generate_response(messages)
+            await asyncio.sleep(first_token_delay)
+
+            # The first token arrives after the first-token delay; each later
+            # one after its own delay. Tokens are batched into chunks.
+            step = self.chars_per_token
+            sent = 0
+            pending_delay = 0.0
+            for end in range(step, len(response) + step, step):
+                if end > step:
+                    pending_delay += self._token_delay(rng)
+                if (
+                    sent == 0
+                    or pending_delay >= self.chunk_interval
+                    or end >= len(response)
+                ):
+                    if pending_delay:
+                        await asyncio.sleep(pending_delay)
+                        pending_delay = 0.0
+                    yield response[sent:end]
+                    sent = end
+        finally:
+            self.in_flight -= 1
@@ -1,7 +1,7 @@
 # llm_emulator/llm/mocks/mock_gateway.py
 
 import logging
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
 
 from ..base import LLMInterface
 from ...exceptions import LLMResponseError
@@ -21,6 +21,7 @@ class MockLLMGateway(LLMInterface):
         {
             "port": 8080,
             "transport_protocol": "tcp",
+            "framing": "http",
             "communication_type": "request-response",
             "description": "A standard HTTP server."
         }
@@ -76,3 +77,11 @@ class MockLLMGateway(LLMInterface):
         # Otherwise, assume it's a chat request
         log.info("MockLLMGateway: Detected chat request. Returning HTML page.")
         return self._get_chat_response()
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        # Stream the response line by line, like a provider emitting deltas.
+        response = await self.generate_response(messages)
+        for line in response.splitlines(keepends=True):
+            yield line
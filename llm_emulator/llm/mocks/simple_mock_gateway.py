@@ -2,7 +2,7 @@
 
 import logging
 import random
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
 
 from ..base import LLMInterface
 from ...exceptions import LLMResponseError
@@ -23,6 +23,7 @@ class SimpleMockGateway(LLMInterface):
         {
             "port": 9999,
             "transport_protocol": "tcp",
+            "framing": "line",
             "communication_type": "interactive-stream",
             "description": "A simple echo and random message server."
         }
@@ -44,7 +45,7 @@ class SimpleMockGateway(LLMInterface):
         return random.choice(options)
 
     async def generate_response(self, messages: List[Dict[str, str]]) -> str:
-        print(messages)
+        log.debug(f"SimpleMockGateway: Received {len(messages)} messages.")
         if not messages:
             raise LLMResponseError("Received an empty message list.")
 
@@ -57,3 +58,13 @@ class SimpleMockGateway(LLMInterface):
         # Otherwise, assume it's a chat request
         log.info("SimpleMockGateway: Detected chat request. Returning random message.")
         return self._get_chat_response(messages)
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        # Stream the response word by word, like a provider emitting deltas.
+        response = await self.generate_response(messages)
+        words = response.split(" ")
+        for word in words[:-1]:
+            yield word + " "
+        yield words[-1]
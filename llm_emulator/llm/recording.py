@@ -0,0 +1,320 @@
+# llm_emulator/llm/recording.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TYPE_CHECKING,
+)
+
+from .base import LLMInterface
+from .messages import messages_digest, normalize_messages
+from ..exceptions import LLMResponseError
+
+if TYPE_CHECKING:
+    from ..core.response_cache import ResponseCache
+
+log = logging.getLogger(__name__)
+
+
+class RecordingStore:
+    """
+    An append-only file of LLM request/response pairs, one JSON object per
+    line, indexed by the digest of the request's messages.
+
+    Each record holds the normalized messages, the model, the response split
+    into the chunks it was streamed in, and when each chunk arrived. Only the
+    byte offsets of the records are kept in memory; a record is read from disk
+    when it is needed, through a file handle kept open for the purpose. Records
+    are never rewritten, so a store can be copied or inspected while it is
+    being recorded to.
+
+    The store may be used from several threads, so that the gateways can keep
+    its disk I/O off the event loop.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens a store, creating the file if needed, and indexes its records.
+
+        Args:
+            path: The JSON Lines file holding the recordings.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # digest -> byte offsets of its records, in recording order.
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        self.model: Optional[str] = None
+        self._build_index()
+        # Serializes appends and reads, which share the file offsets.
+        self._lock = threading.Lock()
+        self._file = open(self.path, "ab")
+        self._terminate_last_line()
+        self._reader = open(self.path, "rb")
+
+    def _terminate_last_line(self):
+        """
+        Ends a last line cut short by a crash while recording, so that the next
+        record starts on a line of its own instead of being appended to it.
+        """
+        size = self._file.seek(0, os.SEEK_END)
+        if not size:
+            return
+        with open(self.path, "rb") as file:
+            file.seek(size - 1)
+            if file.read(1) != b"\n":
+                self._file.write(b"\n")
+                self._file.flush()
+
+    def _build_index(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as file:
+            offset = 0
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    self._index[record["key"]].append(offset)
+                    self.model = record.get("model") or self.model
+                except (ValueError, KeyError):
+                    # Most likely a line cut short by a crash while recording.
+                    log.warning(f"Skipping an unreadable record in '{self.path}'.")
+                offset += len(line)
+        log.info(f"Loaded {len(self)} recordings from '{self.path}'.")
+
+    def __len__(self) -> int:
+        return sum(len(offsets) for offsets in self._index.values())
+
+    def __contains__(self, messages: List[Dict[str, Any]]) -> bool:
+        return messages_digest(messages) in self._index
+
+    def append(
+        self,
+        messages: List[Dict[str, Any]],
+        chunks: List[str],
+        chunk_times: List[float],
+        model: Optional[str] = None,
+    ):
+        """
+        Records one response.
+
+        Args:
+            messages: The messages the LLM was given.
+            chunks: The response, as the chunks it was streamed in.
+            chunk_times: For each chunk, the seconds from the request until it
+                         arrived.
+            model: The model that produced the response.
+        """
+        key = messages_digest(messages)
+        record = {
+            "key": key,
+            "model": model,
+            "recorded_at": time.time(),
+            "messages": normalize_messages(messages),
+            "chunks": chunks,
+            "chunk_times": [round(t, 6) for t in chunk_times],
+        }
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode()
+        with self._lock:
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(line)
+            self._file.flush()
+            self._index[key].append(offset)
+        if model:
+            self.model = model
+
+    def _read(self, offset: int) -> Dict[str, Any]:
+        with self._lock:
+            self._reader.seek(offset)
+            line = self._reader.readline()
+        return json.loads(line)
+
+    def lookup(
+        self, messages: List[Dict[str, Any]], occurrence: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns a record of `messages`, or None if there is none. When the same
+        messages were recorded several times, `occurrence` selects one, cycling
+        through them in recording order.
+        """
+        offsets = self._index.get(messages_digest(messages))
+        if not offsets:
+            return None
+        return self._read(offsets[occurrence % len(offsets)])
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Yields the latest record of every distinct request."""
+        for offsets in self._index.values():
+            yield self._read(offsets[-1])
+
+    def seed_cache(
+        self,
+        cache: "ResponseCache",
+        format_response: Optional[Callable[[str], str]] = None,
+    ) -> int:
+        """
+        Puts the latest recorded response of every request into a response
+        cache, so that a deployment starts warm.
+
+        Args:
+            cache: The response cache to fill.
+            format_response: Formats a raw LLM response as the pipeline would,
+                             e.g. `ChatProtocolHandler.format_response_from_llm`.
+                             The response cache holds formatted responses.
+
+        Returns:
+            The number of responses put in the cache.
+        """
+        count = 0
+        for record in self.records():
+            messages = [
+                {"role": role, "content": content}
+                for role, content in record["messages"]
+            ]
+            response = "".join(record["chunks"])
+            if format_response is not None:
+                response = format_response(response)
+            cache.put(messages, response)
+            count += 1
+        return count
+
+    def close(self):
+        self._file.close()
+        self._reader.close()
+
+
+class RecordingGateway(LLMInterface):
+    """
+    Wraps a gateway and records every successful response, with the timing of
+    its chunks, to a RecordingStore. Requests and responses pass through
+    unchanged.
+    """
+
+    def __init__(self, llm_interface: LLMInterface, store: RecordingStore):
+        self.llm_interface = llm_interface
+        self.store = store
+
+    @property
+    def model_name(self) -> str:
+        return self.llm_interface.model_name
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        started_at = time.monotonic()
+        response = await self.llm_interface.generate_response(messages)
+        await asyncio.to_thread(
+            self.store.append,
+            messages,
+            [response],
+            [time.monotonic() - started_at],
+            model=self.model_name,
+        )
+        return response
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        started_at = time.monotonic()
+        chunks = []
+        chunk_times = []
+        async for chunk in self.llm_interface.stream_response(messages):
+            chunks.append(chunk)
+            chunk_times.append(time.monotonic() - started_at)
+            yield chunk
+        # Only complete responses are recorded, off the event loop.
+        await asyncio.to_thread(
+            self.store.append, messages, chunks, chunk_times, model=self.model_name
+        )
+
+
+class ReplayGateway(LLMInterface):
+    """
+    Serves recorded responses by the digest of the request's messages, without
+    any network access.
+
+    Requests recorded several times are answered with each recording in turn.
+    With `preserve_timing`, chunks are streamed at the pace they were
+    recorded (scaled by `speed`); otherwise they are returned at once.
+    Requests that were never recorded go to `fallback`, or fail with an
+    LLMResponseError if there is none.
+    """
+
+    def __init__(
+        self,
+        store: RecordingStore,
+        preserve_timing: bool = False,
+        speed: float = 1.0,
+        fallback: Optional[LLMInterface] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Initializes the replay gateway.
+
+        Args:
+            store: The recordings to serve.
+            preserve_timing: Stream chunks with their recorded timing.
+            speed: How much faster than recorded to replay, e.g. 2.0.
+            fallback: An optional gateway for requests that were not recorded.
+            model: The model name to report. Defaults to the recorded model, so
+                   that caches keyed by model keep matching.
+        """
+        self.store = store
+        self.preserve_timing = preserve_timing
+        self.speed = speed
+        self.fallback = fallback
+        self._model = model
+        self._occurrences: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model_name(self) -> str:
+        return self._model or self.store.model or type(self).__name__
+
+    async def _next_record(
+        self, messages: List[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        if messages not in self.store:
+            return None
+        # Claim the occurrence before reading, so that concurrent requests for
+        # the same messages get successive recordings.
+        key = messages_digest(messages)
+        occurrence = self._occurrences[key]
+        self._occurrences[key] += 1
+        return await asyncio.to_thread(self.store.lookup, messages, occurrence)
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        return "".join([chunk async for chunk in self.stream_response(messages)])
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        record = await self._next_record(messages)
+        if record is None:
+            self.misses += 1
+            if self.fallback is None:
+                raise LLMResponseError("No recorded response for this conversation.")
+            async for chunk in self.fallback.stream_response(messages):
+                yield chunk
+            return
+
+        self.hits += 1
+        elapsed = 0.0
+        for chunk, chunk_time in zip(record["chunks"], record["chunk_times"]):
+            if self.preserve_timing and self.speed > 0:
+                delay = (chunk_time - elapsed) / self.speed
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elapsed = chunk_time
+            yield chunk
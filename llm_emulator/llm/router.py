@@ -0,0 +1,268 @@
+# llm_emulator/llm/router.py
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from .base import LLMInterface
+from ..exceptions import LLMConnectionError, LLMResponseError
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BackendSpec:
+    """
+    Describes one gateway a RouterGateway can send requests to.
+    """
+
+    gateway: LLMInterface
+    # Requests this backend may serve at once. If None, there is no limit.
+    max_concurrency: Optional[int] = None
+    # A name for logs and stats. If None, the gateway's model name is used.
+    name: Optional[str] = None
+
+
+class _Backend:
+    """The routing state of one backend."""
+
+    __slots__ = (
+        "gateway",
+        "name",
+        "max_concurrency",
+        "in_flight",
+        "latency",
+        "error_rate",
+        "consecutive_failures",
+        "open_until",
+        "probing",
+        "requests",
+        "failures",
+    )
+
+    def __init__(self, spec: BackendSpec):
+        self.gateway = spec.gateway
+        self.name = spec.name or spec.gateway.model_name
+        self.max_concurrency = spec.max_concurrency
+        self.in_flight = 0
+        # Moving averages; the latency is None until a request completes.
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        # The circuit is open (no traffic) until this monotonic time.
+        self.open_until = 0.0
+        # Whether the single trial request of a half-open circuit is running.
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def is_available(self, now: float) -> bool:
+        """True if the circuit lets a request through, ignoring capacity."""
+        if self.open_until == 0.0:
+            return True
+        return now >= self.open_until and not self.probing
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.max_concurrency is None or self.in_flight < self.max_concurrency
+
+    def score(self) -> Tuple[float, int]:
+        """Expected cost of one more request; lower is better."""
+        # Backends without a measurement yet are tried first, least loaded first.
+        latency = self.latency or 0.0
+        cost = latency * (self.in_flight + 1) / max(1.0 - self.error_rate, 0.05)
+        return (cost, self.in_flight)
+
+
+class RouterGateway(LLMInterface):
+    """
+    Spreads requests over several gateways, e.g. different models, API keys or
+    endpoints, so that no single provider's limits cap the deployment.
+
+    Each request goes to the healthy backend with the lowest expected cost,
+    from its moving-average latency (time to the first chunk), its moving
+    error rate and its current load. A backend that fails `failure_threshold`
+    times in a row has its circuit opened for `open_circuit_time` seconds;
+    after that a single trial request decides whether it is closed again.
+    Backends at their concurrency limit are skipped, and when every healthy
+    backend is full, requests wait for a free slot.
+
+    A request that fails before its first chunk is retried on the next best
+    backend. Once output has been streamed, errors are raised as they are.
+
+    Backends can be any LLMInterface, so routing can be exercised offline
+    against stand-ins such as LatencyMockGateway.
+    """
+
+    def __init__(
+        self,
+        backends: List[Union[BackendSpec, LLMInterface]],
+        smoothing: float = 0.2,
+        failure_threshold: int = 3,
+        open_circuit_time: float = 30.0,
+    ):
+        """
+        Initializes the router.
+
+        Args:
+            backends: The backends, as BackendSpec objects or plain gateways.
+                      The first one's model name is reported as the router's.
+            smoothing: Weight of the newest sample in the moving averages.
+            failure_threshold: Consecutive failures that open a circuit.
+            open_circuit_time: Seconds a circuit stays open before a trial.
+        """
+        if not backends:
+            raise ValueError("backends cannot be empty.")
+        self.backends = [
+            _Backend(spec if isinstance(spec, BackendSpec) else BackendSpec(spec))
+            for spec in backends
+        ]
+        self.smoothing = smoothing
+        self.failure_threshold = failure_threshold
+        self.open_circuit_time = open_circuit_time
+        self.failovers = 0
+        self._released = asyncio.Event()
+
+    @property
+    def model_name(self) -> str:
+        return self.backends[0].gateway.model_name
+
+    async def _acquire(
+        self, tried: Set[_Backend], last_error: Optional[Exception] = None
+    ) -> _Backend:
+        """Reserves a slot on the best backend not tried yet for this request."""
+        while True:
+            now = time.monotonic()
+            candidates = [
+                b for b in self.backends if b not in tried and b.is_available(now)
+            ]
+            if not candidates:
+                message = "No healthy LLM backend is available."
+                if last_error is not None:
+                    message += f" Last error: {last_error}"
+                raise LLMConnectionError(message) from last_error
+
+            free = [b for b in candidates if b.has_capacity]
+            if free:
+                backend = min(free, key=_Backend.score)
+                backend.in_flight += 1
+                backend.requests += 1
+                if backend.open_until:
+                    backend.probing = True
+                return backend
+
+            # Every healthy backend is at its limit; wait for a slot.
+            released = self._released
+            await released.wait()
+
+    def _release(self, backend: _Backend):
+        backend.in_flight -= 1
+        self._released.set()
+        self._released = asyncio.Event()
+
+    def _record_success(self, backend: _Backend, latency: float):
+        alpha = self.smoothing
+        if backend.latency is None:
+            backend.latency = latency
+        else:
+            backend.latency += alpha * (latency - backend.latency)
+        backend.error_rate -= alpha * backend.error_rate
+        backend.consecutive_failures = 0
+        if backend.open_until:
+            log.info(f"LLM backend '{backend.name}' recovered; closing its circuit.")
+        backend.open_until = 0.0
+        backend.probing = False
+
+    def _record_failure(self, backend: _Backend, error: Exception):
+        backend.failures += 1
+        backend.error_rate += self.smoothing * (1.0 - backend.error_rate)
+        backend.consecutive_failures += 1
+        if backend.probing or backend.consecutive_failures >= self.failure_threshold:
+            backend.open_until = time.monotonic() + self.open_circuit_time
+            log.warning(
+                f"Opening the circuit of LLM backend '{backend.name}' for "
+                f"{self.open_circuit_time}s after {backend.consecutive_failures} "
+                f"failures: {error}"
+            )
+        backend.probing = False
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        tried: Set[_Backend] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            backend = await self._acquire(tried, last_error)
+            started_at = time.monotonic()
+            try:
+                response = await backend.gateway.generate_response(messages)
+            except (LLMConnectionError, LLMResponseError) as e:
+                self._record_failure(backend, e)
+                tried.add(backend)
+                last_error = e
+                self.failovers += 1
+                log.warning(f"LLM backend '{backend.name}' failed, failing over: {e}")
+                continue
+            except asyncio.CancelledError:
+                backend.probing = False
+                raise
+            finally:
+                self._release(backend)
+            self._record_success(backend, time.monotonic() - started_at)
+            return response
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        tried: Set[_Backend] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            backend = await self._acquire(tried, last_error)
+            started_at = time.monotonic()
+            streaming = False
+            try:
+                stream = backend.gateway.stream_response(messages)
+                try:
+                    async for chunk in stream:
+                        if not streaming:
+                            streaming = True
+                            self._record_success(backend, time.monotonic() - started_at)
+                        yield chunk
+                finally:
+                    await stream.aclose()
+                if not streaming:
+                    self._record_success(backend, time.monotonic() - started_at)
+                return
+            except (LLMConnectionError, LLMResponseError) as e:
+                self._record_failure(backend, e)
+                if streaming:
+                    # Part of the response was already sent; it cannot be redone.
+                    raise
+                tried.add(backend)
+                last_error = e
+                self.failovers += 1
+                log.warning(f"LLM backend '{backend.name}' failed, failing over: {e}")
+            except (asyncio.CancelledError, GeneratorExit):
+                backend.probing = False
+                raise
+            finally:
+                self._release(backend)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the routing state of every backend, keyed by name."""
+        now = time.monotonic()
+        return {
+            backend.name: {
+                "in_flight": backend.in_flight,
+                "latency": backend.latency,
+                "error_rate": round(backend.error_rate, 4),
+                "requests": backend.requests,
+                "failures": backend.failures,
+                "circuit": (
+                    "closed"
+                    if not backend.open_until
+                    else "open" if now < backend.open_until else "half-open"
+                ),
+            }
+            for backend in self.backends
+        }
@@ -0,0 +1,50 @@
+# llm_emulator/llm/tokens.py
+
+import logging
+from typing import Optional
+
+import litellm
+
+log = logging.getLogger("llm_emulator")
+
+# Tokens a chat message costs beyond its content (role and delimiters).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Rough characters-per-token ratio used when no tokenizer is available.
+_FALLBACK_CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """
+    Counts tokens with the tokenizer of the configured model, through litellm.
+
+    If the model's tokenizer cannot be used, it falls back to a character-based
+    estimate instead of failing the session.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        """
+        Initializes the counter.
+
+        Args:
+            model: The model whose tokenizer to use. If None, the estimate is used.
+        """
+        self.model = model
+        self._use_tokenizer = model is not None
+
+    def count(self, text: str) -> int:
+        """Returns the number of tokens in a piece of text."""
+        if self._use_tokenizer:
+            try:
+                return litellm.token_counter(model=self.model, text=text)
+            except Exception as e:
+                log.warning(
+                    f"Tokenizer for '{self.model}' is unavailable, "
+                    f"estimating token counts instead: {e}"
+                )
+                self._use_tokenizer = False
+        return len(text) // _FALLBACK_CHARS_PER_TOKEN + 1
+
+    def count_message(self, content: str) -> int:
+        """Returns the number of tokens a chat message with this content costs."""
+        return self.count(content) + MESSAGE_OVERHEAD_TOKENS
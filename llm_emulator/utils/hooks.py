@@ -1,7 +1,12 @@
 # llm_emulator/utils/hooks.py
 
-from collections import defaultdict
+import asyncio
+import inspect
 import logging
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 
 log = logging.getLogger("llm_emulator")
 
@@ -10,10 +15,56 @@ class HookManager:
     """
     A simple hook (publish-subscribe) system for event handling.
     Allows parts of the system to be decoupled by subscribing to named events.
+
+    Subscribers may be plain functions or coroutine functions. How they are
+    run depends on the dispatch mode:
+
+    - 'inline': sync subscribers run inside `emit`; async ones are scheduled
+      as tasks.
+    - 'background': `emit` only queues the event; a background task on the
+      event loop runs the subscribers.
+    - 'thread': like 'background', but sync subscribers run in a worker
+      thread, so blocking I/O in a subscriber never stalls the event loop.
+
+    The background queue is bounded. When it is full, the overflow policy
+    decides: 'drop-newest' discards the new event, 'drop-oldest' discards the
+    oldest queued one, and 'inline' applies backpressure by running the
+    subscribers right away in the emitter.
     """
 
-    def __init__(self):
+    DISPATCH_MODES = ("inline", "background", "thread")
+    OVERFLOW_POLICIES = ("drop-newest", "drop-oldest", "inline")
+
+    def __init__(
+        self,
+        dispatch: str = "inline",
+        max_queue: int = 10000,
+        overflow: str = "drop-newest",
+    ):
+        """
+        Initializes the hook manager.
+
+        Args:
+            dispatch: One of 'inline', 'background' or 'thread'.
+            max_queue: The maximum number of events waiting for dispatch.
+            overflow: One of 'drop-newest', 'drop-oldest' or 'inline'.
+        """
+        if dispatch not in self.DISPATCH_MODES:
+            raise ValueError(f"dispatch must be one of {self.DISPATCH_MODES}.")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}.")
+        self.dispatch = dispatch
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.dropped = 0
+        # event_name -> [(callback, is_coroutine_function)]
         self._callbacks = defaultdict(list)
+        self._queue = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inline_tasks = set()
 
     def subscribe(self, event_name: str, callback):
         """
@@ -21,24 +72,77 @@ class HookManager:
 
         Args:
             event_name (str): The name of the event (e.g., 'connection_opened').
-            callback (callable): The function to call when the event is emitted.
-                                 It will receive `event_name` as its first argument.
+            callback (callable): The function or coroutine function to call when
+                                 the event is emitted. It will receive
+                                 `event_name` as its first argument.
         """
-        self._callbacks[event_name].append(callback)
-        log.debug(f"Subscribed callback to hook '{event_name}'")
+        is_async = inspect.iscoroutinefunction(callback)
+        self._callbacks[event_name].append((callback, is_async))
+        log.debug("Subscribed callback to hook '%s'", event_name)
 
     def emit(self, event_name: str, *args, **kwargs):
         """
-        Emit an event, calling all subscribed callbacks for that hook.
+        Emit an event to all subscribed callbacks for that hook.
 
         Args:
             event_name (str): The name of the event to emit.
             *args, **kwargs: Arguments to pass to the callback functions.
         """
-        log.debug(
-            f"Emitting event for hook '{event_name}' with args: {args}, kwargs: {kwargs}"
-        )
-        for callback in self._callbacks[event_name]:
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Emitting event for hook '%s' with args: %s, kwargs: %s",
+                event_name,
+                args,
+                kwargs,
+            )
+        callbacks = self._callbacks.get(event_name)
+        if not callbacks:
+            return
+
+        if self.dispatch == "inline":
+            self._run_inline(event_name, callbacks, args, kwargs)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to dispatch on; fall back to running inline.
+            self._run_inline(event_name, callbacks, args, kwargs)
+            return
+
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == "inline":
+                self._run_inline(event_name, callbacks, args, kwargs)
+                return
+            self.dropped += 1
+            if self.overflow == "drop-newest":
+                return
+            self._queue.popleft()
+
+        self._queue.append((event_name, args, kwargs))
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._drained = asyncio.Event()
+            self._worker = loop.create_task(self._dispatch_loop())
+        self._drained.clear()
+        self._wakeup.set()
+
+    def _run_inline(self, event_name: str, callbacks: list, args: tuple, kwargs: dict):
+        for callback, is_async in callbacks:
+            if is_async:
+                try:
+                    task = asyncio.get_running_loop().create_task(
+                        self._run_async(callback, event_name, args, kwargs)
+                    )
+                except RuntimeError:
+                    log.warning(
+                        f"Skipping async subscriber for '{event_name}': "
+                        "no running event loop."
+                    )
+                    continue
+                self._inline_tasks.add(task)
+                task.add_done_callback(self._inline_tasks.discard)
+                continue
             try:
                 # Pass the event_name as the first argument to the callback.
                 # This enables the creation of generic subscribers.
@@ -47,3 +151,59 @@ class HookManager:
                 log.error(
                     f"Error in hook subscriber for '{event_name}': {e}", exc_info=True
                 )
+
+    async def _run_async(self, callback, event_name: str, args: tuple, kwargs: dict):
+        try:
+            await callback(event_name, *args, **kwargs)
+        except Exception as e:
+            log.error(f"Error in hook subscriber for '{event_name}': {e}", exc_info=True)
+
+    async def _dispatch_loop(self):
+        """Runs the subscribers of queued events, in order."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._drained.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            event_name, args, kwargs = self._queue.popleft()
+            for callback, is_async in list(self._callbacks.get(event_name, ())):
+                try:
+                    if is_async:
+                        await callback(event_name, *args, **kwargs)
+                    elif self.dispatch == "thread":
+                        if self._executor is None:
+                            self._executor = ThreadPoolExecutor(
+                                max_workers=1, thread_name_prefix="llm_emulator_hooks"
+                            )
+                        await loop.run_in_executor(
+                            self._executor,
+                            partial(callback, event_name, *args, **kwargs),
+                        )
+                    else:
+                        callback(event_name, *args, **kwargs)
+                except Exception as e:
+                    log.error(
+                        f"Error in hook subscriber for '{event_name}': {e}",
+                        exc_info=True,
+                    )
+
+    async def flush(self):
+        """Waits until every queued event has been dispatched."""
+        if self._worker is not None and not self._worker.done():
+            await self._drained.wait()
+        if self._inline_tasks:
+            await asyncio.gather(*self._inline_tasks, return_exceptions=True)
+
+    async def aclose(self):
+        """Dispatches the queued events, then stops the background dispatcher."""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
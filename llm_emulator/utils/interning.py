@@ -0,0 +1,42 @@
+# llm_emulator/utils/interning.py
+
+from collections import OrderedDict
+
+
+class ContentPool:
+    """
+    Deduplicates large strings across sessions.
+
+    Equal contents (e.g. the same HTML page served to many clients) are
+    replaced by one shared string object. Only strings of at least `min_size`
+    characters are pooled, and the pool keeps at most `max_bytes` of text,
+    dropping the least recently seen entries first. Dropping an entry only
+    stops future deduplication; strings already shared stay shared.
+    """
+
+    def __init__(self, min_size: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.min_size = min_size
+        self.max_bytes = max_bytes
+        self._pool: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+
+    def intern(self, text: str) -> str:
+        """Returns the pooled string equal to `text`, pooling it if needed."""
+        if len(text) < self.min_size:
+            return text
+
+        pooled = self._pool.get(text)
+        if pooled is not None:
+            self._pool.move_to_end(pooled)
+            return pooled
+
+        self._pool[text] = text
+        self._bytes += len(text)
+        while self._bytes > self.max_bytes and self._pool:
+            _, evicted = self._pool.popitem(last=False)
+            self._bytes -= len(evicted)
+        return text
+
+
+# The pool shared by every session in the process.
+content_pool = ContentPool()
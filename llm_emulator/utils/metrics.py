@@ -0,0 +1,582 @@
+# llm_emulator/utils/metrics.py
+
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from ..events import HookEvents
+
+if TYPE_CHECKING:
+    from ..core.scheduler import LLMScheduler
+    from ..llm.tokens import TokenCounter
+    from .hooks import HookManager
+
+log = logging.getLogger(__name__)
+
+# Label values, in the order of a metric's label names.
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers cache hits up to slow completions.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class of the metric types: a name, help text and label names."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Returns the metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as a number of requests."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Instead of being set, a labelled value can
+    be read from a function each time the metrics are collected.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: str):
+        self._functions[self._key(labels)] = function
+
+    def get(self, **labels: str) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def _render_samples(self) -> List[str]:
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                log.warning(f"Could not collect gauge '{self.name}': {e}")
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, bucket_count: int):
+        # One count per bucket, plus the +Inf bucket; not cumulative.
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """
+    Observations sorted into fixed buckets, such as request latencies.
+    Observing is a binary search and two additions, whatever the volume.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """
+        Estimates the `q` quantile (0 to 1) by linear interpolation within the
+        bucket that holds it, like Prometheus' histogram_quantile.
+        """
+        series = self._series.get(self._key(labels))
+        if series is None or series.count == 0:
+            return None
+        rank = q * series.count
+        cumulative = 0
+        for i, bucket_count in enumerate(series.counts):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                if i == len(self.buckets):
+                    # Beyond the last bucket: the best estimate is its bound.
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, series.counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """A named collection of metrics that can be rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, help: str, labelnames: Tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsCollector:
+    """
+    Keeps the emulator's metrics up to date from its hook events.
+
+    Every event is accounted under the name of the service it belongs to. If
+    `service` is given, events of other services on a shared hook manager are
+    ignored.
+    """
+
+    PREFIX = "llm_emulator_"
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        token_counter: "Optional[TokenCounter]" = None,
+        service: Optional[str] = None,
+    ):
+        """
+        Initializes the collector and registers its metrics.
+
+        Args:
+            registry: The registry to register the metrics in.
+            token_counter: Counts the tokens of LLM responses. It runs on the
+                           event loop with inline hook dispatch, so a counter
+                           without a model, which estimates from the length,
+                           is preferable to a tokenizer. If None, the
+                           response token histogram is left empty.
+            service: Only account events of this service, if given.
+        """
+        self.registry = registry
+        self.token_counter = token_counter
+        self.service = service
+        p = self.PREFIX
+        labels = ("service",)
+
+        self.connections = registry.counter(
+            f"{p}connections_total", "Client connections accepted.", labels
+        )
+        self.rejected = registry.counter(
+            f"{p}connections_rejected_total",
+            "Client connections refused.",
+            ("service", "reason"),
+        )
+        self.closed = registry.counter(
+            f"{p}connections_closed_total",
+            "Client sessions closed, by the reason they ended.",
+            ("service", "reason"),
+        )
+        self.active_sessions = registry.gauge(
+            f"{p}active_sessions", "Sessions currently open.", labels
+        )
+        self.messages_received = registry.counter(
+            f"{p}messages_received_total", "Client messages received.", labels
+        )
+        self.messages_dropped = registry.counter(
+            f"{p}messages_dropped_total",
+            "Client messages dropped unanswered, by reason.",
+            ("service", "reason"),
+        )
+        self.llm_requests = registry.counter(
+            f"{p}llm_requests_total", "Requests sent to the LLM.", labels
+        )
+        self.llm_cancelled = registry.counter(
+            f"{p}llm_cancelled_total",
+            "LLM requests cancelled before they finished.",
+            labels,
+        )
+        self.llm_cancelled_tokens = registry.counter(
+            f"{p}llm_cancelled_tokens_total",
+            "Tokens generated by LLM requests before they were cancelled (estimated).",
+            labels,
+        )
+        self.cache_hits = registry.counter(
+            f"{p}response_cache_hits_total", "Responses served from the cache.", labels
+        )
+        self.cache_misses = registry.counter(
+            f"{p}response_cache_misses_total", "Response cache lookups missed.", labels
+        )
+        self.speculative_requests = registry.counter(
+            f"{p}speculative_llm_requests_total",
+            "LLM requests made before the client asked for them.",
+            labels,
+        )
+        self.speculation_hits = registry.counter(
+            f"{p}speculation_hits_total",
+            "Client requests answered with a speculative response.",
+            labels,
+        )
+        self.fast_path_hits = registry.counter(
+            f"{p}fast_path_hits_total",
+            "Client messages answered by a fast-path rule, without the LLM.",
+            ("service", "rule"),
+        )
+        self.queue_wait = registry.histogram(
+            f"{p}llm_queue_wait_seconds", "Time spent waiting for an LLM slot.", labels
+        )
+        self.llm_latency = registry.histogram(
+            f"{p}llm_latency_seconds", "Duration of a whole LLM completion.", labels
+        )
+        self.llm_first_chunk = registry.histogram(
+            f"{p}llm_time_to_first_chunk_seconds",
+            "Time until the LLM produced its first chunk.",
+            labels,
+        )
+        self.time_to_first_byte = registry.histogram(
+            f"{p}time_to_first_byte_seconds",
+            "Time from a client message until the first byte of the answer.",
+            labels,
+        )
+        self.response_duration = registry.histogram(
+            f"{p}response_duration_seconds",
+            "Time from a client message until the answer was fully sent.",
+            labels,
+        )
+        self.response_tokens = registry.histogram(
+            f"{p}llm_response_tokens",
+            "Tokens per LLM response, estimated from its length.",
+            labels,
+            buckets=TOKEN_BUCKETS,
+        )
+
+    def subscribe(self, hooks: "HookManager"):
+        """Subscribes the collector to the events it accounts."""
+        handlers = {
+            HookEvents.CONNECTION_OPENED: self._on_connection_opened,
+            HookEvents.CONNECTION_CLOSED: self._on_connection_closed,
+            HookEvents.CONNECTION_REJECTED: self._on_connection_rejected,
+            HookEvents.MESSAGE_RECEIVED: self._on_message_received,
+            HookEvents.MESSAGE_DROPPED: self._on_message_dropped,
+            HookEvents.MESSAGE_SENT: self._on_message_sent,
+            HookEvents.LLM_REQUEST: self._on_llm_request,
+            HookEvents.LLM_RESPONSE: self._on_llm_response,
+            HookEvents.LLM_CANCELLED: self._on_llm_cancelled,
+            HookEvents.RESPONSE_CACHE_HIT: self._on_cache_hit,
+            HookEvents.RESPONSE_CACHE_MISS: self._on_cache_miss,
+            HookEvents.SPECULATION_HIT: self._on_speculation_hit,
+            HookEvents.FAST_PATH_HIT: self._on_fast_path_hit,
+        }
+        for event_name, handler in handlers.items():
+            hooks.subscribe(event_name, handler)
+
+    def watch_scheduler(self, scheduler: "LLMScheduler"):
+        """Exposes the LLM scheduler's load, read when the metrics are collected."""
+        p = self.PREFIX
+        self.registry.gauge(
+            f"{p}llm_in_flight", "LLM requests currently running."
+        ).set_function(lambda: scheduler.stats()["in_flight"])
+        self.registry.gauge(
+            f"{p}llm_queue_depth", "LLM requests waiting for a slot."
+        ).set_function(lambda: scheduler.stats()["queue_depth"])
+
+    def watch_hooks(self, hooks: "HookManager"):
+        """Exposes the number of hook events dropped by background dispatch."""
+        self.registry.gauge(
+            f"{self.PREFIX}hook_events_dropped", "Hook events dropped on overflow."
+        ).set_function(lambda: hooks.dropped)
+
+    def _service_of(self, session) -> Optional[str]:
+        name = session.service_name if session is not None else None
+        if self.service is not None and name != self.service:
+            return None
+        return name
+
+    def _on_connection_opened(self, event_name, session=None, **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.connections.inc(service=service)
+            self.active_sessions.inc(service=service)
+
+    def _on_connection_closed(self, event_name, session=None, reason="", **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.active_sessions.dec(service=service)
+            self.closed.inc(service=service, reason=reason)
+
+    def _on_connection_rejected(self, event_name, service=None, reason="", **kwargs):
+        if self.service is None or service == self.service:
+            self.rejected.inc(service=service or "", reason=reason)
+
+    def _on_message_received(self, event_name, session=None, **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.messages_received.inc(service=service)
+
+    def _on_message_dropped(self, event_name, session=None, reason="", **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.messages_dropped.inc(service=service, reason=reason)
+
+    def _on_message_sent(
+        self,
+        event_name,
+        session=None,
+        time_to_first_byte=None,
+        duration=None,
+        **kwargs,
+    ):
+        service = self._service_of(session)
+        if service is None:
+            return
+        if time_to_first_byte is not None:
+            self.time_to_first_byte.observe(time_to_first_byte, service=service)
+        if duration is not None:
+            self.response_duration.observe(duration, service=service)
+
+    def _on_llm_request(
+        self,
+        event_name,
+        session=None,
+        queue_wait=None,
+        speculative=False,
+        **kwargs,
+    ):
+        service = self._service_of(session)
+        if service is None:
+            return
+        self.llm_requests.inc(service=service)
+        if speculative:
+            self.speculative_requests.inc(service=service)
+        if queue_wait is not None:
+            self.queue_wait.observe(queue_wait, service=service)
+
+    def _on_llm_response(
+        self,
+        event_name,
+        session=None,
+        response="",
+        latency=None,
+        time_to_first_chunk=None,
+        **kwargs,
+    ):
+        service = self._service_of(session)
+        if service is None:
+            return
+        if latency is not None:
+            self.llm_latency.observe(latency, service=service)
+        if time_to_first_chunk is not None:
+            self.llm_first_chunk.observe(time_to_first_chunk, service=service)
+        if self.token_counter is not None and response:
+            self.response_tokens.observe(
+                self.token_counter.count(response), service=service
+            )
+
+    def _on_llm_cancelled(
+        self, event_name, session=None, partial_response="", **kwargs
+    ):
+        service = self._service_of(session)
+        if service is None:
+            return
+        self.llm_cancelled.inc(service=service)
+        if self.token_counter is not None and partial_response:
+            self.llm_cancelled_tokens.inc(
+                self.token_counter.count(partial_response), service=service
+            )
+
+    def _on_cache_hit(self, event_name, session=None, **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.cache_hits.inc(service=service)
+
+    def _on_cache_miss(self, event_name, session=None, **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.cache_misses.inc(service=service)
+
+    def _on_speculation_hit(self, event_name, session=None, **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.speculation_hits.inc(service=service)
+
+    def _on_fast_path_hit(self, event_name, session=None, rule="", **kwargs):
+        service = self._service_of(session)
+        if service is not None:
+            self.fast_path_hits.inc(service=service, rule=rule)
+
+
+class MetricsServer:
+    """
+    Serves a registry in the Prometheus text format over plain HTTP at
+    `/metrics`. It is meant to be bound to a local or management interface.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(
+        self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server: asyncio.Server | None = None
+
+    async def start(self):
+        """Starts listening. A port of 0 binds an ephemeral port."""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            request_line = head.split(b"\r\n", 1)[0].decode(errors="ignore").split()
+            path = request_line[1].split("?", 1)[0] if len(request_line) > 1 else ""
+            if request_line and request_line[0] == "GET" and path == "/metrics":
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {self.CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+        ):
+            pass
+        except (ConnectionResetError, BrokenPipeError) as e:
+            log.debug(f"Metrics client went away: {e}")
+        finally:
+            writer.close()
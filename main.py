@@ -1,5 +1,6 @@
 # main.py
 import asyncio
+import functools
 import os
 import argparse
 
@@ -7,8 +8,15 @@ import argparse
 from llm_emulator import (
     Emulator,
     EmulatorConfig,
+    EmulatorHost,
     LiteLLMGateway,
+    CoalescingGateway,
+    RecordingGateway,
+    RecordingStore,
+    ReplayGateway,
     HookEvents,
+    ResponseCache,
+    WorkerSupervisor,
 )
 from llm_emulator.utils.logger import setup_logger
 from llm_emulator.utils.subscribers import create_logging_subscriber
@@ -17,46 +25,142 @@ from llm_emulator.utils.subscribers import create_logging_subscriber
 log = setup_logger()
 
 
-async def main(service_name: str, instructions: str | None):
+def build_gateway(
+    api_key: str | None,
+    model_name: str | None,
+    record_path: str | None = None,
+    replay_path: str | None = None,
+):
+    """Builds the LLM gateway chain. Worker processes each call it."""
+    llm_gateway = (
+        LiteLLMGateway(api_key=api_key, model=model_name) if api_key else None
+    )
+    if record_path and llm_gateway is not None:
+        llm_gateway = RecordingGateway(llm_gateway, RecordingStore(record_path))
+    if replay_path:
+        # Recorded conversations are replayed; new ones go to the LLM, if any.
+        llm_gateway = ReplayGateway(
+            RecordingStore(replay_path), preserve_timing=True, fallback=llm_gateway
+        )
+    # Identical concurrent requests (e.g. greetings) share one completion.
+    return CoalescingGateway(llm_gateway)
+
+
+def subscribe_event_logging(emulator):
+    """Logs the connection and LLM events of an emulator to the console."""
+    logging_subscriber = create_logging_subscriber(truncate_limit=200)
+    for event_name in [
+        HookEvents.CONNECTION_OPENED,
+        HookEvents.CONNECTION_CLOSED,
+        HookEvents.LLM_RESPONSE,
+    ]:
+        emulator.hooks.subscribe(event_name, logging_subscriber)
+
+
+def setup_worker(emulator, response_cache: bool = False):
+    """Prepares the Emulator of a worker process before it starts."""
+    if response_cache:
+        emulator.response_cache = ResponseCache()
+    subscribe_event_logging(emulator)
+
+
+async def main(
+    service_names: list[str],
+    instructions: str | None,
+    response_cache: bool = False,
+    discovery_cache_path: str | None = None,
+    rediscover: bool = False,
+    metrics_port: int | None = None,
+    record_path: str | None = None,
+    replay_path: str | None = None,
+    speculate: bool = False,
+    fast_path: bool = False,
+    greeting_pool_size: int = 0,
+    workers: int = 1,
+    max_connections: int | None = None,
+    max_connections_per_ip: int | None = None,
+    idle_timeout: float | None = None,
+    max_pipelined_requests: int = 1,
+):
     """Main function to set up and run the emulator."""
-    log.info(f"Starting LLM Emulator for service '{service_name}'.")
+    log.info(f"Starting LLM Emulator for {', '.join(map(repr, service_names))}.")
 
     # --- Configuration ---
     api_key = os.getenv("API_KEY")
     model_name = os.getenv("MODEL_NAME")
 
-    if not api_key or not model_name:
+    has_llm = bool(api_key and model_name)
+    if not has_llm and not replay_path:
         log.error("API_KEY or MODEL_NAME environment variable not set. Exiting.")
         return
 
-    # Only create a config object if custom instructions are provided.
-    config = None
-    if instructions:
-        config = EmulatorConfig(custom_instructions=instructions)
+    config = EmulatorConfig(
+        custom_instructions=instructions,
+        discovery_cache_path=discovery_cache_path,
+        force_rediscovery=rediscover,
+        metrics_port=metrics_port,
+        speculation=speculate,
+        fast_path=fast_path,
+        greeting_pool_size=greeting_pool_size,
+        max_connections=max_connections,
+        max_connections_per_ip=max_connections_per_ip,
+        idle_timeout=idle_timeout,
+        max_pipelined_requests=max_pipelined_requests,
+        # Keep console logging of events off the connection hot path.
+        hook_dispatch="thread",
+    )
 
     # --- Emulator Setup ---
-    llm_gateway = LiteLLMGateway(api_key=api_key, model=model_name)
-    emulator = Emulator(
-        service_name=service_name, llm_interface=llm_gateway, config=config
+    gateway_factory = functools.partial(
+        build_gateway,
+        api_key if has_llm else None,
+        model_name,
+        record_path=record_path,
+        replay_path=replay_path,
     )
+    cache = ResponseCache() if response_cache else None
+    if workers > 1:
+        if len(service_names) > 1:
+            log.error("--workers supports a single service only. Exiting.")
+            return
+        # Each worker process builds its own gateway and serves the same port.
+        emulator = WorkerSupervisor(
+            service_name=service_names[0],
+            llm_factory=gateway_factory,
+            workers=workers,
+            config=config,
+            worker_setup=functools.partial(
+                setup_worker, response_cache=response_cache
+            ),
+        )
+    elif len(service_names) == 1:
+        emulator = Emulator(
+            service_name=service_names[0],
+            llm_interface=gateway_factory(),
+            config=config,
+            response_cache=cache,
+        )
+    else:
+        # Several services share one process, gateway and event loop.
+        emulator = EmulatorHost(
+            services=service_names,
+            llm_interface=gateway_factory(),
+            config=config,
+            response_cache=cache,
+        )
 
     # --- Event Hook Subscriptions ---
-    logging_subscriber = create_logging_subscriber(truncate_limit=200)
-
     def on_emulator_started(event_name, host, port, service):
         log.info(f"✨ Emulator started for service '{service}' on port {port}")
         log.info("Press Ctrl+C to stop.")
 
     emulator.hooks.subscribe(HookEvents.EMULATOR_STARTED, on_emulator_started)
     emulator.hooks.subscribe(
-        HookEvents.EMULATOR_STOPPED, lambda event_name: log.info("🛑 Emulator stopped.")
+        HookEvents.EMULATOR_STOPPED,
+        lambda event_name, service: log.info(f"🛑 Emulator stopped for '{service}'."),
     )
-    for event_name in [
-        HookEvents.CONNECTION_OPENED,
-        HookEvents.CONNECTION_CLOSED,
-        HookEvents.LLM_RESPONSE,
-    ]:
-        emulator.hooks.subscribe(event_name, logging_subscriber)
+    if workers <= 1:
+        subscribe_event_logging(emulator)
 
     # --- Run the Emulator ---
     try:
@@ -72,9 +176,10 @@ if __name__ == "__main__":
         description="Run the Universal LLM-Driven Service Emulator."
     )
     parser.add_argument(
-        "service",
+        "services",
         type=str,
-        help="The name of the service to emulate (e.g., 'http', 'shell').",
+        nargs="+",
+        help="The name of the service(s) to emulate (e.g., 'http', 'shell').",
     )
     parser.add_argument(
         "-i",
@@ -82,9 +187,101 @@ if __name__ == "__main__":
         type=str,
         help="Optional custom instructions for the LLM.",
     )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Reuse LLM responses for identical conversations across sessions.",
+    )
+    parser.add_argument(
+        "--discovery-cache",
+        type=str,
+        help="JSON file caching discovered service details across restarts.",
+    )
+    parser.add_argument(
+        "--rediscover",
+        action="store_true",
+        help="Ignore cached service details and query the LLM again.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this local port.",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        help="Append every LLM request and response to this recording file.",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="Answer recorded conversations from this recording file.",
+    )
+    parser.add_argument(
+        "--speculate",
+        action="store_true",
+        help="Pre-generate the assets and pages linked from HTTP responses.",
+    )
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="Answer requests that need no model (e.g. /favicon.ico) directly.",
+    )
+    parser.add_argument(
+        "--greeting-pool",
+        type=int,
+        default=0,
+        help="Keep this many greetings pre-generated per service.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Serve the service from this many processes sharing its port.",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        help="Turn away clients beyond this many open sessions per service.",
+    )
+    parser.add_argument(
+        "--max-connections-per-ip",
+        type=int,
+        help="Turn away clients beyond this many open sessions per IP address.",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Close TCP sessions whose next message takes this many seconds.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=1,
+        help="Answer up to this many pipelined HTTP requests concurrently.",
+    )
     args = parser.parse_args()
 
     try:
-        asyncio.run(main(service_name=args.service, instructions=args.instructions))
+        asyncio.run(
+            main(
+                service_names=args.services,
+                instructions=args.instructions,
+                response_cache=args.response_cache,
+                discovery_cache_path=args.discovery_cache,
+                rediscover=args.rediscover,
+                metrics_port=args.metrics_port,
+                record_path=args.record,
+                replay_path=args.replay,
+                speculate=args.speculate,
+                fast_path=args.fast_path,
+                greeting_pool_size=args.greeting_pool,
+                workers=args.workers,
+                max_connections=args.max_connections,
+                max_connections_per_ip=args.max_connections_per_ip,
+                idle_timeout=args.idle_timeout,
+                max_pipelined_requests=args.pipeline,
+            )
+        )
     except KeyboardInterrupt:
         log.info("\nShutdown requested by user.")
@@ -0,0 +1,114 @@
+# tests/test_coalescing.py
+import asyncio
+import unittest
+from typing import AsyncIterator, Dict, List
+
+from llm_emulator.llm.base import LLMInterface
+from llm_emulator.llm.coalescing import CoalescingGateway
+
+MESSAGES = [{"role": "user", "content": "GET / HTTP/1.1"}]
+
+
+class GatedGateway(LLMInterface):
+    """Answers with a fixed response once `release` is set, counting calls."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"response {self.calls}"
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        self.calls += 1
+        try:
+            yield "first "
+            await self.release.wait()
+            yield "second"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class CoalescingTest(unittest.IsolatedAsyncioTestCase):
+    """Identical concurrent requests share one completion."""
+
+    def setUp(self):
+        self.inner = GatedGateway()
+        self.gateway = CoalescingGateway(self.inner)
+
+    async def start(self, messages=MESSAGES) -> asyncio.Task:
+        task = asyncio.create_task(self.gateway.generate_response(messages))
+        await asyncio.sleep(0)
+        return task
+
+    async def stream(self, messages=MESSAGES) -> str:
+        chunks = [chunk async for chunk in self.gateway.stream_response(messages)]
+        return "".join(chunks)
+
+    async def test_identical_requests_share_a_completion(self):
+        tasks = [await self.start() for _ in range(3)]
+        self.inner.release.set()
+        self.assertEqual(await asyncio.gather(*tasks), ["response 1"] * 3)
+        self.assertEqual(self.inner.calls, 1)
+        self.assertEqual(self.gateway.coalesced, 2)
+
+    async def test_different_requests_are_not_coalesced(self):
+        first = await self.start()
+        second = await self.start([{"role": "user", "content": "GET /other"}])
+        self.inner.release.set()
+        await asyncio.gather(first, second)
+        self.assertEqual(self.inner.calls, 2)
+        self.assertEqual(self.gateway.coalesced, 0)
+
+    async def test_cancelled_waiter_does_not_cancel_the_others(self):
+        leaving, staying = await self.start(), await self.start()
+        leaving.cancel()
+        await asyncio.gather(leaving, return_exceptions=True)
+
+        self.inner.release.set()
+        self.assertEqual(await staying, "response 1")
+        self.assertEqual(self.inner.cancelled, 0)
+
+    async def test_completion_is_cancelled_with_its_last_waiter(self):
+        tasks = [await self.start() for _ in range(2)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.assertEqual(self.inner.cancelled, 1)
+
+        # A later request starts a completion of its own.
+        self.inner.release.set()
+        self.assertEqual(await self.gateway.generate_response(MESSAGES), "response 2")
+        self.assertEqual(self.inner.calls, 2)
+
+    async def test_late_stream_joiner_replays_earlier_chunks(self):
+        first = asyncio.create_task(self.stream())
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(self.stream())
+        await asyncio.sleep(0)
+        self.inner.release.set()
+        self.assertEqual(await asyncio.gather(first, second), ["first second"] * 2)
+        self.assertEqual(self.inner.calls, 1)
+        self.assertEqual(self.gateway.coalesced, 1)
+
+    async def test_stream_is_cancelled_with_its_last_consumer(self):
+        stream = self.gateway.stream_response(MESSAGES)
+        self.assertEqual(await anext(stream), "first ")
+        await stream.aclose()
+        await asyncio.sleep(0)
+        self.assertEqual(self.inner.cancelled, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# tests/test_connection.py
+import asyncio
+import socket
+import struct
+import unittest
+
+from llm_emulator import Emulator, EmulatorConfig, HookEvents, LatencyMockGateway
+from llm_emulator.core.protocols.service import ServiceDefinition
+
+HTTP_SERVICE = ServiceDefinition(
+    name="http",
+    port=0,
+    communication_type="request-response",
+    description="A standard HTTP server.",
+    framing="http",
+)
+
+
+class EmulatorTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs an HTTP emulator on an ephemeral port, backed by a slow mock LLM."""
+
+    # Seconds the mock LLM takes to answer.
+    time_to_first_token = 0.2
+
+    async def asyncSetUp(self):
+        self.emulator = Emulator(
+            service_name="http",
+            llm_interface=LatencyMockGateway(
+                time_to_first_token=self.time_to_first_token,
+                time_to_first_token_sigma=0.0,
+                tokens_per_second=0,
+            ),
+            config=self.config(),
+            service_def=HTTP_SERVICE,
+        )
+        await self.emulator.start()
+
+    async def asyncTearDown(self):
+        await self.emulator.stop()
+
+    def config(self) -> EmulatorConfig:
+        return EmulatorConfig(port=0, cancel_on_disconnect=True)
+
+
+class HalfCloseTest(EmulatorTestCase):
+    """A client that half-closes after its requests still gets the responses."""
+
+    async def send_and_half_close(self, requests: int) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.emulator.port)
+        await reader.readuntil(b"</html>")
+        writer.write(
+            b"".join(
+                f"GET /page{i} HTTP/1.0\r\nHost: test\r\n\r\n".encode()
+                for i in range(requests)
+            )
+        )
+        writer.write_eof()
+        data = await asyncio.wait_for(reader.read(), timeout=10)
+        writer.close()
+        return data
+
+    async def test_response_is_sent_after_half_close(self):
+        data = await self.send_and_half_close(1)
+        self.assertEqual(data.count(b"</html>"), 1)
+        self.assertEqual(self.emulator.stats()["llm_cancelled"], 0)
+
+
+class PipelinedHalfCloseTest(HalfCloseTest):
+    """The same, for a client pipelining its requests."""
+
+    def config(self) -> EmulatorConfig:
+        return EmulatorConfig(
+            port=0, cancel_on_disconnect=True, max_pipelined_requests=4
+        )
+
+    async def test_pipelined_responses_are_sent_after_half_close(self):
+        data = await self.send_and_half_close(3)
+        self.assertEqual(data.count(b"</html>"), 3)
+        self.assertEqual(self.emulator.stats()["llm_cancelled"], 0)
+
+
+class ResetCancellationTest(EmulatorTestCase):
+    """A client resetting its connection cancels the response it waits for."""
+
+    time_to_first_token = 1.0
+
+    async def test_reset_cancels_the_llm_request(self):
+        events = []
+        closed = asyncio.Event()
+        self.emulator.hooks.subscribe(
+            HookEvents.LLM_CANCELLED, lambda event, **kwargs: events.append(event)
+        )
+        self.emulator.hooks.subscribe(
+            HookEvents.CONNECTION_CLOSED, lambda event, **kwargs: closed.set()
+        )
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.emulator.port)
+        await reader.readuntil(b"</html>")
+        writer.write(b"GET /page HTTP/1.1\r\nHost: test\r\n\r\n")
+        await writer.drain()
+        await asyncio.sleep(0.1)
+        # Closing with a zero linger time sends a RST instead of a FIN.
+        sock = writer.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        writer.transport.abort()
+
+        # The session ends well before the LLM would have answered.
+        await asyncio.wait_for(closed.wait(), timeout=self.time_to_first_token / 2)
+        self.assertEqual(events, [HookEvents.LLM_CANCELLED])
+        self.assertEqual(self.emulator.stats()["llm_cancelled"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
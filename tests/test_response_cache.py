@@ -0,0 +1,77 @@
+# tests/test_response_cache.py
+import time
+import unittest
+from typing import Dict, List
+
+from llm_emulator.core.response_cache import ResponseCache
+
+
+def conversation(*requests: str) -> List[Dict[str, str]]:
+    """Returns a message list sharing the system prompt of every test."""
+    messages = [{"role": "system", "content": "You are an HTTP server."}]
+    messages.extend({"role": "user", "content": request} for request in requests)
+    return messages
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """Cached responses expire after their TTL and are evicted LRU."""
+
+    def test_response_is_served_until_it_expires(self):
+        cache = ResponseCache(ttl=0.05)
+        cache.put(conversation("GET /"), "index")
+        self.assertEqual(cache.get(conversation("GET /")), "index")
+
+        time.sleep(0.05)
+        self.assertIsNone(cache.get(conversation("GET /")))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_no_ttl_never_expires(self):
+        cache = ResponseCache(ttl=None)
+        cache.put(conversation("GET /"), "index")
+        time.sleep(0.01)
+        self.assertEqual(cache.get(conversation("GET /")), "index")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put(conversation("GET /a"), "a")
+        cache.put(conversation("GET /b"), "b")
+        # Reading /a makes /b the least recently used.
+        cache.get(conversation("GET /a"))
+        cache.put(conversation("GET /c"), "c")
+
+        self.assertIsNone(cache.get(conversation("GET /b")))
+        self.assertEqual(cache.get(conversation("GET /a")), "a")
+        self.assertEqual(cache.get(conversation("GET /c")), "c")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_entries_are_evicted_beyond_the_byte_cap(self):
+        cache = ResponseCache(max_bytes=200)
+        cache.put(conversation("GET /a"), "a" * 100)
+        cache.put(conversation("GET /b"), "b" * 100)
+
+        self.assertIsNone(cache.get(conversation("GET /a")))
+        self.assertEqual(cache.get(conversation("GET /b")), "b" * 100)
+        self.assertLessEqual(cache.stats()["bytes"], 200)
+
+    def test_shared_prefix_outlives_an_evicted_branch(self):
+        cache = ResponseCache(max_entries=1)
+        cache.put(conversation("GET /"), "index")
+        cache.put(conversation("GET /", "GET /about"), "about")
+
+        self.assertIsNone(cache.get(conversation("GET /")))
+        self.assertEqual(cache.get(conversation("GET /", "GET /about")), "about")
+
+    def test_replaced_response_is_counted_once(self):
+        cache = ResponseCache()
+        cache.put(conversation("GET /"), "old")
+        size = cache.stats()["bytes"]
+        cache.put(conversation("GET /"), "new")
+
+        self.assertEqual(cache.get(conversation("GET /")), "new")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats()["bytes"], size)
+
+
+if __name__ == "__main__":
+    unittest.main()
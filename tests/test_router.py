@@ -0,0 +1,99 @@
+# tests/test_router.py
+import asyncio
+import unittest
+from typing import Dict, List
+
+from llm_emulator import LLMConnectionError
+from llm_emulator.llm.base import LLMInterface
+from llm_emulator.llm.router import RouterGateway
+
+MESSAGES = [{"role": "user", "content": "EHLO test"}]
+
+# Seconds an opened circuit stays open in these tests.
+OPEN_CIRCUIT_TIME = 0.05
+
+
+class ScriptedGateway(LLMInterface):
+    """Answers with its name, or fails while `failing` is set."""
+
+    def __init__(self, name: str, failing: bool = False):
+        self.name = name
+        self.failing = failing
+        self.calls = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.name
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+        self.calls += 1
+        if self.failing:
+            raise LLMConnectionError(f"{self.name} is down.")
+        return self.name
+
+
+class CircuitBreakerTest(unittest.IsolatedAsyncioTestCase):
+    """A backend failing repeatedly is taken out of rotation for a while."""
+
+    def setUp(self):
+        self.flaky = ScriptedGateway("flaky", failing=True)
+        self.steady = ScriptedGateway("steady")
+        self.router = RouterGateway(
+            [self.flaky, self.steady],
+            failure_threshold=2,
+            open_circuit_time=OPEN_CIRCUIT_TIME,
+        )
+
+    def circuit(self, name: str) -> str:
+        return self.router.stats()[name]["circuit"]
+
+    async def open_flaky_circuit(self):
+        # An unmeasured backend is tried first, so each request fails over.
+        for _ in range(2):
+            self.assertEqual(await self.router.generate_response(MESSAGES), "steady")
+        self.assertEqual(self.circuit("flaky"), "open")
+
+    async def test_failures_open_the_circuit(self):
+        await self.open_flaky_circuit()
+        self.assertEqual(self.router.failovers, 2)
+
+        calls = self.flaky.calls
+        self.assertEqual(await self.router.generate_response(MESSAGES), "steady")
+        self.assertEqual(self.flaky.calls, calls)
+
+    async def test_successful_trial_closes_the_circuit(self):
+        await self.open_flaky_circuit()
+        await asyncio.sleep(OPEN_CIRCUIT_TIME)
+        self.assertEqual(self.circuit("flaky"), "half-open")
+
+        self.flaky.failing = False
+        self.steady.failing = True
+        self.assertEqual(await self.router.generate_response(MESSAGES), "flaky")
+        self.assertEqual(self.circuit("flaky"), "closed")
+
+    async def test_failed_trial_reopens_the_circuit(self):
+        await self.open_flaky_circuit()
+        await asyncio.sleep(OPEN_CIRCUIT_TIME)
+
+        # A single failure of the trial request is enough.
+        self.steady.failing = True
+        with self.assertRaises(LLMConnectionError):
+            await self.router.generate_response(MESSAGES)
+        self.assertEqual(self.circuit("flaky"), "open")
+
+    async def test_no_healthy_backend_raises(self):
+        self.steady.failing = True
+        for _ in range(2):
+            with self.assertRaises(LLMConnectionError):
+                await self.router.generate_response(MESSAGES)
+        self.assertEqual(self.circuit("flaky"), "open")
+        self.assertEqual(self.circuit("steady"), "open")
+
+        calls = self.flaky.calls + self.steady.calls
+        with self.assertRaises(LLMConnectionError):
+            await self.router.generate_response(MESSAGES)
+        self.assertEqual(self.flaky.calls + self.steady.calls, calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
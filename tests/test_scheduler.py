@@ -0,0 +1,87 @@
+# tests/test_scheduler.py
+import asyncio
+import unittest
+
+from llm_emulator import LLMQueueFullError
+from llm_emulator.core.scheduler import LLMScheduler
+
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+    """LLM slots are shared fairly between clients, within a bounded queue."""
+
+    async def queue(self, scheduler: LLMScheduler, client_key: str, served: list):
+        """Starts a request of a client; it records the client once served."""
+
+        async def request():
+            async with scheduler.slot(client_key):
+                served.append(client_key)
+
+        task = asyncio.create_task(request())
+        # Let the request reach the queue before the next one is started.
+        await asyncio.sleep(0)
+        return task
+
+    async def test_waiting_clients_are_served_round_robin(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        await scheduler.acquire("busy")
+        served = []
+        tasks = [
+            await self.queue(scheduler, client_key, served)
+            for client_key in ("a", "a", "a", "b")
+        ]
+        self.assertEqual(scheduler.queue_depth, 4)
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(served, ["a", "b", "a", "a"])
+        self.assertEqual(scheduler.in_flight, 0)
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    async def test_requests_beyond_the_queue_are_rejected(self):
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=1, policy="reject")
+        await scheduler.acquire("a")
+        waiting = await self.queue(scheduler, "b", [])
+        self.assertTrue(scheduler.is_saturated)
+
+        with self.assertRaises(LLMQueueFullError):
+            await scheduler.acquire("c")
+        self.assertEqual(scheduler.rejected_total, 1)
+
+        scheduler.release()
+        await waiting
+        self.assertFalse(scheduler.is_saturated)
+
+    async def test_slow_accept_queues_beyond_the_limit(self):
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=1, policy="slow-accept")
+        await scheduler.acquire("a")
+        served = []
+        tasks = [await self.queue(scheduler, "b", served) for _ in range(2)]
+        self.assertEqual(scheduler.queue_depth, 2)
+        self.assertEqual(scheduler.rejected_total, 0)
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(served, ["b", "b"])
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        await scheduler.acquire("a")
+        waiting = await self.queue(scheduler, "b", [])
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.assertEqual(scheduler.queue_depth, 0)
+
+        scheduler.release()
+        self.assertEqual(scheduler.in_flight, 0)
+
+    async def test_spare_slot_never_waits(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        async with scheduler.spare_slot():
+            with self.assertRaises(LLMQueueFullError):
+                async with scheduler.spare_slot():
+                    pass
+        self.assertEqual(scheduler.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()